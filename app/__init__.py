@@ -5,6 +5,7 @@ from flask import Blueprint
 from .main.controller.auth_controller import api as user_auth_ns
 from .main.controller.user_controller import api as user_ns
 from .main.controller.resource_controller import api as resource_ns
+from .main.controller.admin_controller import api as admin_ns
 
 blueprint = Blueprint("api", __name__)
 
@@ -18,3 +19,4 @@ api = Api(
 api.add_namespace(user_auth_ns, path="/auth")
 api.add_namespace(user_ns, path="/users")
 api.add_namespace(resource_ns, path="/resources")
+api.add_namespace(admin_ns, path="/admin")
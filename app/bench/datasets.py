@@ -0,0 +1,144 @@
+"""
+Problem Domain:
+
+Seeded scratch databases the benchmarks run against
+"""
+import os
+import random
+import secrets
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from ..main import (
+    db,
+    flask_bcrypt,
+    principal_cache,
+    response_cache,
+    revoked_token_filter,
+    token_version_cache,
+    verified_token_cache,
+)
+from ..main.model.resource import CResource
+from ..main.model.token_garbage import TokenGarbage
+from ..main.model.user import User
+
+BENCH_PASSWORD = "bench-password"
+
+Dataset = namedtuple(
+    "Dataset", ["user_ids", "admin_id", "unlimited_user_id", "revoked_tokens"]
+)
+
+
+def _insert_in_batches(table, rows, batch_size=5000):
+    for i in range(0, len(rows), batch_size):
+        db.session.execute(table.insert(), rows[i : i + batch_size])
+
+
+def seed(users: int, resources: int, revoked_tokens: int, user_quota: int = -1):
+    """
+    :param users: number of platform users, the first one is the platform admin
+    :param resources: number of resources of every user
+    :param revoked_tokens: number of dumped auth tokens
+    :param user_quota: quota of the seeded users, -1 means no quota
+    :return Dataset:
+    :purpose: bulk inserts the dataset, every user shares the password BENCH_PASSWORD
+    """
+    now = datetime.utcnow()
+    # hash once, bcrypt would otherwise dominate the seeding time
+    password_hash = flask_bcrypt.generate_password_hash(BENCH_PASSWORD).decode("utf-8")
+
+    _insert_in_batches(
+        User.__table__,
+        [
+            {
+                "user_id": user_id,
+                "email": "bench{}@example.com".format(user_id),
+                "password_hash": password_hash,
+                "platform_admin": user_id == 1,
+                "user_registered_on": now,
+                "user_quota": -1 if user_id == 1 else user_quota,
+                "quota_remaining": (
+                    -1 if user_id == 1 or user_quota < 0 else user_quota - resources
+                ),
+                "token_version": 0,
+            }
+            for user_id in range(1, users + 1)
+        ],
+    )
+    _insert_in_batches(
+        CResource.__table__,
+        [
+            {"user_id": user_id, "resource_name": "resource-{}".format(i)}
+            for user_id in range(1, users + 1)
+            for i in range(resources)
+        ],
+    )
+
+    tokens = [secrets.token_urlsafe(96) for _ in range(revoked_tokens)]
+    _insert_in_batches(
+        TokenGarbage.__table__,
+        [
+            {"token": token, "dumped_on": now, "expires_on": now + timedelta(days=1)}
+            for token in tokens
+        ],
+    )
+    db.session.commit()
+
+    return Dataset(list(range(1, users + 1)), 1, 1, tokens)
+
+
+def reset_caches():
+    principal_cache.clear()
+    token_version_cache.clear()
+    verified_token_cache.clear()
+    response_cache.clear()
+    revoked_token_filter.reset()
+
+
+@contextmanager
+def seeded_database(
+    app, users=1000, resources=10, revoked_tokens=10000, user_quota=-1, uri=None
+):
+    """
+    :param app: flask app
+    :param users: number of platform users
+    :param resources: number of resources of every user
+    :param revoked_tokens: number of dumped auth tokens
+    :param user_quota: quota of the seeded users, -1 means no quota
+    :param uri: database to seed, defaults to a scratch sqlite file removed afterwards
+    :return Dataset:
+    :purpose: points the app to a freshly seeded database for the duration of the block
+    """
+    path = None
+    if uri is None:
+        fd, path = tempfile.mkstemp(prefix="bench-", suffix=".db")
+        os.close(fd)
+        uri = "sqlite:///" + path
+
+    previous_uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    db.session.remove()
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri
+
+    try:
+        db.drop_all()
+        db.create_all()
+        dataset = seed(users, resources, revoked_tokens, user_quota)
+        reset_caches()
+
+        yield dataset
+    finally:
+        db.session.remove()
+        db.engine.dispose()
+        app.config["SQLALCHEMY_DATABASE_URI"] = previous_uri
+        reset_caches()
+
+        if path:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+
+def random_user_id(dataset: Dataset) -> int:
+    return random.choice(dataset.user_ids)
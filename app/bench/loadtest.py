@@ -0,0 +1,450 @@
+"""
+Problem Domain:
+
+End to end load test driving a realistic mix of api calls against seeded tenants
+"""
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import jwt
+
+from .datasets import BENCH_PASSWORD, seeded_database
+from .runner import summarize
+
+# relative weight of every operation in the request mix
+DEFAULT_MIX = {
+    "login": 2,
+    "list_resources": 40,
+    "get_user": 15,
+    "create_resource": 20,
+    "delete_resource": 15,
+    "admin_list_users": 4,
+    "admin_list_resources": 4,
+}
+
+# upper bounds in milliseconds of the latency histogram buckets
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+
+class TestClientTransport:
+    """Sends requests to the app in process through the flask test client"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, headers=None, body=None):
+        resp = self.client.open(path, method=method, headers=headers, json=body)
+
+        return resp.status_code, resp.get_json()
+
+
+class HttpTransport:
+    """Sends requests to a running server over a keep alive http connection"""
+
+    def __init__(self, base_url):
+        url = urlparse(base_url)
+        self.prefix = url.path.rstrip("/")
+        self.connection = http.client.HTTPConnection(url.hostname, url.port or 80)
+
+    def request(self, method, path, headers=None, body=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+
+        try:
+            self.connection.request(method, self.prefix + path, payload, headers)
+            resp = self.connection.getresponse()
+            data = resp.read()
+        except (http.client.HTTPException, OSError):
+            self.connection.close()
+            raise
+
+        try:
+            return resp.status, json.loads(data.decode("utf-8")) if data else None
+        except ValueError:
+            return resp.status, None
+
+
+class Tenant:
+    """A seeded platform user and what the load test knows about its resources"""
+
+    def __init__(self, user_id, email, password):
+        self.user_id = user_id
+        self.email = email
+        self.password = password
+        self.token = None
+        self.resource_ids = []
+
+
+class Recorder:
+    """Per worker store of the latencies and statuses of every endpoint"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.exceptions = defaultdict(int)
+
+    def record(self, endpoint, status, latency):
+        self.latencies[endpoint].append(latency)
+        self.statuses[endpoint][status] += 1
+
+    def merge(self, other):
+        for endpoint, latencies in other.latencies.items():
+            self.latencies[endpoint].extend(latencies)
+        for endpoint, statuses in other.statuses.items():
+            for status, count in statuses.items():
+                self.statuses[endpoint][status] += count
+        for endpoint, count in other.exceptions.items():
+            self.exceptions[endpoint] += count
+
+
+class Worker:
+    """Runs the request mix for one thread"""
+
+    def __init__(self, transport, tenants, admin, mix, recorder):
+        self.transport = transport
+        self.tenants = tenants
+        self.admin = admin
+        self.operations = list(mix.keys())
+        self.weights = list(mix.values())
+        self.recorder = recorder
+
+    def call(self, endpoint, method, path, token=None, body=None):
+        headers = {"Authorization": token} if token else {}
+        start = time.perf_counter()
+        try:
+            status, data = self.transport.request(method, path, headers, body)
+        except Exception:
+            self.recorder.exceptions[endpoint] += 1
+            return None, None
+        self.recorder.record(endpoint, status, time.perf_counter() - start)
+
+        return status, data
+
+    def login(self, tenant):
+        status, data = self.call(
+            "auth POST /auth/login",
+            "POST",
+            "/auth/login",
+            body={"email": tenant.email, "password": tenant.password},
+        )
+        if status == 200:
+            tenant.token = data["Authorization"]
+
+    def list_resources(self, tenant):
+        status, data = self.call(
+            "resource GET /resources/<user_id>",
+            "GET",
+            "/resources/{}?limit=20".format(tenant.user_id),
+            tenant.token,
+        )
+        if status == 200:
+            tenant.resource_ids = [
+                resource["resource_id"] for resource in data["data"]["data"] or []
+            ]
+
+    def get_user(self, tenant):
+        self.call(
+            "user GET /users/<user_id>",
+            "GET",
+            "/users/{}".format(tenant.user_id),
+            tenant.token,
+        )
+
+    def create_resource(self, tenant):
+        self.call(
+            "resource POST /resources/<user_id>",
+            "POST",
+            "/resources/{}".format(tenant.user_id),
+            tenant.token,
+            {"resource_name": "loadtest"},
+        )
+
+    def delete_resource(self, tenant):
+        if not tenant.resource_ids:
+            return self.list_resources(tenant)
+
+        resource_id = tenant.resource_ids.pop()
+        self.call(
+            "resource DELETE /resources/<user_id>",
+            "DELETE",
+            "/resources/{}?resource_id={}".format(tenant.user_id, resource_id),
+            tenant.token,
+        )
+
+    def admin_list_users(self, tenant):
+        self.call("user GET /users/", "GET", "/users/?limit=50", self.admin.token)
+
+    def admin_list_resources(self, tenant):
+        self.call(
+            "resource GET /resources/", "GET", "/resources/?limit=50", self.admin.token
+        )
+
+    def run(self, deadline, max_requests):
+        done = 0
+        while time.monotonic() < deadline and (not max_requests or done < max_requests):
+            operation = random.choices(self.operations, self.weights)[0]
+            getattr(self, operation)(random.choice(self.tenants))
+            done += 1
+
+
+def seed_through_api(transport, admin, users, resources, quota):
+    """
+    :param transport: transport to a running server
+    :param admin: tenant of the platform admin
+    :param users: number of tenants to create
+    :param resources: number of resources created for every tenant
+    :param quota: quota of every tenant, -1 means no quota
+    :return list: the created tenants
+    :purpose: creates the tenants of a load test run through the platform api
+    """
+    run_id = int(time.time())
+    emails = [
+        "loadtest-{}-{}@example.com".format(run_id, i) for i in range(users)
+    ]
+    worker = Worker(transport, [], admin, {}, Recorder())
+    worker.login(admin)
+
+    tenants = []
+    for email in emails:
+        worker.call(
+            "seed", "POST", "/users/", admin.token, {"email": email, "password": email}
+        )
+
+        # the id of the created user is the subject of its auth token, the cached user
+        # listing may not show the user yet
+        tenant = Tenant(None, email, email)
+        worker.login(tenant)
+        tenant.user_id = int(jwt.decode(tenant.token, verify=False)["sub"])
+        tenants.append(tenant)
+
+        if quota >= 0:
+            worker.call(
+                "seed",
+                "PUT",
+                "/users/{}?new_user_quota={}".format(tenant.user_id, quota),
+                admin.token,
+            )
+        if resources:
+            worker.call(
+                "seed",
+                "POST",
+                "/resources/{}/bulk".format(tenant.user_id),
+                tenant.token,
+                {"resource_names": ["seed"] * resources},
+            )
+
+    return tenants
+
+
+def drive(make_transport, tenants, admin, workers, duration, max_requests, mix):
+    """
+    :param make_transport: callable returning a new transport for every worker
+    :param tenants: seeded tenants
+    :param admin: tenant of the platform admin
+    :param workers: number of concurrent worker threads
+    :param duration: seconds to run for
+    :param max_requests: requests per worker, 0 means until the duration elapses
+    :param mix: relative weight of every operation
+    :return tuple: merged Recorder and the wall clock time of the run
+    """
+    setup = Worker(make_transport(), tenants, admin, mix, Recorder())
+    for tenant in tenants + [admin]:
+        if tenant.token is None:
+            setup.login(tenant)
+
+    recorders = [Recorder() for _ in range(workers)]
+    threads = [
+        threading.Thread(
+            target=Worker(
+                make_transport(), tenants[i::workers] or tenants, admin, mix, recorder
+            ).run,
+            args=(time.monotonic() + duration, max_requests),
+        )
+        for i, recorder in enumerate(recorders)
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    merged = Recorder()
+    for recorder in recorders:
+        merged.merge(recorder)
+
+    return merged, elapsed
+
+
+def histogram(latencies):
+    """
+    :param latencies: latencies in seconds
+    :return list: (bucket upper bound in ms, count) of the latency histogram
+    """
+    counts = [0] * len(HISTOGRAM_BUCKETS_MS)
+    for latency in latencies:
+        latency_ms = latency * 1000
+        for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if latency_ms <= bound:
+                counts[i] += 1
+                break
+
+    return list(zip(HISTOGRAM_BUCKETS_MS, counts))
+
+
+def build_report(recorder, elapsed) -> dict:
+    """
+    :param recorder: merged recorder of the run
+    :param elapsed: wall clock time of the run
+    :return dict: throughput, error rate, latency summary and histogram per endpoint
+    """
+    report = {}
+    for endpoint in sorted(set(recorder.latencies) | set(recorder.exceptions)):
+        latencies = recorder.latencies.get(endpoint, [])
+        statuses = recorder.statuses.get(endpoint, {})
+        exceptions = recorder.exceptions.get(endpoint, 0)
+        total = len(latencies) + exceptions
+        errors = exceptions + sum(
+            count for status, count in statuses.items() if status >= 500
+        )
+        rejected = sum(
+            count for status, count in statuses.items() if 400 <= status < 500
+        )
+
+        summary = summarize(latencies, elapsed)
+        summary.update(
+            {
+                "requests": total,
+                "error_rate": errors / total if total else 0.0,
+                "client_error_rate": rejected / total if total else 0.0,
+                "statuses": {str(status): n for status, n in sorted(statuses.items())},
+                "histogram_ms": [
+                    ["+Inf" if bound == float("inf") else bound, count]
+                    for bound, count in histogram(latencies)
+                ],
+            }
+        )
+        report[endpoint] = summary
+
+    return report
+
+
+def format_load_report(report: dict, elapsed: float) -> str:
+    """
+    :param report: report built by build_report
+    :param elapsed: wall clock time of the run
+    :return String: printable table of the report
+    """
+    header = "{:<38} {:>8} {:>9} {:>7} {:>7} {:>9} {:>9} {:>9}".format(
+        "endpoint", "requests", "req/sec", "err %", "4xx %", "p50 ms", "p90 ms", "p99 ms"
+    )
+    lines = [header, "-" * len(header)]
+    total = 0
+
+    for endpoint, summary in report.items():
+        total += summary["requests"]
+        lines.append(
+            "{:<38} {:>8} {:>9.1f} {:>7.2f} {:>7.2f} {:>9.2f} {:>9.2f} {:>9.2f}".format(
+                endpoint,
+                summary["requests"],
+                summary["ops_per_sec"],
+                summary["error_rate"] * 100,
+                summary["client_error_rate"] * 100,
+                summary["p50_ms"],
+                summary["p90_ms"],
+                summary["p99_ms"],
+            )
+        )
+        lines.append(
+            "    histogram ms: "
+            + " ".join(
+                "<={}:{}".format(bound, count)
+                for bound, count in summary["histogram_ms"]
+                if count
+            )
+        )
+
+    lines.append("-" * len(header))
+    lines.append(
+        "total {} requests in {:.1f}s, {:.1f} req/sec".format(
+            total, elapsed, total / elapsed if elapsed else 0.0
+        )
+    )
+
+    return "\n".join(lines)
+
+
+def run_loadtest(
+    app,
+    users=20,
+    resources=50,
+    quota=-1,
+    workers=8,
+    duration=30,
+    max_requests=0,
+    url=None,
+    admin_email=None,
+    admin_password=None,
+    mix=None,
+):
+    """
+    :param app: flask app
+    :param users: number of seeded tenants
+    :param resources: number of seeded resources per tenant
+    :param quota: quota of every tenant, -1 means no quota
+    :param workers: number of concurrent worker threads
+    :param duration: seconds to run for
+    :param max_requests: requests per worker, 0 means until the duration elapses
+    :param url: base url of a running server, the app is driven in process if None
+    :param admin_email: platform admin login of the running server
+    :param admin_password: platform admin password of the running server
+    :param mix: relative weight of every operation, defaults to DEFAULT_MIX
+    :return tuple: report per endpoint and the wall clock time of the run
+    """
+    mix = mix or DEFAULT_MIX
+
+    if url:
+        admin = Tenant(None, admin_email, admin_password)
+        tenants = seed_through_api(
+            HttpTransport(url), admin, users, resources, quota
+        )
+        recorder, elapsed = drive(
+            lambda: HttpTransport(url),
+            tenants,
+            admin,
+            workers,
+            duration,
+            max_requests,
+            mix,
+        )
+
+        return build_report(recorder, elapsed), elapsed
+
+    # tenant 1 of the seeded dataset is the platform admin
+    with seeded_database(
+        app, users + 1, resources, revoked_tokens=0, user_quota=quota
+    ) as dataset:
+        admin, *tenants = [
+            Tenant(user_id, "bench{}@example.com".format(user_id), BENCH_PASSWORD)
+            for user_id in dataset.user_ids
+        ]
+        recorder, elapsed = drive(
+            lambda: TestClientTransport(app),
+            tenants,
+            admin,
+            workers,
+            duration,
+            max_requests,
+            mix,
+        )
+
+    return build_report(recorder, elapsed), elapsed
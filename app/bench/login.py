@@ -0,0 +1,108 @@
+"""
+Problem Domain:
+
+Login throughput of one worker process with every password hashing executor
+"""
+
+import threading
+import time
+
+from ..main import password_hasher
+from ..main.model.user import User
+from ..main.util.password import EXECUTORS
+from .datasets import BENCH_PASSWORD, seeded_database
+from .runner import summarize
+
+
+def _login_storm(app, dataset, threads, logins_per_thread):
+    """
+    :return tuple: login latencies, latencies of the requests served meanwhile and the
+                   wall clock time of the storm
+    """
+    login_latencies = []
+    other_latencies = []
+    done = threading.Event()
+    lock = threading.Lock()
+
+    def login(user_id):
+        client = app.test_client()
+        credentials = {
+            "email": "bench{}@example.com".format(user_id),
+            "password": BENCH_PASSWORD,
+        }
+        latencies = []
+        for _ in range(logins_per_thread):
+            start = time.perf_counter()
+            resp = client.post("/auth/login", json=credentials)
+            latencies.append(time.perf_counter() - start)
+            assert resp.status_code == 200, resp.data
+
+        with lock:
+            login_latencies.extend(latencies)
+
+    def probe():
+        # a cheap authenticated request competing with the logins for the worker
+        client = app.test_client()
+        headers = {"Authorization": User.encode_auth_token(dataset.admin_id).decode()}
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get("/users/{}".format(dataset.admin_id), headers=headers)
+            other_latencies.append(time.perf_counter() - start)
+
+    workers = [
+        threading.Thread(target=login, args=(user_id,))
+        for user_id in dataset.user_ids[1 : threads + 1]
+    ]
+    prober = threading.Thread(target=probe)
+
+    start = time.perf_counter()
+    prober.start()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    prober.join()
+
+    return login_latencies, other_latencies, elapsed
+
+
+def run_login_benchmark(
+    app, executors=EXECUTORS, threads=8, logins_per_thread=8, workers=None
+):
+    """
+    :param app: flask app
+    :param executors: password hashing executors to compare
+    :param threads: concurrent logins, like the threads of a gthread gunicorn worker
+    :param logins_per_thread: logins made by every thread
+    :param workers: size of the hashing pool, cpu count if None
+    :return dict: summaries of the logins and of the requests served during the logins
+                  per executor
+    """
+    results = {}
+
+    with seeded_database(
+        app, users=threads + 1, resources=0, revoked_tokens=0
+    ) as dataset:
+        try:
+            for executor in executors:
+                password_hasher.configure(
+                    executor=executor,
+                    workers=workers,
+                    rounds=app.config["BCRYPT_LOG_ROUNDS"],
+                    prefix=app.config.get("BCRYPT_HASH_PREFIX", "2b"),
+                )
+                logins, others, elapsed = _login_storm(
+                    app, dataset, threads, logins_per_thread
+                )
+
+                results["login ({})".format(executor)] = summarize(logins, elapsed)
+                results["GET /users/<id> during logins ({})".format(executor)] = (
+                    summarize(others, elapsed)
+                )
+        finally:
+            password_hasher.shutdown()
+            password_hasher.init_app(app)
+
+    return results
@@ -0,0 +1,148 @@
+"""
+Problem Domain:
+
+Micro benchmarks of the auth and service hot paths
+"""
+import random
+
+from flask_restplus import marshal
+
+from ..main import db, verified_token_cache
+from ..main.model.resource import CResource
+from ..main.model.token_garbage import TokenGarbage
+from ..main.model.user import User
+from ..main.service.resource_service import get_platform_resources_page
+from ..main.service.user_service import (
+    create_new_user_resource,
+    get_user_by_id,
+    get_user_principal,
+)
+from ..main.util.dto import ResourceDto
+from ..main.util.serializer import compile_model
+from .datasets import random_user_id, seeded_database
+from .runner import run_cases
+
+
+def auth_cases(dataset):
+    """
+    :param dataset: seeded dataset
+    :return list: (name, operation, setup) benchmark cases of the auth path
+    """
+    tokens = [
+        User.encode_auth_token(user_id).decode() for user_id in dataset.user_ids[:100]
+    ]
+    for token in tokens:
+        User.decode_auth_token(token)
+
+    return [
+        (
+            "decode_auth_token (signature check)",
+            lambda i: User.decode_auth_token(random.choice(tokens)),
+            verified_token_cache.clear,
+        ),
+        (
+            "decode_auth_token (cached)",
+            lambda i: User.decode_auth_token(tokens[i % len(tokens)]),
+            None,
+        ),
+        (
+            "TokenGarbage.is_dumped (not dumped)",
+            lambda i: TokenGarbage.is_dumped(random.choice(tokens)),
+            None,
+        ),
+        (
+            "TokenGarbage.is_dumped (dumped)",
+            lambda i: TokenGarbage.is_dumped(random.choice(dataset.revoked_tokens)),
+            None,
+        ),
+    ]
+
+
+def service_cases(dataset, page_size):
+    """
+    :param dataset: seeded dataset
+    :param page_size: number of resources marshalled per response
+    :return list: (name, operation, setup) benchmark cases of the service layer
+    """
+    page = get_platform_resources_page(limit=page_size)
+    resources = CResource.query.order_by(CResource.resource_id).limit(page_size).all()
+    resp_obj = {"status": "success", "data": resources, "next_cursor": None}
+    rows_obj = {"status": "success", "data": page.items, "next_cursor": None}
+    serializer = compile_model(ResourceDto.resource_res_data)
+    cached_user_ids = dataset.user_ids[:100]
+    for user_id in cached_user_ids:
+        get_user_principal(user_id)
+
+    return [
+        (
+            "get_user_by_id",
+            lambda i: get_user_by_id(random_user_id(dataset)),
+            db.session.expunge_all,
+        ),
+        (
+            "get_user_principal (cached)",
+            lambda i: get_user_principal(cached_user_ids[i % len(cached_user_ids)]),
+            None,
+        ),
+        (
+            "create_new_user_resource",
+            lambda i: create_new_user_resource(
+                dataset.unlimited_user_id, {"resource_name": "bench"}
+            ),
+            None,
+        ),
+        (
+            "marshal resource_res_data ({} rows)".format(len(resources)),
+            lambda i: marshal(resp_obj, ResourceDto.resource_res_data, envelope="data"),
+            None,
+        ),
+        (
+            "serialize resource_res_data ({} tuples)".format(len(page.items)),
+            lambda i: {"data": serializer.serialize(rows_obj)},
+            None,
+        ),
+        (
+            "query + marshal ({} rows)".format(len(resources)),
+            lambda i: marshal(
+                {
+                    "status": "success",
+                    "data": CResource.query.order_by(CResource.resource_id)
+                    .limit(page_size)
+                    .all(),
+                },
+                ResourceDto.resource_res_data,
+                envelope="data",
+            ),
+            db.session.expunge_all,
+        ),
+        (
+            "query + serialize ({} tuples)".format(len(page.items)),
+            lambda i: {
+                "data": serializer.serialize(
+                    {
+                        "status": "success",
+                        "data": get_platform_resources_page(limit=page_size).items,
+                    }
+                )
+            },
+            None,
+        ),
+    ]
+
+
+def run_microbenchmarks(
+    app, users=1000, resources=10, revoked_tokens=10000, iterations=1000, page_size=100
+) -> dict:
+    """
+    :param app: flask app
+    :param users: number of seeded users
+    :param resources: number of seeded resources per user
+    :param revoked_tokens: number of seeded dumped tokens
+    :param iterations: timed calls per operation
+    :param page_size: number of resources marshalled per response
+    :return dict: summaries keyed by operation name
+    """
+    with seeded_database(app, users, resources, revoked_tokens) as dataset:
+        cases = auth_cases(dataset) + service_cases(dataset, page_size)
+
+        return run_cases(cases, iterations)
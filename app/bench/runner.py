@@ -0,0 +1,152 @@
+"""
+Problem Domain:
+
+Timing, reporting and baseline comparison shared by the benchmark commands
+"""
+import json
+import time
+
+
+def percentile(samples: list, pct: float) -> float:
+    """
+    :param samples: sorted samples
+    :param pct: percentile in the range 0-100
+    :return float: nearest rank percentile of the samples
+    """
+    if not samples:
+        return 0.0
+
+    rank = int(round(pct / 100.0 * (len(samples) - 1)))
+
+    return samples[max(0, min(rank, len(samples) - 1))]
+
+
+def summarize(latencies: list, elapsed: float = None) -> dict:
+    """
+    :param latencies: per operation latencies in seconds
+    :param elapsed: wall clock time of the run, defaults to the sum of the latencies
+    :return dict: ops/sec and latency percentiles in milliseconds
+    """
+    samples = sorted(latencies)
+    elapsed = elapsed if elapsed is not None else sum(samples)
+
+    return {
+        "ops": len(samples),
+        "ops_per_sec": len(samples) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(samples) / len(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p90_ms": percentile(samples, 90) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": samples[-1] * 1000 if samples else 0.0,
+    }
+
+
+def measure(operation, iterations: int = 1000, warmup: int = 10, setup=None) -> dict:
+    """
+    :param operation: callable under test, receives the iteration number
+    :param iterations: number of timed calls
+    :param warmup: number of untimed calls made first
+    :param setup: optional callable run before every call outside of the timing
+    :return dict: summary of the timed calls
+    """
+    for i in range(warmup):
+        if setup:
+            setup()
+        operation(i)
+
+    latencies = []
+    for i in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - start)
+
+    return summarize(latencies)
+
+
+def run_cases(cases, iterations: int = 1000, warmup: int = 10) -> dict:
+    """
+    :param cases: iterable of (name, operation, setup) tuples
+    :param iterations: number of timed calls per case
+    :param warmup: number of untimed calls per case
+    :return dict: summaries keyed by case name
+    """
+    return {
+        name: measure(operation, iterations, warmup, setup)
+        for name, operation, setup in cases
+    }
+
+
+def format_report(results: dict, baseline: dict = None) -> str:
+    """
+    :param results: summaries keyed by case name
+    :param baseline: optional summaries of a previous run to show the change against
+    :return String: printable table of the results
+    """
+    header = "{:<40} {:>12} {:>10} {:>10} {:>10}".format(
+        "operation", "ops/sec", "p50 ms", "p99 ms", "change"
+    )
+    lines = [header, "-" * len(header)]
+
+    for name, summary in results.items():
+        change = ""
+        if baseline and name in baseline and baseline[name]["ops_per_sec"]:
+            ratio = summary["ops_per_sec"] / baseline[name]["ops_per_sec"] - 1
+            change = "{:+.1%}".format(ratio)
+
+        lines.append(
+            "{:<40} {:>12.1f} {:>10.3f} {:>10.3f} {:>10}".format(
+                name,
+                summary["ops_per_sec"],
+                summary["p50_ms"],
+                summary["p99_ms"],
+                change,
+            )
+        )
+
+    return "\n".join(lines)
+
+
+def save_baseline(results: dict, path: str, meta: dict = None):
+    with open(path, "w") as f:
+        json.dump({"meta": meta or {}, "results": results}, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float = 0.2) -> list:
+    """
+    :param results: summaries of the current run
+    :param baseline: summaries of the baseline run
+    :param threshold: tolerated relative drop in ops/sec or rise in p99 latency
+    :return list: human readable description of every regressed operation
+    """
+    regressions = []
+
+    for name, summary in results.items():
+        if name not in baseline:
+            continue
+
+        before = baseline[name]
+        if before["ops_per_sec"] and summary["ops_per_sec"] < before["ops_per_sec"] * (
+            1 - threshold
+        ):
+            regressions.append(
+                "{}: {:.1f} ops/sec down from {:.1f}".format(
+                    name, summary["ops_per_sec"], before["ops_per_sec"]
+                )
+            )
+        elif before["p99_ms"] and summary["p99_ms"] > before["p99_ms"] * (
+            1 + threshold
+        ):
+            regressions.append(
+                "{}: p99 {:.3f} ms up from {:.3f} ms".format(
+                    name, summary["p99_ms"], before["p99_ms"]
+                )
+            )
+
+    return regressions
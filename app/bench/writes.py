@@ -0,0 +1,112 @@
+"""
+Problem Domain:
+
+Resource creation throughput of concurrent worker processes sharing one SQLite database, with
+the default rollback journal and with the tuned engine configuration
+"""
+
+import multiprocessing
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool
+
+from ..main import db
+from ..main.service.user_service import create_new_user_resource
+from .datasets import seeded_database
+from .runner import summarize
+
+
+def engine_modes(app) -> list:
+    """
+    :param app: flask app
+    :return list: (name, SQLALCHEMY_ENGINE_OPTIONS, SQLite pragmas) of every compared mode
+    """
+    return [
+        # a connection per checkout with the SQLite defaults, as before the engine layer
+        ("rollback journal", {"poolclass": NullPool}, {}),
+        ("tuned", {}, app.config["SQLITE_PRAGMAS"]),
+    ]
+
+
+def _create_resources(app, user_id, writes, results):
+    # runs in a forked worker, connections are never shared with the parent
+    latencies = []
+    errors = 0
+
+    with app.app_context():
+        for i in range(writes):
+            start = time.perf_counter()
+            try:
+                create_new_user_resource(user_id, {"resource_name": "w{}".format(i)})
+            except OperationalError:
+                # database is locked, the write gave up waiting for the lock
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+        db.session.remove()
+
+    results.put((latencies, errors))
+
+
+def _write_storm(app, dataset, workers, writes):
+    """
+    :return tuple: write latencies, failed writes and the wall clock time of the storm
+    """
+    db.session.remove()
+    db.engine.dispose()
+
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    processes = [
+        context.Process(target=_create_resources, args=(app, user_id, writes, results))
+        for user_id in dataset.user_ids[1 : workers + 1]
+    ]
+
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+
+    latencies = [latency for worker, _ in outcomes for latency in worker]
+
+    return latencies, sum(errors for _, errors in outcomes), elapsed
+
+
+def run_write_benchmark(app, workers=4, writes=200, modes=None) -> dict:
+    """
+    :param app: flask app
+    :param workers: concurrent worker processes, like the workers of a gunicorn server
+    :param writes: resources created by every worker
+    :param modes: names of the engine modes to compare, all of them if None
+    :return dict: summary of the successful writes and the number of failed ones per mode
+    """
+    results = {}
+    previous_options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+    previous_pragmas = db.sqlite_pragmas
+
+    try:
+        for name, options, pragmas in engine_modes(app):
+            if modes and name not in modes:
+                continue
+
+            app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+            db.sqlite_pragmas = pragmas
+
+            with seeded_database(
+                app, users=workers + 1, resources=0, revoked_tokens=0
+            ) as dataset:
+                latencies, errors, elapsed = _write_storm(app, dataset, workers, writes)
+
+            summary = summarize(latencies, elapsed)
+            summary["errors"] = errors
+            results["create_new_user_resource ({})".format(name)] = summary
+    finally:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = previous_options
+        db.sqlite_pragmas = previous_pragmas
+
+    return results
@@ -1,14 +1,24 @@
 from flask import Flask
+from flask.logging import default_handler
 
 # from sqlalchemy.orm import sessionmaker
 # from sqlalchemy import create_engine
-from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_bcrypt import Bcrypt
 from logging.handlers import RotatingFileHandler
 from .config import config_by_name
-
-
+from .util.bloom_filter import RevokedTokenFilter
+from .util.cache import TTLCache
+from .util.database import Database
+from .util.profiler import RequestProfiler
+from .util.query_stats import QueryStats
+from .util.metrics import Metrics
+from .util.log import JsonFormatter, start_log_pipeline
+from .util.password import PasswordHasher
+from .util.response_cache import ResponseCache
+
+
+import atexit
 import logging
 
 app = Flask(__name__)
@@ -16,25 +26,83 @@ cors = CORS(app)
 app.config["CORS_HEADERS"] = "Content-Type"
 
 
-db = SQLAlchemy()
+db = Database()
 flask_bcrypt = Bcrypt()
+revoked_token_filter = RevokedTokenFilter()
+verified_token_cache = TTLCache()
+principal_cache = TTLCache()
+token_version_cache = TTLCache()
+request_profiler = RequestProfiler()
+query_stats = QueryStats()
+metrics = Metrics()
+password_hasher = PasswordHasher()
+import_password_hasher = PasswordHasher("IMPORT_HASH")
+response_cache = ResponseCache()
+log_listener = None
+log_handler = None
 
 
 def get_log_handler():
     """
-    :return None:
+    :return QueueHandler:
     purpose: Configures and Initializes the logger
+
+    records are only queued on the calling thread, a background listener formats them as
+    json lines and writes them to the rotating log file
     """
-    global app
+    global app, log_listener
 
     log_file_loc = app.config["LOG_FILE_LOCATION"] + "app.log"
-    log_format = "[%(asctime)s] {%(pathname)s:%(lineno)d} %(levelname)s - %(message)s"
-    rthandler = RotatingFileHandler(log_file_loc, maxBytes=20000, backupCount=0)
+    rthandler = RotatingFileHandler(
+        log_file_loc,
+        maxBytes=app.config["LOG_MAX_BYTES"],
+        backupCount=app.config["LOG_BACKUP_COUNT"],
+    )
     rthandler.setLevel(logging.DEBUG)
-    formatter = logging.Formatter(log_format)
-    rthandler.setFormatter(formatter)
+    rthandler.setFormatter(JsonFormatter())
+
+    # keep a single writer per log file should the app be configured again
+    if log_listener is not None:
+        log_listener.stop()
+
+    queue_handler, log_listener = start_log_pipeline(
+        rthandler,
+        app.config["LOG_LEVEL"],
+        queue_size=app.config["LOG_QUEUE_SIZE"],
+        sample_rates=app.config["LOG_SAMPLE_RATES"],
+    )
+
+    return queue_handler
+
+
+def stop_log_listener():
+    """
+    :return None:
+    purpose: writes out the queued records before the process exits
+    """
+    if log_listener is not None:
+        log_listener.stop()
+
 
-    return rthandler
+atexit.register(stop_log_listener)
+
+
+def configure_logging():
+    """
+    :return None:
+    purpose: sends the app logs through a new log pipeline, the handler of a previous
+    configuration is detached first
+    """
+    global log_handler
+
+    if log_handler is not None:
+        app.logger.removeHandler(log_handler)
+
+    log_handler = get_log_handler()
+    app.logger.addHandler(log_handler)
+    # flask attaches its stderr handler on the first access to app.logger, records would
+    # still be written unsampled on the request thread next to the queue
+    app.logger.removeHandler(default_handler)
 
 
 def create_app(config_name):
@@ -43,10 +111,36 @@ def create_app(config_name):
 
     db.init_app(app)
     flask_bcrypt.init_app(app)
-
-    log_handler = get_log_handler()
-
-    app.logger.addHandler(log_handler)
+    password_hasher.init_app(app)
+    import_password_hasher.init_app(app)
+    revoked_token_filter.init_app(app)
+    verified_token_cache.configure(maxsize=app.config["VERIFIED_TOKEN_CACHE_SIZE"])
+    principal_cache.configure(
+        maxsize=app.config["PRINCIPAL_CACHE_SIZE"],
+        ttl=app.config["PRINCIPAL_CACHE_TTL"],
+    )
+    token_version_cache.configure(
+        maxsize=app.config["PRINCIPAL_CACHE_SIZE"],
+        ttl=app.config["TOKEN_VERSION_CACHE_TTL"],
+    )
+    response_cache.init_app(app)
+    request_profiler.init_app(app)
+    query_stats.init_app(app)
+    metrics.init_app(app)
+    metrics.register_cache("verified_token", verified_token_cache)
+    metrics.register_cache("principal", principal_cache)
+    metrics.register_cache("token_version", token_version_cache)
+
+    configure_logging()
+
+    if app.config["TOKEN_PURGE_INTERVAL"] > 0:
+        from .service.token_garbage_service import start_token_purge_scheduler
+
+        start_token_purge_scheduler(
+            app,
+            app.config["TOKEN_PURGE_INTERVAL"],
+            app.config["TOKEN_PURGE_BATCH_SIZE"],
+        )
 
     app.logger.info("****** App created successfully!! ******")
     app.logger.debug("Debug message")
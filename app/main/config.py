@@ -5,9 +5,129 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "chainstack-platform_123")
+    # bcrypt cost of new password hashes, pick it with `manage.py calibrate_bcrypt`
+    BCRYPT_LOG_ROUNDS = 12
+    # where passwords are hashed and verified, inline on the request thread or on a
+    # "thread" or "process" pool of PASSWORD_HASH_WORKERS workers (cpu count if None)
+    PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "inline")
+    PASSWORD_HASH_WORKERS = None
+    PASSWORD_HASH_TIMEOUT = 30
     LOG_FILE_LOCATION = basedir + "/"
+    # the log file is rotated once it reaches LOG_MAX_BYTES keeping LOG_BACKUP_COUNT
+    # older files, records are written by a background thread from a queue holding up
+    # to LOG_QUEUE_SIZE records, newer ones are dropped while it is full
+    LOG_LEVEL = "DEBUG"
+    LOG_MAX_BYTES = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT = 5
+    LOG_QUEUE_SIZE = 10000
+    # fraction of the records kept per level, e.g {"INFO": 0.1} keeps one in ten info
+    # records, levels not listed are all kept
+    LOG_SAMPLE_RATES = {}
     RESTPLUS_MASK_SWAGGER = False
     DEBUG = False
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # connection pool of the backend, connections of server backends are recycled after
+    # DB_POOL_RECYCLE seconds and pinged before use, SQLite files get a pool as well so
+    # the pragmas below are applied once per connection, SQLALCHEMY_ENGINE_OPTIONS
+    # overrides any of these
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = 30
+    DB_POOL_RECYCLE = 1800
+    DB_POOL_PRE_PING = True
+    # applied in order to every new SQLite connection, WAL lets readers run alongside
+    # the writer and writers wait up to busy_timeout ms for the lock instead of failing,
+    # mmap_size is in bytes and a negative cache_size in KiB
+    SQLITE_PRAGMAS = {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+    }
+    # comma separated uris of read only replicas serving the GET listings, round robin,
+    # a replica that cannot be reached is skipped for REPLICA_RETRY_INTERVAL seconds and
+    # reads fall back to the primary when none is left
+    SQLALCHEMY_REPLICA_URIS = [
+        uri for uri in os.getenv("SQLALCHEMY_REPLICA_URIS", "").split(",") if uri
+    ]
+    REPLICA_RETRY_INTERVAL = 30
+
+    # in-process bloom filter in front of the dumped auth tokens store
+    REVOKED_TOKEN_FILTER_CAPACITY = 100000
+    REVOKED_TOKEN_FILTER_ERROR_RATE = 0.001
+    # seconds between pulls of tokens dumped by other workers
+    REVOKED_TOKEN_FILTER_REFRESH = 5
+    # seconds the ids skipped by a pull are pulled again, longer than any write transaction
+    REVOKED_TOKEN_FILTER_GAP_TIMEOUT = 60
+
+    # number of verified auth tokens cached per worker, 0 disables the cache
+    VERIFIED_TOKEN_CACHE_SIZE = 10000
+
+    # logged in user details cached per worker, changes made through other workers
+    # are picked up once the entry expires
+    PRINCIPAL_CACHE_SIZE = 10000
+    PRINCIPAL_CACHE_TTL = 30
+    # the token version is checked against the backend at least this often, tokens
+    # revoked through other workers are rejected within this many seconds
+    TOKEN_VERSION_CACHE_TTL = 5
+
+    # seconds between in-process purges of expired dumped tokens, 0 disables the
+    # scheduler and leaves purging to `manage.py purge_tokens`
+    TOKEN_PURGE_INTERVAL = 0
+    TOKEN_PURGE_BATCH_SIZE = 1000
+
+    # page size of the list endpoints when no limit is given and the largest allowed
+    DEFAULT_PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
+
+    # responses of the admin list endpoints cached in an in-process LRU ("lru"), in a
+    # SQLite file at RESPONSE_CACHE_PATH shared by the workers of the host ("sqlite") or
+    # not at all ("none"), writes through other workers reach an lru cache only once its
+    # entries expire after RESPONSE_CACHE_TTL seconds
+    RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "lru")
+    RESPONSE_CACHE_SIZE = 256
+    RESPONSE_CACHE_TTL = 30
+    RESPONSE_CACHE_PATH = LOG_FILE_LOCATION + "response_cache.db"
+
+    # rows fetched from the backend per round trip while streaming exports
+    EXPORT_CHUNK_SIZE = 1000
+
+    # largest number of resources created or deleted by a single bulk request
+    MAX_BULK_RESOURCES = 1000
+
+    # users checked, hashed and inserted per transaction by the bulk user import
+    IMPORT_CHUNK_SIZE = 500
+    # largest number of users imported by a single request to the import endpoint
+    IMPORT_MAX_ROWS = 10000
+    # the passwords of an import are hashed on their own "thread" or "process" pool of
+    # IMPORT_HASH_WORKERS workers (cpu count if None), apart from the login hashing,
+    # `manage.py import_users` uses a process pool unless told otherwise
+    IMPORT_HASH_EXECUTOR = os.getenv("IMPORT_HASH_EXECUTOR", "thread")
+    IMPORT_HASH_WORKERS = None
+    IMPORT_HASH_TIMEOUT = 30
+
+    # fraction of requests profiled, platform admins can also profile a single request
+    # by sending the PROFILE_HEADER header, profiles are written to PROFILE_DIR
+    PROFILE_SAMPLE_RATE = 0.0
+    PROFILE_HEADER = "X-Profile"
+    PROFILE_DIR = LOG_FILE_LOCATION + "profiles/"
+    PROFILE_KEEP = 100
+
+    # statements slower than this many seconds are logged with their parameters and
+    # statements executed this many times within one request are logged as possible
+    # N+1 queries, 0 disables either log
+    SLOW_QUERY_THRESHOLD = 0.5
+    QUERY_REPEAT_THRESHOLD = 10
+
+    # directory shared by the workers of this host to aggregate the /metrics values,
+    # None keeps the metrics per process, scrapes need a bearer token when one is set,
+    # the app does not start without the token when METRICS_REQUIRE_AUTH is set
+    METRICS_DIR = os.getenv("METRICS_DIR")
+    METRICS_FLUSH_INTERVAL = 5
+    METRICS_AUTH_TOKEN = os.getenv("METRICS_AUTH_TOKEN")
+    METRICS_REQUIRE_AUTH = False
 
 
 class DevelopmentConfig(Config):
@@ -30,6 +150,9 @@ class TestingConfig(Config):
 
 class ProductionConfig(Config):
     DEBUG = False
+    METRICS_REQUIRE_AUTH = True
+    # no fallback, the app does not start without a DATABASE_URL
+    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
 
 
 config_by_name = dict(dev=DevelopmentConfig, test=TestingConfig, prod=ProductionConfig)
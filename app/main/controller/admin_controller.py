@@ -0,0 +1,192 @@
+"""
+Problem Domain:
+
+Admin Controller handles the platform diagnostics requests of the platform admin
+"""
+
+from flask_restplus import Resource, inputs
+from flask import send_from_directory
+from ..util.dto import AdminDto
+from ..exceptions import ProfileNotFound
+from ..service.profile_service import get_recent_profiles, get_profile_file
+from ..service.user_service import get_quota_usage_page
+from ..util.decorator import login_required, admin_required
+from ..util.serializer import marshal_list_with
+from .. import db, response_cache
+from flask import current_app
+
+api = AdminDto.api
+parser_one = api.parser()
+parser_two = api.parser()
+parser_three = api.parser()
+parser_quota = api.parser()
+profile_res_data = AdminDto.profile_res_data
+quota_usage_res_data = AdminDto.quota_usage_res_data
+
+parser_one.add_argument(
+    "limit", type=int, required=False, help="number of profiles", location="args"
+)
+parser_two.add_argument(
+    "Authorization",
+    required=True,
+    help="Valid Auth token is required",
+    location="headers",
+)
+parser_three.add_argument(
+    "format",
+    required=False,
+    default="prof",
+    choices=("prof", "txt"),
+    help="prof for the raw cProfile stats, txt for the call tree",
+    location="args",
+)
+parser_quota.add_argument(
+    "limit", type=int, required=False, help="page size", location="args"
+)
+parser_quota.add_argument(
+    "cursor",
+    required=False,
+    help="next_cursor returned along with the previous page",
+    location="args",
+)
+parser_quota.add_argument(
+    "min_usage",
+    type=float,
+    required=False,
+    help="only users who used at least this percentage of their quota, e.g 90",
+    location="args",
+)
+parser_quota.add_argument(
+    "drifted",
+    type=inputs.boolean,
+    required=False,
+    default=False,
+    help="only users whose quota remaining does not match their resources",
+    location="args",
+)
+
+
+@api.route("/profiles")
+class RequestProfiles(Resource):
+    @api.doc("list of the recent request profiles")
+    @login_required
+    @admin_required
+    @api.expect(parser_one, parser_two)
+    @api.marshal_list_with(profile_res_data, envelope="data")
+    def get(self, user_data=None, *args, **kwargs):
+        """
+        :purpose: Lists the most recent request profiles, newest first
+
+        Note:
+        * Login Required
+        * Only Platform Admin is allowed to access the request profiles
+        * Requests are profiled when sampled by PROFILE_SAMPLE_RATE or when a platform admin
+          sends the X-Profile header, the name of the profile is returned in the X-Profile-Id
+          response header
+
+        **Important
+        * Copy the auth token from login operation above and paste it in the Authorization header field below
+        """
+        try:
+            current_app.logger.info("Request to list request profiles")
+
+            args = parser_one.parse_args()
+            res = get_recent_profiles(args["limit"])
+            resp_obj = dict()
+            resp_obj["status"] = "success"
+            resp_obj["data"] = res
+            resp_obj["message"] = "Returned {} request profiles".format(len(res))
+
+        except Exception as e:
+            resp_obj = {"status": "fail", "message": str(e)}
+
+            return resp_obj, 400
+        else:
+            return resp_obj, 200
+
+
+@api.route("/profiles/<name>")
+@api.doc(params={"name": "profile name"})
+class RequestProfile(Resource):
+    @api.doc("download a request profile")
+    @login_required
+    @admin_required
+    @api.expect(parser_three, parser_two)
+    @api.produces(["application/octet-stream", "text/plain"])
+    def get(self, name, user_data=None, *args, **kwargs):
+        """
+        :purpose: Downloads a request profile
+
+        Note:
+        * Login Required
+        * Only Platform Admin is allowed to download the request profiles
+        * the prof format loads with pstats, snakeviz or flameprof to render a flamegraph
+
+        **Important
+        * Copy the auth token from login operation above and paste it in the Authorization header field below
+        """
+        try:
+            args = parser_three.parse_args()
+            directory, filename = get_profile_file(name, "." + args["format"])
+        except ProfileNotFound as e:
+            resp_obj = {"status": "fail", "message": str(e)}
+
+            return resp_obj, 404
+        except Exception as e:
+            resp_obj = {"status": "fail", "message": str(e)}
+
+            return resp_obj, 400
+        else:
+            return send_from_directory(directory, filename, as_attachment=True)
+
+
+@api.route("/quota-usage")
+class QuotaUsage(Resource):
+    @api.doc("quota usage of the platform users")
+    @login_required
+    @admin_required
+    @api.expect(parser_quota, parser_two)
+    # every resource write invalidates the users tag
+    @response_cache.cached("users")
+    @db.read_only
+    @marshal_list_with(quota_usage_res_data, envelope="data")
+    def get(self, user_data=None, *args, **kwargs):
+        """
+        :purpose: Fetches the quota usage of the platform users along with their actual number
+                  of resources
+
+        Note:
+        * Login Required
+        * Only Platform Admin is allowed to audit the user quotas
+        * min_usage keeps the users with a quota who used at least that percentage of it
+        * drifted keeps the users with a quota whose quota_remaining does not match the quota
+          minus their resources, quota_drift tells by how much
+        * Users are returned a page at a time, pass the next_cursor of a page as cursor to
+          fetch the next one, next_cursor is empty on the last page
+
+        **Important
+        * Copy the auth token from login operation above and paste it in the Authorization header field below
+        """
+        try:
+            current_app.logger.info("Request to fetch the quota usage of the users")
+
+            args = parser_quota.parse_args()
+            if args["min_usage"] is not None and args["min_usage"] < 0:
+                raise ValueError("Sorry! min_usage must be a positive percentage")
+
+            res, next_cursor = get_quota_usage_page(
+                args["limit"], args["cursor"], args["min_usage"], args["drifted"]
+            )
+            resp_obj = dict()
+            resp_obj["status"] = "success"
+            resp_obj["data"] = res
+            resp_obj["next_cursor"] = next_cursor
+            if not res:
+                resp_obj["message"] = "currently no user matches the given filters"
+
+        except Exception as e:
+            resp_obj = {"status": "fail", "message": str(e)}
+
+            return resp_obj, 400
+        else:
+            return resp_obj, 200
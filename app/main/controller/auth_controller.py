@@ -88,3 +88,35 @@ class UserLogout(Resource):
             resp_obj = {"status": "fail", "message": str(e)}
 
             return resp_obj, 200
+
+
+@api.route("/logout_all")
+class UserLogoutEverywhere(Resource):
+    """ User Logout from all sessions Resource """
+
+    @api.doc("User Logout from all sessions")
+    @api.expect(parser, validate=True)
+    def post(self):
+        """
+        :purpose: Logout User from every session and invalidate all of the user auth tokens
+
+        Note:
+        * User has to Login first and send valid auth token in header to Logout
+        * Every auth token issued to the user so far stops working, including the one sent
+
+        **Important
+        * Copy the auth token from login operation above and paste it in the Authorization header field below
+        """
+        auth_header = request.headers.get("Authorization")
+
+        if auth_header:
+            res, http_status = logout_user_everywhere(auth_header)
+
+            return res, http_status
+        else:
+            resp_obj = {
+                "status": "fail",
+                "message": "Please Provide a Valid Auth Token!",
+            }
+
+            return resp_obj, 403
@@ -3,11 +3,14 @@ Problem Domain:
 
 Resource Controller handles all the requests to fetch user resource related details
 """
+import json
+
 from flask_restplus import Resource
-from flask import request
+from flask import request, Response, stream_with_context
 from ..util.dto import ResourceDto
 from ..exceptions import (
     UserResourceNotFound,
+    ResourceConflict,
     ResourceLimitExceeded,
     ResourceNotFound,
     UserNotFound,
@@ -15,15 +18,21 @@ from ..exceptions import (
 from ..exceptions import InvalidAction
 from ..service.user_service import get_user_by_id
 from ..service.resource_service import *
-from ..service.user_service import create_new_user_resource
+from ..service.user_service import create_new_user_resource, create_new_user_resources
 from ..service.auth_service import is_same_as_loggedin_user
 from ..util.decorator import login_required, admin_required
+from ..util.etag import etag_header, make_etag, not_modified
+from ..util.serializer import marshal_list_with
+from .. import db, response_cache
 from flask import current_app
 
 api = ResourceDto.api
 parser_one = api.parser()
 parser_two = api.parser()
+parser_page = api.parser()
 resource_req_data = ResourceDto.resource_req_data
+resource_bulk_req_data = ResourceDto.resource_bulk_req_data
+resource_bulk_delete_req_data = ResourceDto.resource_bulk_delete_req_data
 resource_res_data = ResourceDto.resource_res_data
 
 parser_one.add_argument("resource_id", required=False, default=None, location="args")
@@ -33,6 +42,15 @@ parser_two.add_argument(
     help="Valid Auth token is required",
     location="headers",
 )
+parser_page.add_argument(
+    "limit", type=int, required=False, help="page size", location="args"
+)
+parser_page.add_argument(
+    "cursor",
+    required=False,
+    help="next_cursor returned along with the previous page",
+    location="args",
+)
 
 
 @api.route("/")
@@ -40,14 +58,18 @@ class AllPlatformResources(Resource):
     @api.doc("list of all platform resources")
     @login_required
     @admin_required
-    @api.expect(parser_two)
-    @api.marshal_list_with(resource_res_data, envelope="data")
+    @api.expect(parser_page, parser_two)
+    @response_cache.cached("resources")
+    @db.read_only
+    @marshal_list_with(resource_res_data, envelope="data")
     def get(self, user_data=None, *args, **kwargs):
         """
         :purpose: Fetches the details of all the platform resources
 
         Note:
         * Only Platform Admin is allowed to access the list of all platform resource
+        * Resources are returned a page at a time, pass the next_cursor of a page as cursor to
+          fetch the next one, next_cursor is empty on the last page
 
         **Important
         * Copy the auth token from login operation above and paste it in the Authorization header field below
@@ -57,12 +79,16 @@ class AllPlatformResources(Resource):
 
             current_app.logger.info("Request to fetch all platform resources")
 
-            res = get_all_platform_resources()
+            args = parser_page.parse_args()
+            res, next_cursor = get_platform_resources_page(
+                args["limit"], args["cursor"]
+            )
             resp_obj["status"] = "success"
             resp_obj["message"] = (
-                "Total of " + str(len(res)) + " Resources exists on the platform!"
+                "Returned " + str(len(res)) + " Resources of the platform!"
             )
             resp_obj["data"] = res
+            resp_obj["next_cursor"] = next_cursor
 
             if not res:
                 resp_obj[
@@ -76,12 +102,54 @@ class AllPlatformResources(Resource):
             return resp_obj, 200
 
 
+@api.route("/export")
+class ExportPlatformResources(Resource):
+    @api.doc("export all platform resources")
+    @login_required
+    @admin_required
+    @api.expect(parser_two)
+    @api.produces(["application/x-ndjson"])
+    def get(self, user_data=None, *args, **kwargs):
+        """
+        :purpose: Streams all the platform resources as newline delimited json
+
+        Note:
+        * Only Platform Admin is allowed to export the platform resources
+        * Every line of the response is one resource object ordered by resource id
+        * Rows are streamed as they are read so the response size is not bounded by memory
+
+        **Important
+        * Copy the auth token from login operation above and paste it in the Authorization header field below
+        """
+        current_app.logger.info("Request to export all platform resources")
+
+        chunk_size = current_app.config["EXPORT_CHUNK_SIZE"]
+
+        def generate():
+            for user_id, resource_id, resource_name in iter_platform_resources(
+                chunk_size
+            ):
+                yield json.dumps(
+                    {
+                        "user_id": user_id,
+                        "resource_id": resource_id,
+                        "resource_name": resource_name,
+                    }
+                ) + "\n"
+
+        return Response(
+            stream_with_context(generate()), mimetype="application/x-ndjson"
+        )
+
+
 @api.route("/<user_id>")
 class AllUserResources(Resource):
     @api.doc("list of all user resources")
     @login_required
-    @api.expect(parser_two)
-    @api.marshal_list_with(resource_res_data, envelope="data")
+    @db.read_only
+    @api.expect(parser_page, parser_two)
+    @api.response(304, "user resources not modified since the If-None-Match etag")
+    @marshal_list_with(resource_res_data, envelope="data")
     def get(self, user_id, user_data=None, *args, **kwargs):
         """
         :purpose: Fetches the details of all the resources of a particular user
@@ -91,6 +159,10 @@ class AllUserResources(Resource):
         * Current Logged in user is allowed to list only his resources and cannot access
           other users resource
         * Platform Admin can access any users all resources
+        * Resources are returned a page at a time, pass the next_cursor of a page as cursor to
+          fetch the next one, next_cursor is empty on the last page
+        * Pages carry an ETag, send it back in If-None-Match to get an empty 304 response
+          while the user resources have not changed
 
         **Important
         * Copy the auth token from login operation above and paste it in the Authorization header field below
@@ -99,6 +171,7 @@ class AllUserResources(Resource):
             current_loggedin_user = user_data["user_id"]
             is_loggedin_user_admin = user_data["platform_admin"]
             resp_obj = dict()
+            headers = dict()
             if (
                 is_same_as_loggedin_user(user_id, current_loggedin_user)
                 or is_loggedin_user_admin
@@ -106,10 +179,30 @@ class AllUserResources(Resource):
                 current_app.logger.info(
                     "Request to fetch a particular users all resources"
                 )
-                res = get_user_resources(user_id=user_id)
+                args = parser_page.parse_args()
+
+                # read before the page so the etag is never newer than the page it is sent with
+                version = get_user_resource_version(user_id)
+                if version is not None:
+                    etag = make_etag(
+                        user_id,
+                        version,
+                        args["limit"],
+                        args["cursor"],
+                        request.headers.get(current_app.config["RESTPLUS_MASK_HEADER"]),
+                    )
+                    resp = not_modified(etag)
+                    if resp is not None:
+                        return resp
+                    headers = etag_header(etag)
+
+                res, next_cursor = get_user_resources_page(
+                    user_id, args["limit"], args["cursor"]
+                )
 
                 resp_obj["status"] = "success"
                 resp_obj["data"] = res
+                resp_obj["next_cursor"] = next_cursor
                 if not res:
                     resp_obj[
                         "message"
@@ -125,7 +218,7 @@ class AllUserResources(Resource):
 
             return resp_obj, 400
         else:
-            return resp_obj, 200
+            return resp_obj, 200, headers
 
     @login_required
     @api.expect(resource_req_data, parser_two, validate=True)
@@ -233,3 +326,132 @@ class AllUserResources(Resource):
             resp_obj = {"status": "fail", "message": str(e)}
 
             return resp_obj, 400
+
+
+@api.route("/<user_id>/bulk")
+class BulkUserResources(Resource):
+    @login_required
+    @api.expect(resource_bulk_req_data, parser_two, validate=True)
+    @api.response(201, "user resources created successfully!")
+    def post(self, user_id, user_data=None, *args, **kwargs):
+        """
+        :purpose: creates a batch of new user resources
+
+        Note:
+        * Login Required
+        * Current Logged in user is allowed to create only his resources
+          and cannot create resources for other users
+        * Platform Admin can create resources for any user
+        * The quota is checked once for the whole batch, either all the resources are created or
+          none of them
+        * Returns the ids of the created resources in the order of the given names
+
+        **Important
+        * Copy the auth token from login operation above and paste it in the Authorization header field below
+        """
+        try:
+            current_loggedin_user = user_data["user_id"]
+            is_loggedin_user_admin = user_data["platform_admin"]
+
+            if (
+                is_same_as_loggedin_user(user_id, current_loggedin_user)
+                or is_loggedin_user_admin
+            ):
+                resource_names = request.json["resource_names"]
+
+                if len(resource_names) > current_app.config["MAX_BULK_RESOURCES"]:
+                    raise ValueError(
+                        "Sorry! at most {} resources can be created at once".format(
+                            current_app.config["MAX_BULK_RESOURCES"]
+                        )
+                    )
+
+                resource_ids = create_new_user_resources(user_id, resource_names)
+
+                resp_obj = {
+                    "status": "success",
+                    "message": "user resources created successfully!",
+                    "data": resource_ids,
+                }
+            else:
+                raise InvalidAction("Permission Denied!")
+        except InvalidAction as e:
+            resp_obj = {"status": "fail", "message": str(e)}
+
+            return resp_obj, 401
+        except ResourceLimitExceeded as e:
+            resp_obj = {"status": "fail", "message": str(e)}
+
+            return resp_obj, 422
+        except Exception as e:
+            resp_obj = {"status": "fail", "message": str(e)}
+
+            return resp_obj, 400
+        else:
+            return resp_obj
+
+    @login_required
+    @api.doc("delete a batch of user resources")
+    @api.expect(resource_bulk_delete_req_data, parser_two, validate=True)
+    @api.response(201, "user resources deleted successfully!")
+    def delete(self, user_id, user_data=None, *args, **kwargs):
+        """
+        :purpose: deletes the given user resources
+
+        Note:
+        * Login Required
+        * user can delete only his resources and cannot delete other users resources
+        * Platform Admin can delete any users resources
+        * The ids that do not belong to an existing resource of the user are returned as not_found
+
+        **Important
+        * Copy the auth token from login operation above and paste it in the Authorization header field below
+        """
+        try:
+            current_loggedin_user = user_data["user_id"]
+            is_loggedin_user_admin = user_data["platform_admin"]
+
+            # check if the current logged in user is same as requested user or platform admin
+            if (
+                is_same_as_loggedin_user(user_id, current_loggedin_user)
+                or is_loggedin_user_admin
+            ):
+                resource_ids = request.json["resource_ids"]
+
+                if len(resource_ids) > current_app.config["MAX_BULK_RESOURCES"]:
+                    raise ValueError(
+                        "Sorry! at most {} resources can be deleted at once".format(
+                            current_app.config["MAX_BULK_RESOURCES"]
+                        )
+                    )
+
+                user = get_user_by_id(user_id)
+                res = delete_user_resources(user, resource_ids)
+
+                resp_obj = {
+                    "status": "success",
+                    "message": "{} user resources deleted successfully!".format(
+                        len(res["deleted"])
+                    ),
+                    "data": res,
+                }
+
+                return resp_obj
+            else:
+                raise InvalidAction("Permission Denied!")
+        except InvalidAction as e:
+            resp_obj = {"status": "fail", "message": str(e)}
+
+            return resp_obj, 401
+        except ResourceConflict as e:
+            resp_obj = {"status": "fail", "message": str(e)}
+
+            return resp_obj, 409
+        except UserNotFound as e:
+            resp_obj = {"status": "fail", "message": str(e)}
+
+            return resp_obj, 404
+        except Exception as e:
+            resp_obj = {"status": "fail", "message": str(e)}
+
+            return resp_obj, 400
@@ -3,6 +3,10 @@ Problem Domain:
 
 User Controller handles all the requests to fetch user related details
 """
+
+import io
+from itertools import islice
+
 from flask_restplus import Resource
 from flask import request
 from ..util.dto import UserDto
@@ -10,13 +14,20 @@ from ..service.auth_service import is_same_as_loggedin_user
 from ..service.user_service import *
 from ..exceptions import InvalidAction
 from ..util.decorator import login_required, admin_required
+from ..util.serializer import marshal_list_with
+from .. import db, response_cache
+from ..util.user_import import FORMATS, read_users
 from flask import current_app
 
 api = UserDto.api
 parser_one = api.parser()
 parser_two = api.parser()
+parser_page = api.parser()
+parser_import = api.parser()
 user_req_data = UserDto.user_req_model
 user_res_data = UserDto.user_res_model
+user_page_res_data = UserDto.user_page_res_model
+user_import_res = UserDto.user_import_res
 
 parser_one.add_argument("new_user_quota", required=True, location="args")
 parser_two.add_argument(
@@ -25,6 +36,22 @@ parser_two.add_argument(
     help="Valid Auth token is required",
     location="headers",
 )
+parser_page.add_argument(
+    "limit", type=int, required=False, help="page size", location="args"
+)
+parser_page.add_argument(
+    "cursor",
+    required=False,
+    help="next_cursor returned along with the previous page",
+    location="args",
+)
+parser_import.add_argument(
+    "format",
+    required=False,
+    choices=FORMATS,
+    help="format of the request body, taken from its Content-Type if not given",
+    location="args",
+)
 
 
 @api.route("/")
@@ -32,8 +59,10 @@ class ListAndCreateUser(Resource):
     @api.doc("list of all platform registered users")
     @login_required
     @admin_required
-    @api.expect(parser_two)
-    @api.marshal_list_with(user_res_data, envelope="data")
+    @api.expect(parser_page, parser_two)
+    @response_cache.cached("users")
+    @db.read_only
+    @marshal_list_with(user_page_res_data, envelope="data")
     def get(self, user_data=None, *args, **kwargs):
         """
         :purpose: Fetches the details of all the platform users.
@@ -41,6 +70,8 @@ class ListAndCreateUser(Resource):
         Note:
         * Login Required
         * Only Platform Admin is allowed to access the details of all the platform users
+        * Users are returned a page at a time, pass the next_cursor of a page as cursor to
+          fetch the next one, next_cursor is empty on the last page
 
         **Important
         * Copy the auth token from login operation above and paste it in the Authorization header field below
@@ -48,10 +79,12 @@ class ListAndCreateUser(Resource):
         try:
             current_app.logger.info("Request to fetch user details")
 
-            res = get_all_platform_users()
+            args = parser_page.parse_args()
+            res, next_cursor = get_platform_users_page(args["limit"], args["cursor"])
             resp_obj = dict()
             resp_obj["status"] = "success"
             resp_obj["data"] = res
+            resp_obj["next_cursor"] = next_cursor
             if not res:
                 resp_obj["message"] = "currently no users exists on this platform"
 
@@ -100,6 +133,7 @@ class ListAndCreateUser(Resource):
 class User(Resource):
     @api.doc("list user info")
     @login_required
+    @db.read_only
     @api.expect(parser_two)
     @api.marshal_with(user_res_data)
     def get(self, user_id, user_data=None, *args, **kwargs):
@@ -246,3 +280,101 @@ class User(Resource):
             return resp_json, 400
         else:
             return resp_json, 200
+
+
+@api.route("/<user_id>/logout")
+@api.doc(params={"user_id": "user id"})
+class UserForceLogout(Resource):
+    @api.doc("Logout user from all sessions")
+    @login_required
+    @admin_required
+    @api.expect(parser_two)
+    def post(self, user_id, user_data=None, *args, **kwargs):
+        """
+        :purpose: invalidates all the auth tokens issued to the given user
+
+        Note:
+        * Login required
+        * Only platform admin can force logout a platform user
+        * the user has to login again to receive a new auth token
+
+        **Important
+        * Copy the auth token from login operation above and paste it in the Authorization header field below
+        """
+        try:
+            revoke_user_tokens(user_id)
+
+            resp_json = {
+                "status": "success",
+                "message": "user logged out from all sessions!",
+            }
+        except UserNotFound as e:
+            resp_json = {"status": "fail", "message": str(e)}
+
+            return resp_json, 404
+        except Exception as e:
+            resp_json = {"status": "fail", "message": str(e)}
+
+            return resp_json, 400
+        else:
+            return resp_json, 200
+
+
+@api.route("/import")
+class ImportUsers(Resource):
+    @api.doc("bulk import platform users")
+    @login_required
+    @admin_required
+    @api.expect(parser_import, parser_two)
+    @api.marshal_with(user_import_res)
+    def post(self, user_data=None, *args, **kwargs):
+        """
+        :purpose: creates platform users in bulk from a csv or newline delimited json body
+
+        Note:
+        * Login required
+        * Only platform admin can import users
+        * csv bodies start with a header row naming the email, password and optionally
+          user_quota columns, ndjson bodies hold one such object per line
+        * Send the body as text/csv or application/x-ndjson or pass the format argument
+        * Rows are imported in batches, a row that cannot be imported does not stop the
+          others, the outcome of every row is returned
+        * At most IMPORT_MAX_ROWS rows are accepted per request, use manage.py import_users
+          for larger imports
+
+        **Important
+        * Copy the auth token from login operation above and paste it in the Authorization header field below
+        """
+        try:
+            current_app.logger.info("Request to import users")
+
+            args = parser_import.parse_args()
+            fmt = args["format"] or (
+                "csv" if request.mimetype == "text/csv" else "ndjson"
+            )
+            lines = io.TextIOWrapper(request.stream, encoding="utf-8")
+
+            # rows are read before any is imported so an oversized body imports nothing
+            max_rows = current_app.config["IMPORT_MAX_ROWS"]
+            rows = list(islice(read_users(lines, fmt), max_rows + 1))
+            if len(rows) > max_rows:
+                raise ValueError(
+                    "Sorry! at most {} users can be imported at once".format(max_rows)
+                )
+
+            res = import_users(rows, current_app.config["IMPORT_CHUNK_SIZE"])
+            created = sum(1 for result in res if result["status"] == "created")
+
+            resp_obj = {
+                "status": "success",
+                "message": "Imported {} of {} users".format(created, len(res)),
+                "created": created,
+                "skipped": len(res) - created,
+                "data": res,
+            }
+        except Exception as e:
+            resp_obj = {"status": "fail", "message": str(e)}
+
+            return resp_obj, 400
+        else:
+            return resp_obj, 200
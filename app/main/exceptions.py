@@ -25,5 +25,17 @@ class ResourceNotFound(Exception):
     pass
 
 
+class ResourceConflict(Exception):
+    pass
+
+
 class InvalidAction(Exception):
     pass
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class ProfileNotFound(Exception):
+    pass
@@ -11,6 +11,10 @@ class CResource(db.Model):
     """represents chainstack_platform resource"""
 
     __tablename__ = "resource"
+    # per user listing and deletes filter on user_id and page through resource_id
+    __table_args__ = (
+        db.Index("ix_resource_user_id_resource_id", "user_id", "resource_id"),
+    )
 
     resource_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     resource_name = db.Column(db.String(100), nullable=False)
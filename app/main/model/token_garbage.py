@@ -3,7 +3,9 @@ Problem Domain:
 
 Token Garbage represents a store to dump the used auth token
 """
-from .. import db
+import datetime
+import jwt
+from .. import db, revoked_token_filter
 
 
 class TokenGarbage(db.Model):
@@ -13,14 +15,18 @@ class TokenGarbage(db.Model):
     token_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     token = db.Column(db.String(255), unique=True, nullable=False)
     dumped_on = db.Column(db.DateTime, nullable=True)
+    expires_on = db.Column(db.DateTime, nullable=True, index=True)
 
-    def __init__(self, token, dumped_on=None):
+    def __init__(self, token, dumped_on=None, expires_on=None):
         """
         :param token: auth_token that is to be dumped
+        :param dumped_on: time at which the token was dumped
+        :param expires_on: expiry of the auth token, the row can be purged after this time
         :returns None:
         """
         self.token = token
         self.dumped_on = dumped_on
+        self.expires_on = expires_on
 
     def __repr__(self):
         """
@@ -31,6 +37,51 @@ class TokenGarbage(db.Model):
         """
         return "<id token: {}".format(self.token)
 
+    @staticmethod
+    def token_expiry(auth_token):
+        """
+        :param auth_token: input auth_token
+        :return datetime: utc expiry of the auth token, None if it carries no expiry
+        purpose:
+        reads the exp claim without verifying the signature, the token was already verified
+        """
+        try:
+            exp = jwt.decode(auth_token, verify=False).get("exp")
+        except jwt.InvalidTokenError:
+            return None
+
+        return datetime.datetime.utcfromtimestamp(exp) if exp else None
+
+    @staticmethod
+    def sync_filter():
+        """
+        :return None:
+        purpose:
+        pulls the tokens dumped since the last sync into the in-process revoked token filter,
+        along with the rows committed late within the ids skipped by the recent syncs
+        """
+        if revoked_token_filter.needs_refresh():
+            rows = (
+                db.session.query(TokenGarbage.token_id, TokenGarbage.token)
+                .filter(
+                    db.or_(
+                        TokenGarbage.token_id > revoked_token_filter.last_token_id,
+                        *[
+                            TokenGarbage.token_id.between(low, high)
+                            for low, high in revoked_token_filter.pending_gaps()
+                        ]
+                    )
+                )
+                .filter(
+                    db.or_(
+                        TokenGarbage.expires_on.is_(None),
+                        TokenGarbage.expires_on > datetime.datetime.utcnow(),
+                    )
+                )
+                .all()
+            )
+            revoked_token_filter.update(rows)
+
     @staticmethod
     def is_dumped(auth_token):
         """
@@ -38,7 +89,13 @@ class TokenGarbage(db.Model):
         :return Booleans:
         purpose:
         checks if the given auth_token is blacklisted_token returns True if blacklisted, False otherwise
+        the tokengarbage table is only queried when the revoked token filter reports a possible match
         """
+        TokenGarbage.sync_filter()
+
+        if auth_token not in revoked_token_filter:
+            return False
+
         res = TokenGarbage.query.filter_by(token=auth_token).first()
 
         return True if res else False
@@ -4,12 +4,16 @@ Problem Domain
 Design a User model that represents the chainstack_platform users
 """
 import datetime
+import hashlib
+import time
 import jwt
 import flask_bcrypt
 from ..model.token_garbage import TokenGarbage
-from .. import db, flask_bcrypt
+from .. import db, password_hasher, verified_token_cache
 from ..config import key
 
+# validity of the issued auth tokens
+AUTH_TOKEN_LIFETIME = datetime.timedelta(days=1, seconds=10)
 
 class User(db.Model):
     """User Model represents chainstack_platform users"""
@@ -23,6 +27,10 @@ class User(db.Model):
     user_registered_on = db.Column(db.DateTime, nullable=False)
     user_quota = db.Column(db.Integer, nullable=False, default=-1)
     quota_remaining = db.Column(db.Integer, nullable=False, default=-1)
+    # bumped to revoke every auth token issued to this user so far
+    token_version = db.Column(db.Integer, nullable=False, default=0)
+    # bumped on every change of the user resources, the ETag of the resource listing
+    resource_version = db.Column(db.Integer, nullable=False, default=0)
     resources = db.relationship(
         "CResource", backref="user", cascade="all, delete-orphan", lazy="dynamic"
     )
@@ -33,12 +41,10 @@ class User(db.Model):
 
     @password.setter
     def password(self, password: str):
-        self.password_hash = flask_bcrypt.generate_password_hash(password).decode(
-            "utf-8"
-        )
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password: str):
-        return flask_bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.check(self.password_hash, password)
 
     def user_quota_set(self):
         """
@@ -64,19 +70,20 @@ class User(db.Model):
         return status
 
     @staticmethod
-    def encode_auth_token(user_id):
+    def encode_auth_token(user_id, token_version=0):
         """
         :param user_id: user id of the user
+        :param token_version: current token version of the user
         :returns String: String encoded auth token
         :raise Exception: if unable to encode auth_token
         purpose: Generates the auth token for the given user_id along with other information
         """
         try:
             payload = {
-                "exp": datetime.datetime.utcnow()
-                + datetime.timedelta(days=1, seconds=10),
+                "exp": datetime.datetime.utcnow() + AUTH_TOKEN_LIFETIME,
                 "iat": datetime.datetime.utcnow(),
                 "sub": str(user_id),
+                "ver": token_version,
             }
 
             return jwt.encode(payload, key, algorithm="HS256")
@@ -84,28 +91,63 @@ class User(db.Model):
             raise e
 
     @staticmethod
-    def decode_auth_token(auth_token):
+    def token_cache_key(auth_token):
+        """
+        :param auth_token: input auth token
+        :returns String: digest of the auth token used as the verified token cache key
+        """
+        return hashlib.sha256(auth_token.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def decode_auth_payload(auth_token):
         """
         :param auth_token:
-        :returns String: decoded auth token
+        :returns dict: decoded sub, exp and ver claims of the auth token
         :raises:
         ExpiredSignatureError: If the signature has expired
         InvalidTokenError: If the token has expired
-        purpose: Decodes the given auth token and returns the string payload value, raises Exception otherwise
+        purpose: Decodes the given auth token and returns its payload, raises Exception otherwise
+        verified payloads are cached until the token expiry so the signature is checked once per token
         """
         try:
-            payload = jwt.decode(auth_token, key)
+            cache_key = User.token_cache_key(auth_token)
+            payload = verified_token_cache.get(cache_key)
+
+            if payload is None:
+                payload = jwt.decode(auth_token, key)
+                # tokens issued before token versions were introduced are version 0
+                payload = {
+                    "sub": payload["sub"],
+                    "exp": payload["exp"],
+                    "ver": payload.get("ver", 0),
+                }
+                verified_token_cache.set(
+                    cache_key, payload, ttl=payload["exp"] - time.time()
+                )
+
             is_token_dumped = TokenGarbage.is_dumped(auth_token)
 
             if is_token_dumped:
                 raise jwt.InvalidTokenError("Received Invalid Token login again")
             else:
-                return payload["sub"]
+                return payload
 
         except jwt.ExpiredSignatureError as e:
             raise e
         except jwt.InvalidTokenError as e:
             raise e
 
+    @staticmethod
+    def decode_auth_token(auth_token):
+        """
+        :param auth_token:
+        :returns String: decoded auth token
+        :raises:
+        ExpiredSignatureError: If the signature has expired
+        InvalidTokenError: If the token has expired
+        purpose: Decodes the given auth token and returns the string payload value, raises Exception otherwise
+        """
+        return User.decode_auth_payload(auth_token)["sub"]
+
     def __repr__(self):
         return "<User '{}'>".format(self.email)
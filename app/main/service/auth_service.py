@@ -4,9 +4,14 @@ Auth Service provides login and logout service
 assumptions:
 When the user logs out then he cannot use the same token to login again and hence added to black listed token
 """
-from datetime import datetime
+import jwt
 from ..model.user import User
-from .user_service import get_user_by_email, get_user_by_id
+from .user_service import (
+    get_user_by_email,
+    get_user_principal,
+    get_user_token_version,
+    revoke_user_tokens,
+)
 from ..service.token_garbage_service import dump_token
 from ...main.exceptions import UserNotFound
 
@@ -19,7 +24,7 @@ def login_user(data):
     user = get_user_by_email(email)
 
     if user and user.check_password(password):
-        auth_token = User.encode_auth_token(user.user_id)
+        auth_token = User.encode_auth_token(user.user_id, user.token_version)
         if auth_token:
             res_obj = {
                 "status": "success",
@@ -34,6 +39,27 @@ def login_user(data):
         )
 
 
+def get_token_principal(auth_token) -> dict:
+    """
+    :param auth_token: input auth token
+    :return dict: user details of the user the auth token was issued to
+    :raises:
+    InvalidTokenError: If the token is expired, dumped or was issued before the user token
+    version was bumped
+    UserNotFound: If the user does not exist anymore
+    """
+    payload = User.decode_auth_payload(auth_token)
+    user_dict = get_user_principal(payload["sub"])
+
+    # tokens issued before the user token version was bumped are revoked, the version is
+    # not taken from the longer lived user details so other workers see the bump quickly
+    user_dict["token_version"] = get_user_token_version(payload["sub"])
+    if payload["ver"] != user_dict["token_version"]:
+        raise jwt.InvalidTokenError("Received Invalid Token login again")
+
+    return user_dict
+
+
 def logout_user(data):
     """
     :param data: user Authorization details
@@ -43,16 +69,44 @@ def logout_user(data):
     try:
         auth_token = data if data else ""
         if auth_token:
-            resp = User.decode_auth_token(auth_token)
-            if isinstance(resp, str):
-                # dump this token as user has logout
-                return dump_token(auth_token)
-            else:
-                resp_obj = {"status": "fail", "message": resp}
-                return resp_obj, 401
+            get_token_principal(auth_token)
+
+            # dump this token as user has logout
+            return dump_token(auth_token)
+        else:
+            resp_obj = {"status": "fail", "message": "Provide a valid auth Token"}
+            return resp_obj, 403
+    except (jwt.InvalidTokenError, UserNotFound) as e:
+        resp_obj = {"status": "fail", "message": str(e)}
+        return resp_obj, 401
+    except Exception as e:
+        resp_obj = {"status": "fail", "message": str(e)}
+        return resp_obj, 403
+
+
+def logout_user_everywhere(data):
+    """
+    :param data: user Authorization details
+    :return: logout response
+    :purpose: logout current user from all the sessions and invalidate all of the user auth tokens
+    """
+    try:
+        auth_token = data if data else ""
+        if auth_token:
+            user_dict = get_token_principal(auth_token)
+            revoke_user_tokens(user_dict["user_id"])
+
+            resp_obj = {
+                "status": "success",
+                "message": "successfully logged out from all sessions!",
+            }
+            return resp_obj, 200
         else:
             resp_obj = {"status": "fail", "message": "Provide a valid auth Token"}
             return resp_obj, 403
+    except (jwt.InvalidTokenError, UserNotFound) as e:
+        resp_obj = {"status": "fail", "message": str(e)}
+        return resp_obj, 401
     except Exception as e:
         resp_obj = {"status": "fail", "message": str(e)}
         return resp_obj, 403
@@ -69,20 +123,9 @@ def get_logged_in_user(user_request):
         # get the auth token from the request headers
         auth_token = user_request.headers.get("Authorization")
         if auth_token:
-            user_id = User.decode_auth_token(auth_token)
-            user = get_user_by_id(user_id)
+            user_dict = get_token_principal(auth_token)
 
-            resp_obj = {
-                "status": "success",
-                "data": {
-                    "user_id": str(user.user_id),
-                    "email": user.email,
-                    "registered_on": datetime.strftime(
-                        user.user_registered_on, "%Y-%m-%d %H:%M:%S"
-                    ),
-                    "platform_admin": user.platform_admin,
-                },
-            }
+            resp_obj = {"status": "success", "data": user_dict}
             return resp_obj, 200
         else:
             resp_obj = {"status": "fail", "message": "Provide a valid auth token."}
@@ -0,0 +1,49 @@
+"""
+Problem Domain
+
+This Service lists and fetches the saved request profiles
+"""
+
+import os
+
+from ...main import request_profiler
+from ..exceptions import ProfileNotFound
+from ..util.profiler import PROFILE_NAME
+
+
+def get_recent_profiles(limit=None):
+    """
+    :param limit: number of profiles to return
+    :return list: details of the saved profiles, newest first
+    """
+    profiles = []
+
+    for name, size in request_profiler.list_profiles(limit):
+        _, method, endpoint, elapsed = name.split("-")
+        profiles.append(
+            {
+                "name": name,
+                "method": method,
+                "endpoint": endpoint,
+                "elapsed_ms": int(elapsed[: -len("ms")]),
+                "size": size,
+            }
+        )
+
+    return profiles
+
+
+def get_profile_file(name, extension=".prof"):
+    """
+    :param name: name of the profile
+    :param extension: .prof for the raw stats or .txt for the call tree
+    :return tuple: directory and file name of the profile
+    :raise ProfileNotFound: if no such profile was saved
+    """
+    if not PROFILE_NAME.match(name) or extension not in (".prof", ".txt"):
+        raise ProfileNotFound("Sorry! no such profile exists")
+
+    if not os.path.isfile(os.path.join(request_profiler.directory, name + extension)):
+        raise ProfileNotFound("Sorry! no such profile exists")
+
+    return request_profiler.directory, name + extension
@@ -6,9 +6,11 @@ Design Resource Service class that handles all the user platform related service
 
 from datetime import datetime
 
-from ...main import db
+from ...main import db, response_cache
 from ...main.model.resource import CResource
 from ..model.user import User
+from ..exceptions import ResourceConflict
+from ..util.pagination import Page, paginate
 
 
 def commit_changes(data):
@@ -36,6 +38,45 @@ def get_all_platform_resources() -> list:
     return CResource.query.all()
 
 
+def _resource_rows():
+    # columns in the order of the resource_res fields of the ResourceDto
+    return db.session.query(
+        CResource.user_id, CResource.resource_id, CResource.resource_name
+    )
+
+
+def get_platform_resources_page(limit: int = None, cursor: str = None) -> Page:
+    """
+    :param limit: page size
+    :param cursor: cursor of the page to fetch, first page if None
+    :return Page:
+    :purpose:
+    returns one page of the platform resources ordered by resource id, rows are read as
+    (user_id, resource_id, resource_name) tuples
+    """
+    return paginate(_resource_rows(), CResource.resource_id, limit, cursor)
+
+
+def iter_platform_resources(chunk_size: int = 1000):
+    """
+    :param chunk_size: number of rows fetched from the backend at a time
+    :return generator: (user_id, resource_id, resource_name) tuples ordered by resource id
+    :purpose:
+    iterates over all the platform resources without loading the whole table, rows are read
+    as plain tuples and fetched chunk_size at a time
+    """
+    query = (
+        db.session.query(
+            CResource.user_id, CResource.resource_id, CResource.resource_name
+        )
+        .order_by(CResource.resource_id)
+        .yield_per(chunk_size)
+    )
+
+    for row in query:
+        yield tuple(row)
+
+
 def get_user_resources(user_id: int, resource_id: int = None) -> list:
     """
     :param user_id: input user id
@@ -54,6 +95,135 @@ def get_user_resources(user_id: int, resource_id: int = None) -> list:
     return res
 
 
+def get_user_resources_page(
+    user_id: int, limit: int = None, cursor: str = None
+) -> Page:
+    """
+    :param user_id: input user id
+    :param limit: page size
+    :param cursor: cursor of the page to fetch, first page if None
+    :return Page:
+    :purpose:
+    returns one page of the user resources ordered by resource id, rows are read as
+    (user_id, resource_id, resource_name) tuples
+    """
+    return paginate(
+        _resource_rows().filter(CResource.user_id == user_id),
+        CResource.resource_id,
+        limit,
+        cursor,
+    )
+
+
+def get_user_resource_version(user_id: int):
+    """
+    :param user_id: input user id
+    :return int: version of the user resources, None if the user does not exist
+    :purpose:
+    returns the counter bumped on every change of the user resources with a single primary key
+    lookup, used to answer conditional requests without querying the resources
+    """
+    return (
+        db.session.query(User.resource_version)
+        .filter(User.user_id == user_id)
+        .scalar()
+    )
+
+
+def _delete_resource_chunk(user_id: int, chunk: list):
+    """
+    :param user_id: input user id
+    :param chunk: ids of the user resources to delete
+    :return list: ids of the deleted resources, None if some of them were deleted concurrently
+    :purpose:
+    locks the existing resources of the chunk on backends supporting row locks and deletes
+    exactly those, so the reported ids always match the deleted rows
+    """
+    existing = [
+        resource_id
+        for resource_id, in db.session.query(CResource.resource_id)
+        .filter(CResource.user_id == user_id, CResource.resource_id.in_(chunk))
+        .with_for_update()
+    ]
+
+    if existing:
+        deleted = (
+            db.session.query(CResource)
+            .filter(CResource.resource_id.in_(existing))
+            .delete(synchronize_session=False)
+        )
+        if deleted != len(existing):
+            return None
+
+    return existing
+
+
+def delete_user_resources(user: User, resource_ids: list) -> dict:
+    """
+    :param user: user object
+    :param resource_ids: ids of the user resources to delete
+    :return dict: ids of the deleted resources and of the ones that did not exist
+    :purpose:
+    deletes the given user resources with set based deletes in a single transaction and credits
+    the user remaining quota by the number of deleted rows
+    """
+    resource_ids = sorted(set(int(resource_id) for resource_id in resource_ids))
+    chunk_size = 500
+
+    try:
+        for attempt in range(2):
+            existing = []
+
+            # chunk the id lists to stay under the backend bound parameter limits
+            for i in range(0, len(resource_ids), chunk_size):
+                deleted = _delete_resource_chunk(
+                    user.user_id, resource_ids[i : i + chunk_size]
+                )
+                if deleted is None:
+                    break
+                existing.extend(deleted)
+            else:
+                break
+
+            # another request deleted some of the resources in between, start over once
+            db.session.rollback()
+            if attempt:
+                raise ResourceConflict(
+                    "Sorry! the resources were changed concurrently please retry"
+                )
+
+        if existing:
+            # increment the user remaining quota by the deleted count if the quota is set
+            User.query.filter(User.user_id == user.user_id).update(
+                {
+                    User.quota_remaining: db.case(
+                        [(User.user_quota < 0, User.quota_remaining)],
+                        else_=User.quota_remaining + len(existing),
+                    ),
+                    User.resource_version: User.resource_version + 1,
+                },
+                synchronize_session=False,
+            )
+
+        # commit the change to the backend
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if existing:
+        response_cache.invalidate("users", "resources")
+
+    existing = set(existing)
+
+    return {
+        "deleted": sorted(existing),
+        "not_found": [
+            resource_id for resource_id in resource_ids if resource_id not in existing
+        ],
+    }
+
+
 def delete_user_resource(user: User, resource_id: int = None) -> bool:
     """
     :param user: user object
@@ -77,7 +247,13 @@ def delete_user_resource(user: User, resource_id: int = None) -> bool:
         # increment the user remaining quota by one
         user.quota_remaining += 1
 
+    # flushed with the quota in the same update of the user row
+    user.resource_version = User.resource_version + 1
+
     # commit the change to the backend
     db.session.commit()
 
+    # the quota remaining is part of the user listing
+    response_cache.invalidate("users", "resources")
+
     return True
@@ -3,18 +3,30 @@ Problem Domain
 
 This Service handles all crud operation to save retrive dumped auth tokens
 """
-from ...main import db
+import threading
+from datetime import datetime
+
+from ...main import db, revoked_token_filter, verified_token_cache
 from ..model.token_garbage import TokenGarbage
+from ..model.user import AUTH_TOKEN_LIFETIME, User
 
 
 # dump this token
 def dump_token(auth_token):
-    invalid_token = TokenGarbage(auth_token)
+    invalid_token = TokenGarbage(
+        auth_token,
+        dumped_on=datetime.utcnow(),
+        expires_on=TokenGarbage.token_expiry(auth_token),
+    )
     try:
         # save this token
         db.session.add(invalid_token)
         db.session.commit()
 
+        # make the token visible to this worker's filter without waiting for a refresh
+        revoked_token_filter.add(auth_token)
+        verified_token_cache.pop(User.token_cache_key(auth_token))
+
         res_obj = {"status": "success", "message": "successfully logged out!"}
 
         return res_obj, 200
@@ -22,3 +34,78 @@ def dump_token(auth_token):
         res_obj = {"status": "fail", "message": str(e)}
 
         return res_obj, 200
+
+
+def purge_expired_tokens(batch_size: int = 1000, now: datetime = None) -> int:
+    """
+    :param batch_size: maximum number of rows deleted per transaction
+    :param now: purge tokens that expired before this time, defaults to utc now
+    :return int: number of purged tokens
+    :purpose:
+    deletes dumped tokens whose expiry has passed, an expired token is rejected by its
+    signature check anyway so keeping it in the store is of no use. Tokens whose expiry is
+    unknown, the ones the expiry backfill could not decode, are purged once dumped for longer
+    than the lifetime of an auth token
+    """
+    now = now or datetime.utcnow()
+    purged = 0
+    expired = db.or_(
+        TokenGarbage.expires_on < now,
+        db.and_(
+            TokenGarbage.expires_on.is_(None),
+            TokenGarbage.dumped_on < now - AUTH_TOKEN_LIFETIME,
+        ),
+    )
+
+    while True:
+        token_ids = [
+            token_id
+            for token_id, in db.session.query(TokenGarbage.token_id)
+            .filter(expired)
+            .limit(batch_size)
+        ]
+
+        if not token_ids:
+            break
+
+        purged += (
+            db.session.query(TokenGarbage)
+            .filter(TokenGarbage.token_id.in_(token_ids))
+            .delete(synchronize_session=False)
+        )
+        db.session.commit()
+
+        if len(token_ids) < batch_size:
+            break
+
+    return purged
+
+
+def start_token_purge_scheduler(app, interval: int, batch_size: int = 1000):
+    """
+    :param app: flask app
+    :param interval: seconds between two purges
+    :param batch_size: maximum number of rows deleted per transaction
+    :return Thread: the started daemon thread
+    :purpose: periodically purges the expired dumped tokens in the background
+    """
+    stopped = threading.Event()
+
+    def purge_periodically():
+        while not stopped.wait(interval):
+            with app.app_context():
+                try:
+                    purged = purge_expired_tokens(batch_size)
+                    app.logger.info("Purged {} expired auth tokens".format(purged))
+                except Exception as e:
+                    app.logger.error("Failed to purge expired auth tokens: " + str(e))
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(
+        target=purge_periodically, name="token-purge", daemon=True
+    )
+    thread.stopped = stopped
+    thread.start()
+
+    return thread
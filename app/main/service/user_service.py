@@ -5,13 +5,24 @@ Design a User Service class that handles all the services related to platform us
 """
 
 from datetime import datetime
-
-from ...main import db
+from itertools import islice
+
+from sqlalchemy.exc import IntegrityError
+
+from ...main import (
+    db,
+    import_password_hasher,
+    metrics,
+    principal_cache,
+    response_cache,
+    token_version_cache,
+)
 from ...main.model.user import User
 from ...main.model.resource import CResource
 from ...main.exceptions import UserAlreadyExists, UserNotFound
 
 from ...main.exceptions import ResourceLimitExceeded
+from ..util.pagination import Page, paginate
 
 
 def commit_changes(data):
@@ -35,12 +46,186 @@ def create_new_user(data: dict) -> bool:
         )
 
         commit_changes(new_user)
+        response_cache.invalidate("users")
 
         return True
     else:
         raise UserAlreadyExists("Sorry! User Already Exists")
 
 
+def _validate_import_row(row: dict):
+    """
+    :param row: user read from the import stream
+    :return String: why the row cannot be imported, None if it can
+    """
+    if "_error" in row:
+        return row["_error"]
+    if not all(
+        isinstance(row.get(key), str) and row[key] for key in ("email", "password")
+    ):
+        return "Sorry! email and password are required"
+
+    try:
+        user_quota = row.get("user_quota")
+        row["user_quota"] = -1 if user_quota in (None, "") else int(user_quota)
+    except (TypeError, ValueError):
+        return "Sorry! user_quota must be an integer"
+
+    return None
+
+
+def _import_user_chunk(rows: list, results: list, seen: set):
+    """
+    :param rows: (row number, user dict) tuples of this chunk
+    :param results: per row report the outcome of every row is appended to
+    :param seen: emails of the earlier rows of the import
+    :purpose:
+    creates the new users of the chunk in one transaction, rows still conflicting with
+    concurrently registered emails after one retry are reported as failed
+    """
+    new_rows = []
+    failed = set()
+    for number, row in rows:
+        error = _validate_import_row(row)
+        if error:
+            results.append(
+                {
+                    "row": number,
+                    "email": row.get("email"),
+                    "status": "invalid",
+                    "message": error,
+                }
+            )
+        elif row["email"] in seen:
+            results.append(
+                {
+                    "row": number,
+                    "email": row["email"],
+                    "status": "duplicate",
+                    "message": "Sorry! email repeated in the import",
+                }
+            )
+        else:
+            seen.add(row["email"])
+            new_rows.append((number, row))
+
+    for attempt in range(2):
+        emails = [row["email"] for _, row in new_rows]
+        existing = (
+            {
+                email
+                for email, in db.session.query(User.email).filter(
+                    User.email.in_(emails)
+                )
+            }
+            if emails
+            else set()
+        )
+
+        to_create = [
+            (number, row) for number, row in new_rows if row["email"] not in existing
+        ]
+        hashes = import_password_hasher.hash_many(
+            [row["password"] for _, row in to_create]
+        )
+        now = datetime.utcnow()
+
+        try:
+            db.session.bulk_insert_mappings(
+                User,
+                [
+                    {
+                        "email": row["email"],
+                        "password_hash": password_hash,
+                        "platform_admin": False,
+                        "user_registered_on": now,
+                        "user_quota": row["user_quota"],
+                        "quota_remaining": row["user_quota"],
+                        "token_version": 0,
+                    }
+                    for (_, row), password_hash in zip(to_create, hashes)
+                ],
+            )
+            db.session.commit()
+            break
+        except IntegrityError:
+            # an email was registered concurrently, check the emails again once
+            db.session.rollback()
+            if attempt:
+                failed = {row["email"] for _, row in to_create}
+                to_create = []
+
+    if to_create:
+        response_cache.invalidate("users")
+
+    user_ids = (
+        dict(
+            db.session.query(User.email, User.user_id).filter(
+                User.email.in_([row["email"] for _, row in to_create])
+            )
+        )
+        if to_create
+        else {}
+    )
+
+    for number, row in new_rows:
+        if row["email"] in existing:
+            results.append(
+                {
+                    "row": number,
+                    "email": row["email"],
+                    "status": "exists",
+                    "message": "Sorry! User Already Exists",
+                }
+            )
+        elif row["email"] in failed:
+            results.append(
+                {
+                    "row": number,
+                    "email": row["email"],
+                    "status": "failed",
+                    "message": "Sorry! emails of this batch were registered meanwhile, "
+                    "import the row again",
+                }
+            )
+        else:
+            results.append(
+                {
+                    "row": number,
+                    "email": row["email"],
+                    "status": "created",
+                    "user_id": user_ids.get(row["email"]),
+                }
+            )
+
+
+def import_users(rows, chunk_size: int = 500) -> list:
+    """
+    :param rows: iterable of user dicts with email, password and optionally user_quota
+    :param chunk_size: users checked, hashed and inserted per transaction
+    :return list: outcome of every row, created, exists, duplicate, invalid or failed, in
+                  input order
+    :purpose:
+    creates the users of a bulk import chunk by chunk, the emails of a chunk are checked with a
+    single query, its passwords are hashed in parallel on the import hashing pool and its users
+    are inserted in one transaction, rows of a committed chunk stay created if a later one fails
+    """
+    results = []
+    seen = set()
+    rows = enumerate(rows, start=1)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        chunk_results = []
+        _import_user_chunk(chunk, chunk_results, seen)
+        results.extend(sorted(chunk_results, key=lambda result: result["row"]))
+
+    return results
+
+
 def delete_platform_user(user_id: int) -> bool:
     """
     :param user_id: input user id whose account has to be deleted from this platform
@@ -51,6 +236,9 @@ def delete_platform_user(user_id: int) -> bool:
     # commit the change to the backend
     db.session.commit()
 
+    invalidate_user_principal(user_id)
+    response_cache.invalidate("users", "resources")
+
     return True
 
 
@@ -64,6 +252,80 @@ def get_all_platform_users():
     return User.query.all()
 
 
+def get_platform_users_page(limit: int = None, cursor: str = None) -> Page:
+    """
+    :param limit: page size
+    :param cursor: cursor of the page to fetch, first page if None
+    :return Page:
+    :purpose:
+    returns one page of the platform users ordered by user id, rows are read as tuples of the
+    user_res fields of the UserDto
+
+    Note: only platform admin can access all platform users
+    """
+    rows = db.session.query(
+        User.user_id,
+        User.email,
+        User.user_registered_on,
+        User.user_quota,
+        User.quota_remaining,
+    )
+
+    return paginate(rows, User.user_id, limit, cursor)
+
+
+def get_quota_usage_page(
+    limit: int = None, cursor: str = None, min_usage: float = None, drifted=False
+) -> Page:
+    """
+    :param limit: page size
+    :param cursor: cursor of the page to fetch, first page if None
+    :param min_usage: only users with a quota who used at least this percentage of it
+    :param drifted: only users with a quota whose quota_remaining does not match the quota
+                    minus their actual number of resources
+    :return Page:
+    :purpose:
+    returns one page of the quota usage of the platform users ordered by user id, the
+    resources of every user are counted by a single grouped query joined to the users so the
+    page costs one statement whatever the number of users and resources
+
+    Note: quota_drift is quota_remaining minus what it should be, 0 for users without quota
+    """
+    resource_count = db.func.count(CResource.resource_id)
+    quota_set = User.user_quota >= 0
+
+    rows = (
+        db.session.query(
+            User.user_id,
+            User.email,
+            User.user_quota,
+            User.quota_remaining,
+            resource_count.label("resource_count"),
+            db.case(
+                [(User.user_quota > 0, resource_count * 100.0 / User.user_quota)]
+            ).label("quota_used_percent"),
+            db.case(
+                [(quota_set, User.quota_remaining - User.user_quota + resource_count)],
+                else_=0,
+            ).label("quota_drift"),
+        )
+        # users without resources are kept with a count of 0
+        .outerjoin(CResource, CResource.user_id == User.user_id).group_by(User.user_id)
+    )
+
+    if min_usage is not None:
+        rows = rows.having(
+            db.and_(quota_set, resource_count * 100.0 >= min_usage * User.user_quota)
+        )
+
+    if drifted:
+        rows = rows.having(
+            db.and_(quota_set, User.quota_remaining != User.user_quota - resource_count)
+        )
+
+    return paginate(rows, User.user_id, limit, cursor)
+
+
 def get_user_by_id(user_id: int) -> User:
     """
     :param user_id: input user id
@@ -79,6 +341,86 @@ def get_user_by_id(user_id: int) -> User:
         return user
 
 
+def get_user_principal(user_id) -> dict:
+    """
+    :param user_id: input user id
+    :return dict: user details of the logged in user
+    :purpose:
+    returns the user details used to authorize requests, served from the principal cache
+    and only loaded from the backend on a miss
+    """
+    principal = principal_cache.get(str(user_id))
+
+    if principal is None:
+        user = get_user_by_id(user_id)
+        principal = {
+            "user_id": str(user.user_id),
+            "email": user.email,
+            "registered_on": datetime.strftime(
+                user.user_registered_on, "%Y-%m-%d %H:%M:%S"
+            ),
+            "platform_admin": user.platform_admin,
+            "token_version": user.token_version,
+        }
+        principal_cache.set(principal["user_id"], principal)
+        token_version_cache.set(principal["user_id"], user.token_version)
+
+    return dict(principal)
+
+
+def get_user_token_version(user_id) -> int:
+    """
+    :param user_id: input user id
+    :return int: current token version of the user
+    :purpose:
+    returns the token version auth tokens are checked against, cached for a shorter time
+    than the user details so tokens revoked through another worker are rejected within
+    TOKEN_VERSION_CACHE_TTL seconds
+    """
+    token_version = token_version_cache.get(str(user_id))
+
+    if token_version is None:
+        token_version = (
+            db.session.query(User.token_version).filter_by(user_id=user_id).scalar()
+        )
+        if token_version is None:
+            raise UserNotFound("Sorry User Does not exists!")
+
+        token_version_cache.set(str(user_id), token_version)
+
+    return token_version
+
+
+def invalidate_user_principal(user_id) -> None:
+    """
+    :param user_id: input user id
+    :purpose: drops the cached user details so the next request reloads them
+    """
+    principal_cache.pop(str(user_id))
+    token_version_cache.pop(str(user_id))
+
+
+def revoke_user_tokens(user_id) -> bool:
+    """
+    :param user_id: input user id
+    :return bool:
+    :purpose:
+    invalidates every auth token issued to the user so far by bumping the user token version,
+    other workers reject the old tokens once their cached token version expires
+    """
+    updated = User.query.filter_by(user_id=user_id).update(
+        {User.token_version: User.token_version + 1}, synchronize_session=False
+    )
+    db.session.commit()
+
+    if not updated:
+        raise UserNotFound("Sorry User Does not exists!")
+
+    invalidate_user_principal(user_id)
+
+    return True
+
+
 def get_user_by_email(user_email: str) -> User:
     """
     :param user_email: input user id
@@ -94,32 +436,109 @@ def get_user_by_email(user_email: str) -> User:
         return user
 
 
+def reserve_user_quota(user_id: int, count: int = 1) -> None:
+    """
+    :param user_id: input user id
+    :param count: number of resources to reserve quota for
+    :raise UserNotFound: if the user does not exist
+    :raise ResourceLimitExceeded: if the user has less than count resources remaining in quota
+    :purpose:
+    atomically checks and decrements the user remaining quota with a single conditional update,
+    the reservation is part of the current transaction and is undone if it is rolled back, the
+    same update bumps the user resource version as new resources are about to be created
+    """
+    reserved = (
+        User.query.filter(User.user_id == user_id)
+        .filter(db.or_(User.user_quota < 0, User.quota_remaining >= count))
+        .update(
+            {
+                # users without a quota keep quota_remaining untouched
+                User.quota_remaining: db.case(
+                    [(User.user_quota < 0, User.quota_remaining)],
+                    else_=User.quota_remaining - count,
+                ),
+                User.resource_version: User.resource_version + 1,
+            },
+            synchronize_session=False,
+        )
+    )
+
+    if not reserved:
+        user = get_user_by_id(user_id)
+        metrics.inc("quota_rejections_total")
+
+        # quota limit exceeded user cannot create resource
+        if count == 1:
+            raise ResourceLimitExceeded(
+                "Sorry! cannot create more resource "
+                "quota limit exceeded please contact admin to increase quota"
+            )
+        raise ResourceLimitExceeded(
+            "Sorry! cannot create {} resources only {} remaining in quota "
+            "please contact admin to increase quota".format(
+                count, max(user.quota_remaining, 0)
+            )
+        )
+
+
 def create_new_user_resource(user_id: int, req_data: dict):
+    """
+    :param user_id: input user id
+    :param req_data: input resource parameters
+    :return int: id of the created resource
+    :purpose:
+    reserves quota for one resource and creates it in the same transaction
+    """
     resource_name = req_data["resource_name"]
-    user = get_user_by_id(user_id)
 
-    if user.check_quota_available():
+    try:
+        reserve_user_quota(user_id)
+
         # user can create resource
         resource = CResource(resource_name=resource_name, user_id=user_id)
 
+        # commit the resource and the quota remaining together
         commit_changes(resource)
+    except Exception:
+        db.session.rollback()
+        raise
 
-        user.resources.append(resource)
+    # the quota remaining is part of the user listing
+    response_cache.invalidate("users", "resources")
 
-        # decrease the quota remaining for this user by 1
-        if user.user_quota_set():
-            user.quota_remaining -= 1
+    return resource.resource_id
 
-        # commit the quota remaining to db
-        commit_changes(user)
-    else:
-        # quota limit exceeded user cannot create resource
-        raise ResourceLimitExceeded(
-            "Sorry! cannot create more resource "
-            "quota limit exceeded please contact admin to increase quota"
-        )
 
-    return resource.resource_id
+def create_new_user_resources(user_id: int, resource_names: list) -> list:
+    """
+    :param user_id: input user id
+    :param resource_names: names of the resources to create
+    :return list: ids of the created resources in the order of resource_names
+    :purpose:
+    creates all the given resources in a single transaction, the quota is reserved once for the
+    whole batch and either all the resources are created or none
+    """
+    if not resource_names:
+        raise ValueError("Sorry! at least one resource name is required")
+
+    try:
+        reserve_user_quota(user_id, len(resource_names))
+
+        resources = [
+            CResource(resource_name=resource_name, user_id=user_id)
+            for resource_name in resource_names
+        ]
+        db.session.bulk_save_objects(resources, return_defaults=True)
+
+        # commit the resources and the quota remaining together
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    response_cache.invalidate("users", "resources")
+
+    return [resource.resource_id for resource in resources]
 
 
 def set_new_user_quota(user: User, new_user_quota: int) -> bool:
@@ -130,7 +549,11 @@ def set_new_user_quota(user: User, new_user_quota: int) -> bool:
     """
     user.user_quota = new_user_quota
     user.quota_remaining = new_user_quota
+    user.resource_version = User.resource_version + 1
 
     db.session.commit()
 
+    invalidate_user_principal(user.user_id)
+    response_cache.invalidate("users")
+
     return True
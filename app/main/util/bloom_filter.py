@@ -0,0 +1,151 @@
+"""
+Problem Domain:
+
+Bloom filter used as an in-process membership layer in front of the dumped auth tokens store
+"""
+import hashlib
+import math
+import threading
+import time
+
+
+class BloomFilter:
+    """Fixed size probabilistic set, answers "definitely not present" or "possibly present" """
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        """
+        :param capacity: expected number of items
+        :param error_rate: acceptable false positive rate at the given capacity
+        :returns None:
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(
+            8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        )
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        """
+        :param item: input item
+        :return generator: bit positions of the given item
+        purpose: double hashing over a single sha256 digest to derive num_hashes positions
+        """
+        digest = hashlib.sha256(item.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+        self.count += 1
+
+    def __contains__(self, item: str):
+        return all(
+            self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item)
+        )
+
+    def clear(self):
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
+
+
+class RevokedTokenFilter:
+    """
+    Bloom filter of dumped auth tokens for this worker
+
+    The filter is populated lazily from the tokengarbage table and kept in sync by
+    pulling rows newer than the last seen token_id every REVOKED_TOKEN_FILTER_REFRESH
+    seconds, so tokens dumped by other workers are picked up within that window.
+    Tokens dumped by this worker are added immediately.
+
+    Server backends hand out ids before commit, a row can become visible after a row with
+    a higher id. The ids skipped by a sync are pulled again by the following syncs for
+    REVOKED_TOKEN_FILTER_GAP_TIMEOUT seconds so such late rows still reach the filter.
+    """
+
+    # most recent ranges of skipped ids kept, older ones are mostly purged rows
+    max_gaps = 100
+
+    def __init__(self):
+        self.refresh_interval = 5
+        self.gap_timeout = 60
+        self.last_token_id = 0
+        self._gaps = []
+        self._filter = BloomFilter()
+        self._last_refresh = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        :param app: flask app
+        :returns None:
+        purpose: sizes the filter from the app configuration
+        """
+        self.refresh_interval = app.config.get("REVOKED_TOKEN_FILTER_REFRESH", 5)
+        self.gap_timeout = app.config.get("REVOKED_TOKEN_FILTER_GAP_TIMEOUT", 60)
+        self._filter = BloomFilter(
+            capacity=app.config.get("REVOKED_TOKEN_FILTER_CAPACITY", 100000),
+            error_rate=app.config.get("REVOKED_TOKEN_FILTER_ERROR_RATE", 0.001),
+        )
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._filter.clear()
+            self.last_token_id = 0
+            self._gaps = []
+            self._last_refresh = None
+
+    def needs_refresh(self):
+        """
+        :return Boolean: True if the filter was never loaded or the refresh interval elapsed
+        """
+        return (
+            self._last_refresh is None
+            or time.monotonic() - self._last_refresh >= self.refresh_interval
+        )
+
+    def pending_gaps(self):
+        """
+        :return list: (lowest, highest) token_id ranges skipped by the recent syncs whose
+                      rows may still be committed
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            self._gaps = [gap for gap in self._gaps if now - gap[2] < self.gap_timeout]
+
+            return [(low, high) for low, high, _ in self._gaps]
+
+    def update(self, rows):
+        """
+        :param rows: iterable of (token_id, token) tuples
+        :returns None:
+        purpose: adds the given dumped tokens to the filter, advances the sync marker and
+        remembers the ids it skipped over
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            for token_id, token in sorted(rows):
+                self._filter.add(token)
+
+                if token_id > self.last_token_id + 1:
+                    self._gaps.append((self.last_token_id + 1, token_id - 1, now))
+                self.last_token_id = max(self.last_token_id, token_id)
+
+            del self._gaps[: -self.max_gaps]
+            self._last_refresh = now
+
+    def add(self, token: str):
+        with self._lock:
+            self._filter.add(token)
+
+    def __contains__(self, token: str):
+        return token in self._filter
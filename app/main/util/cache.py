@@ -0,0 +1,119 @@
+"""
+Problem Domain:
+
+Bounded in-process LRU cache with per entry expiry used on the auth hot path
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread safe LRU cache whose entries expire after a time to live"""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        """
+        :param maxsize: maximum number of entries kept, least recently used are evicted first
+        :param ttl: default time to live of an entry in seconds, None means no expiry
+        :returns None:
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize=None, ttl=None):
+        """
+        :param maxsize: new maximum number of entries
+        :param ttl: new default time to live in seconds
+        :returns None:
+        purpose: resizes the cache from the app configuration and drops all entries
+        """
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get(self, key):
+        """
+        :param key: cache key
+        :return: cached value, None if missing or expired
+        """
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+                del self._data[key]
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        """
+        :param key: cache key
+        :param value: value to cache
+        :param ttl: time to live of this entry in seconds, defaults to the cache ttl
+        :returns None:
+        """
+        expires_at = self._expiry(ttl)
+        if expires_at is False:
+            return
+
+        with self._lock:
+            self._store(key, value, expires_at)
+
+    def _expiry(self, ttl=None):
+        """
+        :param ttl: time to live of an entry in seconds, defaults to the cache ttl
+        :return: monotonic expiry time, None for no expiry, False if the entry is not kept
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if self.maxsize <= 0 or (ttl is not None and ttl <= 0):
+            return False
+
+        return time.monotonic() + ttl if ttl is not None else None
+
+    def _store(self, key, value, expires_at):
+        # called with the lock held
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+
+        return entry[0] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        :return dict: hit/miss counters and current size of the cache
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
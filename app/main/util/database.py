@@ -0,0 +1,268 @@
+"""
+Problem Domain:
+
+Engine configuration of the backend, connection pool settings, the pragmas applied to every
+new SQLite connection and the routing of read only requests to replicas
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial, wraps
+
+from flask import g, has_app_context
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import event, orm
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.expression import SelectBase
+
+# replica engine the reads of the current thread are routed to, None for the primary
+_routing = threading.local()
+
+
+def _apply_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute("PRAGMA {} = {}".format(name, value))
+    cursor.close()
+
+
+def is_sqlite_file(sa_url) -> bool:
+    """
+    :param sa_url: sqlalchemy url of the backend
+    :return Boolean: True if the backend is a SQLite database file
+    """
+    return sa_url.drivername.startswith("sqlite") and sa_url.database not in (
+        None,
+        "",
+        ":memory:",
+    )
+
+
+class RoutingSession(SignallingSession):
+    """Session sending its selects to the replica picked for the current thread, if any"""
+
+    def get_bind(self, mapper=None, clause=None):
+        replica = getattr(_routing, "replica", None)
+
+        # flushes and update/delete statements are writes, they always go to the primary
+        if (
+            replica is not None
+            and not self._flushing
+            and isinstance(clause, SelectBase)
+        ):
+            return replica
+
+        return super(RoutingSession, self).get_bind(mapper, clause)
+
+
+class ReplicaSet:
+    """
+    Round robin over the replica engines, a replica whose connection fails is skipped for
+    retry_interval seconds
+
+    :param engines: engines of the replicas
+    :param retry_interval: seconds a failed replica is left out
+    """
+
+    def __init__(self, engines, retry_interval=30):
+        self.engines = engines
+        self.retry_interval = retry_interval
+        self._next = 0
+        self._down_until = {}
+        self._lock = threading.Lock()
+
+    def choose(self):
+        """
+        :return Engine: next healthy replica, None if every replica is down
+        """
+        for _ in range(len(self.engines)):
+            with self._lock:
+                engine = self.engines[self._next % len(self.engines)]
+                self._next += 1
+                if self._down_until.get(engine, 0) > time.monotonic():
+                    continue
+
+            try:
+                # checks a pooled connection out, pinged first when DB_POOL_PRE_PING is set
+                engine.connect().close()
+            except DBAPIError:
+                with self._lock:
+                    self._down_until[engine] = time.monotonic() + self.retry_interval
+                continue
+
+            return engine
+
+        return None
+
+    def dispose(self):
+        for engine in self.engines:
+            engine.dispose()
+
+
+class Database(SQLAlchemy):
+    """
+    flask_sqlalchemy extension configuring its engines from the app configuration
+
+    Server backends get a pool of DB_POOL_SIZE connections growing by up to DB_MAX_OVERFLOW,
+    recycled after DB_POOL_RECYCLE seconds and checked before use when DB_POOL_PRE_PING is set.
+    SQLite files get a pool of long lived connections too, instead of one connection per
+    checkout, so the SQLITE_PRAGMAS are applied once per connection. Options set in
+    SQLALCHEMY_ENGINE_OPTIONS take precedence, the pool settings are left out altogether when
+    it names the poolclass.
+
+    Handlers decorated with read_only send their reads to one of the
+    SQLALCHEMY_REPLICA_URIS, writes and the reads of every other code path use the primary.
+    """
+
+    sqlite_pragmas = {}
+    replica_uris = ()
+    replica_retry_interval = 30
+    _replicas = None
+
+    def init_app(self, app):
+        if not app.config.get("SQLALCHEMY_DATABASE_URI"):
+            # flask_sqlalchemy would silently use an in memory database
+            raise ValueError("SQLALCHEMY_DATABASE_URI is not set, set DATABASE_URL")
+
+        self.sqlite_pragmas = dict(app.config.get("SQLITE_PRAGMAS", {}))
+        self.configure_replicas(
+            app.config.get("SQLALCHEMY_REPLICA_URIS"),
+            app.config.get("REPLICA_RETRY_INTERVAL", 30),
+        )
+
+        super(Database, self).init_app(app)
+
+    def configure_replicas(self, uris=None, retry_interval=30):
+        """
+        :param uris: database uris of the read only replicas, none routes every read to
+                     the primary
+        :param retry_interval: seconds a failed replica is left out
+        :returns None:
+        """
+        if self._replicas is not None:
+            self._replicas.dispose()
+
+        self.replica_uris = tuple(uris or ())
+        self.replica_retry_interval = retry_interval
+        self._replicas = None
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        config = app.config
+
+        if "poolclass" in config.get("SQLALCHEMY_ENGINE_OPTIONS", {}):
+            # the pool is fully configured by SQLALCHEMY_ENGINE_OPTIONS
+            return super(Database, self).apply_driver_hacks(app, sa_url, options)
+
+        if is_sqlite_file(sa_url):
+            options.setdefault("poolclass", QueuePool)
+            # a connection is only ever used by one thread at a time
+            options.setdefault("connect_args", {"check_same_thread": False})
+        elif sa_url.drivername.startswith("sqlite"):
+            # in memory databases keep the single shared connection set up by flask_sqlalchemy
+            return super(Database, self).apply_driver_hacks(app, sa_url, options)
+        else:
+            options.setdefault("pool_recycle", config.get("DB_POOL_RECYCLE", 1800))
+            options.setdefault("pool_pre_ping", config.get("DB_POOL_PRE_PING", True))
+
+        options.setdefault("pool_size", config.get("DB_POOL_SIZE", 5))
+        options.setdefault("max_overflow", config.get("DB_MAX_OVERFLOW", 10))
+        options.setdefault("pool_timeout", config.get("DB_POOL_TIMEOUT", 30))
+
+        super(Database, self).apply_driver_hacks(app, sa_url, options)
+
+    def create_engine(self, sa_url, engine_opts):
+        engine = super(Database, self).create_engine(sa_url, engine_opts)
+
+        if sa_url.drivername.startswith("sqlite") and self.sqlite_pragmas:
+            event.listen(
+                engine, "connect", partial(_apply_pragmas, self.sqlite_pragmas)
+            )
+
+        return engine
+
+    def _create_replica_engine(self, app, uri):
+        sa_url = make_url(uri)
+        options = {}
+        self.apply_pool_defaults(app, options)
+        self.apply_driver_hacks(app, sa_url, options)
+        options.update(app.config["SQLALCHEMY_ENGINE_OPTIONS"])
+
+        engine = super(Database, self).create_engine(sa_url, options)
+
+        if sa_url.drivername.startswith("sqlite"):
+            # the journal mode is the primary's to choose, replica connections cannot write
+            pragmas = {
+                name: value
+                for name, value in self.sqlite_pragmas.items()
+                if name != "journal_mode"
+            }
+            pragmas["query_only"] = 1
+            event.listen(engine, "connect", partial(_apply_pragmas, pragmas))
+
+        return engine
+
+    def get_replicas(self):
+        """
+        :return ReplicaSet: replicas of the app database, None if there are none
+        """
+        if not self.replica_uris:
+            return None
+
+        if self._replicas is None:
+            app = self.get_app()
+            self._replicas = ReplicaSet(
+                [self._create_replica_engine(app, uri) for uri in self.replica_uris],
+                self.replica_retry_interval,
+            )
+
+        return self._replicas
+
+    @contextmanager
+    def reading_from_replica(self):
+        """
+        :return Engine: replica the reads of the block are sent to, None if they stay on the
+                        primary because there is no healthy replica
+        :purpose:
+        pins one replica for the whole block so every read of it sees the same snapshot, the
+        session is closed afterwards so the replica transaction does not outlive the block,
+        g.read_from_replica tells the response cache not to keep what may be lagging data
+        """
+        previous = getattr(_routing, "replica", None)
+        if previous is not None:
+            # nested blocks keep the replica of the outer one
+            yield previous
+            return
+
+        replicas = self.get_replicas()
+        replica = replicas.choose() if replicas is not None else None
+        _routing.replica = replica
+        if replica is not None and has_app_context():
+            g.read_from_replica = True
+
+        try:
+            yield replica
+        finally:
+            _routing.replica = None
+            if replica is not None:
+                self.session.close()
+
+    def read_only(self, func):
+        """
+        :param func: handler only reading from the database
+        :return : input function call
+        purpose: sends the reads of the handler to a replica, apply it below the auth decorators
+        so the tokens and logged in users are still checked against the primary
+        """
+
+        @wraps(func)
+        def decorated(*args, **kwargs):
+            with self.reading_from_replica():
+                return func(*args, **kwargs)
+
+        return decorated
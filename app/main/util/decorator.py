@@ -10,9 +10,6 @@ from flask import request
 
 from ..service.auth_service import *
 
-current_logged_in_user = None
-is_loggedin_user_admin = False
-
 
 def login_required(func):
     """
@@ -24,14 +21,10 @@ def login_required(func):
 
     @wraps(func)
     def decorated(*args, **kwargs):
-        global current_logged_in_user, is_loggedin_user_admin
-
         data, status = get_logged_in_user(request)
 
         if status == 200:
             user_dict = data.get("data")
-            current_logged_in_user = user_dict["user_id"]
-            is_loggedin_user_admin = user_dict["platform_admin"]
             if not user_dict:
                 resp_obj = {"status": "fail", "message": "invalid token recieved"}
                 return resp_obj, status
@@ -47,17 +40,17 @@ def admin_required(func):
     """
     :param func: input function on which this decorator wraps
     :return : input function call
-    assumption: this decorator assumes the user is logged in
+    assumption: this decorator assumes the user is logged in and is applied below login_required
     purpose:  calls the input function if the logged in user is super user, returns failure response otherwise
     """
 
     @wraps(func)
     def decorated(*args, **kwargs):
-        global is_loggedin_user_admin
-        global current_logged_in_user
+        # the logged in user is passed along by login_required, never shared across requests
+        user_data = kwargs.get("user_data") or {}
 
         # if logged in user is super user call the input function
-        if is_loggedin_user_admin:
+        if user_data.get("platform_admin"):
             return func(*args, **kwargs)
         else:
             # the logged in user is not a super user return failure response
@@ -4,6 +4,7 @@ Problem Domain
 DTO contains all the input data validation expected data and how data is to be marshalled while
 sending the response
 """
+
 from flask_restplus import fields, Namespace
 
 
@@ -56,6 +57,45 @@ class UserDto:
         },
     )
 
+    user_page_res_model = api.model(
+        "user_page_res_details",
+        {
+            "status": fields.String(required=True, description="status of response"),
+            "message": fields.String(required=False, description="action message"),
+            "data": fields.List(fields.Nested(user_res), required=False),
+            "next_cursor": fields.String(
+                required=False, description="cursor of the next page"
+            ),
+        },
+    )
+
+    user_import_row = api.model(
+        "user_import_row",
+        {
+            "row": fields.Integer(
+                required=True, description="row number in the import"
+            ),
+            "email": fields.String(required=False, description="user email"),
+            "status": fields.String(
+                required=True,
+                description="created, exists, duplicate, invalid or failed",
+            ),
+            "user_id": fields.Integer(required=False, description="created user id"),
+            "message": fields.String(required=False, description="why it was skipped"),
+        },
+    )
+
+    user_import_res = api.model(
+        "user_import_res",
+        {
+            "status": fields.String(required=True, description="status of response"),
+            "message": fields.String(required=False, description="action message"),
+            "created": fields.Integer(required=False, description="users created"),
+            "skipped": fields.Integer(required=False, description="rows skipped"),
+            "data": fields.List(fields.Nested(user_import_row), required=False),
+        },
+    )
+
 
 class ResourceDto:
     """DTO of Resource Model"""
@@ -69,6 +109,24 @@ class ResourceDto:
         {"resource_name": fields.String(required=True, description="Resource name")},
     )
 
+    resource_bulk_req_data = api.model(
+        "resource_bulk_req_data",
+        {
+            "resource_names": fields.List(
+                fields.String, required=True, description="Resource names"
+            )
+        },
+    )
+
+    resource_bulk_delete_req_data = api.model(
+        "resource_bulk_delete_req_data",
+        {
+            "resource_ids": fields.List(
+                fields.Integer, required=True, description="Resource ids"
+            )
+        },
+    )
+
     resource_res = api.model(
         "resource_res",
         {
@@ -84,5 +142,70 @@ class ResourceDto:
             "status": fields.String(required=True, description="status of response"),
             "message": fields.String(required=False, description="action message"),
             "data": fields.List(fields.Nested(resource_res), required=False),
+            "next_cursor": fields.String(
+                required=False, description="cursor of the next page"
+            ),
+        },
+    )
+
+
+class AdminDto:
+    """DTO of the platform administration details"""
+
+    api = Namespace("admin", description="platform administration and diagnostics")
+
+    profile_res = api.model(
+        "profile_res",
+        {
+            "name": fields.String(required=True, description="profile name"),
+            "method": fields.String(required=True, description="http method"),
+            "endpoint": fields.String(required=True, description="profiled endpoint"),
+            "elapsed_ms": fields.Integer(
+                required=True, description="request wall clock time"
+            ),
+            "size": fields.Integer(required=True, description="profile size in bytes"),
+        },
+    )
+
+    profile_res_data = api.model(
+        "profile_res_data",
+        {
+            "status": fields.String(required=True, description="status of response"),
+            "message": fields.String(required=False, description="action message"),
+            "data": fields.List(fields.Nested(profile_res), required=False),
+        },
+    )
+
+    quota_usage_res = api.model(
+        "quota_usage_res",
+        {
+            "user_id": fields.Integer(required=True, description="user id"),
+            "email": fields.String(required=True, description="unique user email"),
+            "user_quota": fields.Integer(required=True, description="user quota"),
+            "quota_remaining": fields.Integer(
+                required=True, description="user quota remaining"
+            ),
+            "resource_count": fields.Integer(
+                required=True, description="number of resources of the user"
+            ),
+            "quota_used_percent": fields.Float(
+                required=False, description="percentage of the quota used"
+            ),
+            "quota_drift": fields.Integer(
+                required=True,
+                description="quota remaining minus the quota left by the resources",
+            ),
+        },
+    )
+
+    quota_usage_res_data = api.model(
+        "quota_usage_res_data",
+        {
+            "status": fields.String(required=True, description="status of response"),
+            "message": fields.String(required=False, description="action message"),
+            "data": fields.List(fields.Nested(quota_usage_res), required=False),
+            "next_cursor": fields.String(
+                required=False, description="cursor of the next page"
+            ),
         },
     )
@@ -0,0 +1,42 @@
+"""
+Problem Domain:
+
+Strong ETags and If-None-Match handling of conditional GET requests
+"""
+
+import hashlib
+
+from flask import Response, request
+from werkzeug.http import quote_etag
+
+
+def make_etag(*parts) -> str:
+    """
+    :param parts: values the response body is derived from, e.g a version counter and the
+                  query parameters of the request
+    :return String: unquoted strong etag of the parts
+    """
+    return hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def etag_header(etag: str) -> dict:
+    """
+    :param etag: unquoted etag
+    :return dict: response headers carrying the etag
+    """
+    return {"ETag": quote_etag(etag)}
+
+
+def not_modified(etag: str):
+    """
+    :param etag: unquoted etag of the response the request would get
+    :return Response: empty 304 response if the request If-None-Match matches the etag,
+                      None if the full response has to be sent
+    """
+    if not request.if_none_match.contains(etag):
+        return None
+
+    resp = Response(status=304)
+    resp.set_etag(etag)
+
+    return resp
@@ -0,0 +1,111 @@
+"""
+Problem Domain:
+
+Non blocking logging pipeline, records are queued on the request thread and written as json
+lines by a background listener
+"""
+
+import copy
+import json
+import logging
+import queue
+import random
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats every record as a single line json object"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.utcfromtimestamp(record.created).isoformat() + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "path": record.pathname,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # rendered before the record was queued
+            entry["exception"] = record.exc_text
+
+        return json.dumps(entry)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of the records of every level
+
+    :param rates: fraction of the records kept per level name, levels missing from
+                  rates are always kept
+    """
+
+    def __init__(self, rates=None):
+        super(SamplingFilter, self).__init__()
+        self.rates = {
+            level if isinstance(level, int) else logging.getLevelName(level): rate
+            for level, rate in (rates or {}).items()
+        }
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno, 1.0)
+
+        return rate >= 1.0 or random.random() < rate
+
+
+_traceback_formatter = logging.Formatter()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super(DroppingQueueHandler, self).__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        """
+        :param record: record being logged
+        :return LogRecord: copy of the record safe to hand to the listener thread
+        purpose:
+        merges the arguments into the message and renders the traceback to exc_text, the
+        base class would append the traceback to the message and drop the exception
+        """
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+        record.exc_info = None
+
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def start_log_pipeline(handler, level, queue_size=10000, sample_rates=None):
+    """
+    :param handler: handler doing the actual write, called from the listener thread only
+    :param level: lowest level logged
+    :param queue_size: records buffered before new ones are dropped
+    :param sample_rates: fraction of the records kept per level name e.g {"INFO": 0.1}
+    :return tuple: queue handler to attach to the loggers and the started listener
+    """
+    log_queue = queue.Queue(queue_size)
+
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.setLevel(level)
+    queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+
+    return queue_handler, listener
@@ -0,0 +1,316 @@
+"""
+Problem Domain:
+
+Request, database, cache and quota metrics exposed in the prometheus text format
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, g, request
+
+HELP = {
+    "http_requests_total": (
+        "counter",
+        "Requests handled by namespace, route, method and status",
+    ),
+    "http_request_duration_seconds": (
+        "histogram",
+        "Request latency by namespace, route and method",
+    ),
+    "http_request_db_queries_total": (
+        "counter",
+        "SQL statements executed by namespace and route",
+    ),
+    "http_request_db_seconds_total": (
+        "counter",
+        "Time spent in SQL statements by namespace and route",
+    ),
+    "auth_cache_hits_total": ("counter", "Lookups served by the auth caches"),
+    "auth_cache_misses_total": ("counter", "Lookups missing the auth caches"),
+    "auth_cache_hit_ratio": ("gauge", "Hit ratio of the auth caches"),
+    "quota_rejections_total": (
+        "counter",
+        "Resource creations rejected because the user quota was exhausted",
+    ),
+}
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(labels, extra=()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+
+    return (
+        "{"
+        + ",".join(
+            '{}="{}"'.format(
+                key,
+                str(value)
+                .replace("\\", "\\\\")
+                .replace('"', '\\"')
+                .replace("\n", "\\n"),
+            )
+            for key, value in pairs
+        )
+        + "}"
+    )
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metrics:
+    """
+    Counters and histograms of this worker
+
+    With METRICS_DIR set every worker flushes its values to a file of its own in
+    that directory at most every METRICS_FLUSH_INTERVAL seconds, and /metrics sums
+    the files of all the workers so the scraped values do not depend on which
+    worker answers the scrape. Files of exited workers are kept so counters never
+    go backwards, clear the directory when deploying. With METRICS_REQUIRE_AUTH set
+    the app refuses to start unless scrapes are protected by METRICS_AUTH_TOKEN.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._caches = {}
+        self._last_flush = time.monotonic()
+        self.buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+        self.directory = None
+        self.flush_interval = 5
+        self.auth_token = None
+
+    def init_app(self, app):
+        """
+        :param app: flask app
+        :returns None:
+        purpose: hooks the request metrics into the request life cycle and serves /metrics
+        """
+        self.directory = app.config.get("METRICS_DIR")
+        self.flush_interval = app.config.get("METRICS_FLUSH_INTERVAL", 5)
+        self.auth_token = app.config.get("METRICS_AUTH_TOKEN")
+        if app.config.get("METRICS_REQUIRE_AUTH") and not self.auth_token:
+            raise ValueError(
+                "METRICS_AUTH_TOKEN must be set, /metrics would be served to anyone"
+            )
+        self.buckets = tuple(app.config.get("METRICS_BUCKETS", self.buckets))
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            atexit.register(self.flush)
+
+        app.before_request(self._start_request)
+        app.after_request(self._end_request)
+        app.add_url_rule("/metrics", "metrics", self.metrics_view)
+
+    def register_cache(self, name, cache):
+        """
+        :param name: value of the cache label
+        :param cache: TTLCache whose hit and miss counters are exported
+        :returns None:
+        """
+        self._caches[name] = cache
+
+    def inc(self, name: str, labels: dict = None, value: float = 1):
+        with self._lock:
+            self._counters[(name, _labels(labels))] += value
+
+    def observe(self, name: str, value: float, labels: dict = None):
+        key = (name, _labels(labels))
+
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # count per bucket, the last bucket is +Inf, then the sum of the values
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [
+                    0.0
+                ]
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    break
+            else:
+                i = len(self.buckets)
+            histogram[i] += 1
+            histogram[-1] += value
+
+    def snapshot(self) -> dict:
+        """
+        :return dict: json serializable values of this worker
+        """
+        with self._lock:
+            counters = [
+                [name, list(labels), value]
+                for (name, labels), value in self._counters.items()
+            ]
+            histograms = [
+                [name, list(labels), list(values)]
+                for (name, labels), values in self._histograms.items()
+            ]
+
+        for cache_name, cache in self._caches.items():
+            stats = cache.stats()
+            labels = [["cache", cache_name]]
+            counters.append(["auth_cache_hits_total", labels, stats["hits"]])
+            counters.append(["auth_cache_misses_total", labels, stats["misses"]])
+
+        return {
+            "buckets": list(self.buckets),
+            "counters": counters,
+            "histograms": histograms,
+        }
+
+    def flush(self):
+        """
+        :returns None:
+        purpose: writes the values of this worker to its file in METRICS_DIR
+        """
+        if not self.directory:
+            return
+
+        path = os.path.join(self.directory, "metrics-{}.json".format(os.getpid()))
+        with self._flush_lock:
+            with open(path + ".tmp", "w") as f:
+                json.dump(self.snapshot(), f)
+            # readers see either the previous or the new values, never a partial file
+            os.replace(path + ".tmp", path)
+
+            self._last_flush = time.monotonic()
+
+    def collect(self) -> tuple:
+        """
+        :return tuple: counters and histograms summed over all the workers
+        """
+        if self.directory:
+            self.flush()
+            snapshots = []
+            for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        else:
+            snapshots = [self.snapshot()]
+
+        counters = defaultdict(float)
+        histograms = {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot["counters"]:
+                counters[(name, tuple(map(tuple, labels)))] += value
+
+            # histograms flushed with other buckets cannot be summed, skip them
+            if snapshot["buckets"] != list(self.buckets):
+                continue
+            for name, labels, values in snapshot["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                if key in histograms:
+                    histograms[key] = [a + b for a, b in zip(histograms[key], values)]
+                else:
+                    histograms[key] = values
+
+        return counters, histograms
+
+    def render(self) -> str:
+        """
+        :return String: metrics of all the workers in the prometheus text format
+        """
+        counters, histograms = self.collect()
+
+        # hit ratio of the auth caches over all the workers
+        for (name, labels), hits in list(counters.items()):
+            if name == "auth_cache_hits_total":
+                lookups = hits + counters.get(("auth_cache_misses_total", labels), 0)
+                counters[("auth_cache_hit_ratio", labels)] = (
+                    hits / lookups if lookups else 0.0
+                )
+
+        samples = defaultdict(list)
+        for (name, labels), value in sorted(counters.items()):
+            samples[name].append(
+                name + _format_labels(labels) + " " + _format_value(value)
+            )
+
+        for (name, labels), values in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                samples[name].append(
+                    "{}_bucket{} {}".format(
+                        name, _format_labels(labels, [("le", le)]), cumulative
+                    )
+                )
+            samples[name].append(
+                "{}_sum{} {}".format(
+                    name, _format_labels(labels), _format_value(values[-1])
+                )
+            )
+            samples[name].append(
+                "{}_count{} {}".format(name, _format_labels(labels), cumulative)
+            )
+
+        lines = []
+        for name in sorted(samples):
+            metric_type, description = HELP.get(name, ("untyped", name))
+            lines.append("# HELP {} {}".format(name, description))
+            lines.append("# TYPE {} {}".format(name, metric_type))
+            lines.extend(samples[name])
+
+        return "\n".join(lines) + "\n"
+
+    def metrics_view(self):
+        if self.auth_token and request.headers.get("Authorization") != "Bearer " + str(
+            self.auth_token
+        ):
+            return Response("unauthorized\n", status=401, mimetype="text/plain")
+
+        return Response(self.render(), mimetype="text/plain; version=0.0.4")
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+
+    def _end_request(self, response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        labels = {
+            "namespace": route.strip("/").split("/")[0] or "root",
+            "route": route,
+            "method": request.method,
+        }
+
+        self.observe(
+            "http_request_duration_seconds", time.perf_counter() - started, labels
+        )
+        self.inc("http_requests_total", dict(labels, status=str(response.status_code)))
+
+        recorder = g.get("query_recorder")
+        if recorder is not None:
+            db_labels = {"namespace": labels["namespace"], "route": route}
+            self.inc("http_request_db_queries_total", db_labels, recorder.count)
+            self.inc("http_request_db_seconds_total", db_labels, recorder.duration)
+
+        if (
+            self.directory
+            and time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+        return response
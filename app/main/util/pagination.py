@@ -0,0 +1,73 @@
+"""
+Problem Domain:
+
+Keyset pagination of list queries using opaque cursors
+"""
+import base64
+import binascii
+from collections import namedtuple
+
+from flask import current_app
+
+from ..exceptions import InvalidCursor
+
+Page = namedtuple("Page", ["items", "next_cursor"])
+
+
+def encode_cursor(last_id: int) -> str:
+    """
+    :param last_id: key of the last row of the current page
+    :return String: opaque cursor pointing right after the given key
+    """
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    :param cursor: opaque cursor received from the client
+    :return int: key after which the next page starts
+    :raise InvalidCursor: if the cursor was not issued by this platform
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor("Sorry! invalid page cursor received")
+
+
+def page_size(limit: int = None) -> int:
+    """
+    :param limit: page size requested by the client
+    :return int: page size bounded by the configured maximum
+    """
+    if limit is None:
+        return current_app.config["DEFAULT_PAGE_SIZE"]
+
+    return max(1, min(limit, current_app.config["MAX_PAGE_SIZE"]))
+
+
+def paginate(query, key_column, limit: int = None, cursor: str = None) -> Page:
+    """
+    :param query: query to paginate
+    :param key_column: unique, indexed column the pages are ordered by
+    :param limit: page size
+    :param cursor: cursor returned along with the previous page
+    :return Page: items of the requested page and the cursor of the next page if any
+    :purpose:
+    seeks to the first row after the cursor instead of using an offset so every page costs
+    the same regardless of how deep into the table it is
+    """
+    limit = page_size(limit)
+
+    if cursor:
+        query = query.filter(key_column > decode_cursor(cursor))
+
+    items = query.order_by(key_column).limit(limit + 1).all()
+
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(getattr(items[-1], key_column.key))
+    else:
+        next_cursor = None
+
+    return Page(items, next_cursor)
@@ -0,0 +1,167 @@
+"""
+Problem Domain:
+
+Run bcrypt hashing and verification inline, on a thread pool or on a process pool
+"""
+
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import bcrypt
+
+EXECUTORS = ("inline", "thread", "process")
+
+
+def _hash_password(password: str, rounds: int, prefix: str) -> str:
+    salt = bcrypt.gensalt(rounds=rounds, prefix=prefix.encode("utf-8"))
+
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+
+def _check_password(password_hash: str, password: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+    except ValueError:
+        # not a bcrypt hash
+        return False
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords with the BCRYPT_LOG_ROUNDS cost of the app
+
+    PASSWORD_HASH_EXECUTOR selects where the work runs, inline on the calling thread,
+    on a thread pool or on a process pool of PASSWORD_HASH_WORKERS workers. The pools
+    bound how many hashes run at once per worker process so a login storm cannot
+    starve the other requests of cpu. Pools are created on first use so every forked
+    gunicorn worker gets its own.
+
+    :param config_prefix: prefix of the EXECUTOR, WORKERS and TIMEOUT settings read by
+                          init_app, hashers used for different work get their own pools
+    """
+
+    def __init__(self, config_prefix="PASSWORD_HASH"):
+        self.config_prefix = config_prefix
+        self.executor = "inline"
+        self.workers = None
+        self.rounds = 12
+        self.prefix = "2b"
+        self.timeout = 30
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        :param app: flask app
+        :returns None:
+        purpose: configures the executor and the bcrypt cost from the app configuration
+        """
+        self.configure(
+            executor=app.config.get(self.config_prefix + "_EXECUTOR", "inline"),
+            workers=app.config.get(self.config_prefix + "_WORKERS"),
+            rounds=app.config.get("BCRYPT_LOG_ROUNDS", 12),
+            prefix=app.config.get("BCRYPT_HASH_PREFIX", "2b"),
+            timeout=app.config.get(self.config_prefix + "_TIMEOUT", 30),
+        )
+
+    def configure(
+        self, executor="inline", workers=None, rounds=12, prefix="2b", timeout=30
+    ):
+        if executor not in EXECUTORS:
+            raise ValueError(
+                self.config_prefix + "_EXECUTOR must be one of " + ", ".join(EXECUTORS)
+            )
+
+        self.shutdown()
+        self.executor = executor
+        self.workers = workers
+        self.rounds = rounds
+        self.prefix = prefix
+        self.timeout = timeout
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=True)
+            self._pool = None
+            self._pool_pid = None
+
+    def _get_pool(self):
+        with self._lock:
+            # a pool inherited from the parent of a forked worker is not usable
+            if self._pool is None or self._pool_pid != os.getpid():
+                pool_class = (
+                    ProcessPoolExecutor
+                    if self.executor == "process"
+                    else ThreadPoolExecutor
+                )
+                self._pool = pool_class(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+
+            return self._pool
+
+    def _run(self, func, *args):
+        if self.executor == "inline":
+            return func(*args)
+
+        return self._get_pool().submit(func, *args).result(timeout=self.timeout)
+
+    def hash(self, password: str) -> str:
+        """
+        :param password: plain text password
+        :return String: bcrypt hash of the password
+        """
+        return self._run(_hash_password, password, self.rounds, self.prefix)
+
+    def check(self, password_hash: str, password: str) -> bool:
+        """
+        :param password_hash: stored bcrypt hash
+        :param password: plain text password to verify
+        :return Boolean: True if the password matches the hash
+        """
+        return self._run(_check_password, password_hash, password)
+
+    def hash_many(self, passwords: list) -> list:
+        """
+        :param passwords: plain text passwords
+        :return list: bcrypt hashes in the order of passwords, computed in parallel on the
+                      pool workers
+        """
+        if self.executor == "inline":
+            return [self.hash(password) for password in passwords]
+
+        futures = [
+            self._get_pool().submit(_hash_password, password, self.rounds, self.prefix)
+            for password in passwords
+        ]
+
+        return [future.result(timeout=self.timeout) for future in futures]
+
+
+def calibrate_rounds(target_ms: float, min_rounds=4, max_rounds=16, samples=3) -> list:
+    """
+    :param target_ms: hashing latency aimed for
+    :param min_rounds: lowest cost tried
+    :param max_rounds: highest cost tried
+    :param samples: hashes timed per cost
+    :return list: (rounds, median latency in ms) of every cost tried, the cost doubles the
+                  work with every round so trying stops once the target is exceeded
+    """
+    timings = []
+
+    for rounds in range(min_rounds, max_rounds + 1):
+        latencies = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            _hash_password("calibration-password", rounds, "2b")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        timings.append((rounds, statistics.median(latencies)))
+        if timings[-1][1] > target_ms:
+            break
+
+    return timings
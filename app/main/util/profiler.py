@@ -0,0 +1,163 @@
+"""
+Problem Domain:
+
+Opt in per request profiling for finding where the time of a slow endpoint goes
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+
+from flask import current_app, g, request
+
+# name of the files written for every profiled request, without the extension
+PROFILE_NAME = re.compile(r"^[0-9]+-[A-Z]+-[\w.]+-[0-9]+ms$")
+
+
+class RequestProfiler:
+    """
+    Wraps sampled requests, or requests of a platform admin sending the
+    PROFILE_HEADER header, in cProfile and dumps the stats to PROFILE_DIR
+
+    Every profiled request leaves a <name>.prof file, loadable with pstats,
+    snakeviz or flameprof for a flamegraph, and a <name>.txt call tree of the
+    slowest functions by cumulative time. Only the newest PROFILE_KEEP requests
+    are kept.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        :param app: flask app
+        :returns None:
+        purpose: registers the request hooks starting and stopping the profiler
+        """
+        app.before_request(self._start)
+        app.after_request(self._stop)
+        app.teardown_request(self._discard)
+
+    @property
+    def directory(self):
+        return current_app.config["PROFILE_DIR"]
+
+    def _requested_by_admin(self):
+        """
+        :return Boolean: True if a platform admin asked for this request to be profiled
+        """
+        if not request.headers.get(current_app.config["PROFILE_HEADER"]):
+            return False
+
+        from ..service.auth_service import get_logged_in_user
+
+        data, status = get_logged_in_user(request)
+
+        return status == 200 and bool((data.get("data") or {}).get("platform_admin"))
+
+    def _start(self):
+        sample_rate = current_app.config["PROFILE_SAMPLE_RATE"]
+
+        if (
+            sample_rate and random.random() < sample_rate
+        ) or self._requested_by_admin():
+            g.profiler = cProfile.Profile()
+            g.profiler_started = time.perf_counter()
+            g.profiler.enable()
+
+    def _stop(self, response):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return response
+
+        profiler.disable()
+        elapsed_ms = (time.perf_counter() - g.pop("profiler_started")) * 1000
+
+        try:
+            name = self.dump(profiler, request.method, request.endpoint, elapsed_ms)
+        except OSError as e:
+            current_app.logger.error("could not save request profile: " + str(e))
+        else:
+            response.headers["X-Profile-Id"] = name
+
+        return response
+
+    def _discard(self, exc=None):
+        # the request failed before after_request ran, do not leave the profiler on
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+
+    def dump(self, profiler, method, endpoint, elapsed_ms):
+        """
+        :param profiler: disabled cProfile.Profile of the request
+        :param method: http method of the request
+        :param endpoint: flask endpoint of the request
+        :param elapsed_ms: wall clock time of the request
+        :return String: name of the saved profile
+        """
+        name = "{}-{}-{}-{}ms".format(
+            int(time.time() * 1000000),
+            method,
+            re.sub(r"[^\w.]", "_", endpoint or "unknown"),
+            int(elapsed_ms),
+        )
+        directory = self.directory
+        os.makedirs(directory, exist_ok=True)
+
+        profiler.dump_stats(os.path.join(directory, name + ".prof"))
+
+        call_tree = io.StringIO()
+        stats = pstats.Stats(profiler, stream=call_tree)
+        stats.sort_stats("cumulative").print_stats(50)
+        stats.print_callees(20)
+        with open(os.path.join(directory, name + ".txt"), "w") as f:
+            f.write(call_tree.getvalue())
+
+        self.trim(current_app.config["PROFILE_KEEP"])
+
+        return name
+
+    def list_profiles(self, limit=None):
+        """
+        :param limit: number of profiles to return
+        :return list: (name, size in bytes) of the saved profiles, newest first
+        """
+        try:
+            files = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+
+        names = sorted(
+            (
+                f[: -len(".prof")]
+                for f in files
+                if f.endswith(".prof") and PROFILE_NAME.match(f[: -len(".prof")])
+            ),
+            key=lambda name: int(name.split("-", 1)[0]),
+            reverse=True,
+        )
+
+        return [
+            (name, os.path.getsize(os.path.join(self.directory, name + ".prof")))
+            for name in names[:limit]
+        ]
+
+    def trim(self, keep):
+        """
+        :param keep: number of newest profiles to keep
+        :returns None:
+        purpose: removes the older profiles
+        """
+        with self._lock:
+            for name, _ in self.list_profiles()[keep:]:
+                for extension in (".prof", ".txt"):
+                    try:
+                        os.remove(os.path.join(self.directory, name + extension))
+                    except FileNotFoundError:
+                        pass
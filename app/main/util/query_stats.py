@@ -0,0 +1,145 @@
+"""
+Problem Domain:
+
+Count the sql statements and database time of every request, log slow and repeated statements
+"""
+
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryRecorder:
+    """Statements executed while this recorder was active"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def repeated(self, threshold):
+        """
+        :param threshold: number of executions from which a statement is reported
+        :return list: (statement, count) of the statements executed at least threshold times
+        """
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+class QueryStats:
+    """
+    Listens to every engine of the process and records the executed statements in
+    the recorders active on the executing thread
+
+    A recorder is active for the duration of every request. Its totals are sent as
+    X-DB-Query-Count and X-DB-Time headers in debug mode, statements slower than
+    SLOW_QUERY_THRESHOLD seconds are logged with their parameters and statements
+    executed QUERY_REPEAT_THRESHOLD times or more in one request, the usual sign of
+    an N+1 query, are logged once the request ends.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self.app = None
+        self.slow_query_threshold = 0.5
+        self.repeat_threshold = 10
+
+    def init_app(self, app):
+        """
+        :param app: flask app
+        :returns None:
+        purpose: hooks the recorders into the engine events and the request life cycle
+        """
+        self.app = app
+        self.slow_query_threshold = app.config.get("SLOW_QUERY_THRESHOLD", 0.5)
+        self.repeat_threshold = app.config.get("QUERY_REPEAT_THRESHOLD", 10)
+
+        if not event.contains(Engine, "before_cursor_execute", self._before_execute):
+            event.listen(Engine, "before_cursor_execute", self._before_execute)
+            event.listen(Engine, "after_cursor_execute", self._after_execute)
+            event.listen(Engine, "handle_error", self._failed_execute)
+
+        app.before_request(self._start_request)
+        app.after_request(self._add_headers)
+        app.teardown_request(self._end_request)
+
+    @property
+    def _recorders(self):
+        if not hasattr(self._local, "recorders"):
+            self._local.recorders = []
+        return self._local.recorders
+
+    @contextmanager
+    def track(self):
+        """
+        :purpose: records the statements executed by this thread within the block
+        """
+        recorder = QueryRecorder()
+        self._recorders.append(recorder)
+        try:
+            yield recorder
+        finally:
+            self._recorders.remove(recorder)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, many):
+        duration = time.perf_counter() - conn.info["query_start"].pop()
+
+        for recorder in self._recorders:
+            recorder.record(statement, duration)
+
+        if self.slow_query_threshold and duration >= self.slow_query_threshold:
+            self.app.logger.warning(
+                "slow query took {:.1f}ms: {} parameters: {!r}".format(
+                    duration * 1000, statement, parameters
+                )
+            )
+
+    def _failed_execute(self, context):
+        if context.connection is not None and context.connection.info.get(
+            "query_start"
+        ):
+            context.connection.info["query_start"].pop()
+
+    def _start_request(self):
+        g.query_recorder = QueryRecorder()
+        self._recorders.append(g.query_recorder)
+
+    def _add_headers(self, response):
+        recorder = g.get("query_recorder")
+
+        if recorder is not None and self.app.debug:
+            response.headers["X-DB-Query-Count"] = str(recorder.count)
+            response.headers["X-DB-Time"] = "{:.3f}".format(recorder.duration * 1000)
+
+        return response
+
+    def _end_request(self, exc=None):
+        recorder = g.pop("query_recorder", None)
+        if recorder is None:
+            return
+
+        self._recorders.remove(recorder)
+
+        if self.repeat_threshold:
+            for statement, count in recorder.repeated(self.repeat_threshold):
+                self.app.logger.warning(
+                    "possible N+1 query, executed {} times in one request: {}".format(
+                        count, statement
+                    )
+                )
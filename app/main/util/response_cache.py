@@ -0,0 +1,286 @@
+"""
+Problem Domain:
+
+Cache of list responses keyed by route and query arguments, invalidated per tag by the service
+functions writing the data the responses are built from
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, request
+
+from .cache import TTLCache
+
+BACKENDS = ("lru", "sqlite", "none")
+
+
+class LRUResponseStore(TTLCache):
+    """
+    In-process store, every worker keeps its own entries so writes made through another
+    worker are only seen once the entries expire
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        super(LRUResponseStore, self).__init__(maxsize, ttl)
+        self._generations = {}
+
+    def generation(self, tag: str) -> int:
+        with self._lock:
+            return self._generations.get(tag, 0)
+
+    def get_entry(self, tag: str, key: str):
+        return self.get((tag, key))
+
+    def set_entry(self, tag: str, key: str, value, generation: int):
+        expires_at = self._expiry()
+        if expires_at is False:
+            return
+
+        # checked and stored under one lock so no invalidation can slip in between
+        with self._lock:
+            # the data changed while the response was computed
+            if self._generations.get(tag, 0) != generation:
+                return
+
+            self._store((tag, key), value, expires_at)
+
+    def invalidate(self, tag: str):
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            for key in [key for key in self._data if key[0] == tag]:
+                del self._data[key]
+
+
+class SQLiteResponseStore:
+    """
+    Store shared by the workers of a host in a local SQLite file, entries are json encoded,
+    the oldest ones are evicted once maxsize is exceeded and invalidations reach every worker
+
+    :param path: path of the SQLite file
+    :param maxsize: maximum number of entries kept
+    :param ttl: time to live of an entry in seconds, None means no expiry
+    """
+
+    def __init__(self, path, maxsize=1024, ttl=None):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache (tag TEXT, key TEXT, "
+                "value TEXT, expires_at REAL, stored_at REAL, PRIMARY KEY (tag, key))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache_generation "
+                "(tag TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+            )
+
+    def _connect(self):
+        # sqlite connections are not shared across threads nor forked workers
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # reads of the cached responses are served from the memory mapped file
+            conn.execute("PRAGMA mmap_size=67108864")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+
+        return conn
+
+    def generation(self, tag: str) -> int:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT generation FROM response_cache_generation WHERE tag = ?", (tag,)
+            )
+            .fetchone()
+        )
+
+        return row[0] if row else 0
+
+    def get_entry(self, tag: str, key: str):
+        row = (
+            self._connect()
+            .execute(
+                "SELECT value FROM response_cache WHERE tag = ? AND key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (tag, key, time.time()),
+            )
+            .fetchone()
+        )
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def set_entry(self, tag: str, key: str, value, generation: int):
+        if self.maxsize <= 0 or (self.ttl is not None and self.ttl <= 0):
+            return
+
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+
+        with self._connect() as conn:
+            # only stored if no write invalidated the tag while the response was computed
+            conn.execute(
+                "INSERT OR REPLACE INTO response_cache "
+                "SELECT ?, ?, ?, ?, ? WHERE "
+                "coalesce((SELECT generation FROM response_cache_generation "
+                "WHERE tag = ?), 0) = ?",
+                (tag, key, json.dumps(value), expires_at, now, tag, generation),
+            )
+            conn.execute(
+                "DELETE FROM response_cache WHERE expires_at <= ? OR rowid IN "
+                "(SELECT rowid FROM response_cache ORDER BY stored_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (now, self.maxsize),
+            )
+
+    def invalidate(self, tag: str):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO response_cache_generation VALUES (?, 0)", (tag,)
+            )
+            conn.execute(
+                "UPDATE response_cache_generation SET generation = generation + 1 "
+                "WHERE tag = ?",
+                (tag,),
+            )
+            conn.execute("DELETE FROM response_cache WHERE tag = ?", (tag,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM response_cache")
+
+    def stats(self):
+        """
+        :return dict: hit/miss counters of this worker and current size of the store
+        """
+        size = self._connect().execute("SELECT count(*) FROM response_cache").fetchone()
+
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": size[0],
+                "maxsize": self.maxsize,
+            }
+
+
+class ResponseCache:
+    """
+    Caches the responses of the decorated endpoints per tag
+
+    RESPONSE_CACHE_BACKEND selects the store, an in-process LRU ("lru"), a SQLite file shared
+    by the workers of the host ("sqlite") or no caching ("none"). The service functions call
+    invalidate with the tags of the data they changed once it is committed.
+    """
+
+    def __init__(self):
+        self.store = None
+
+    def init_app(self, app):
+        """
+        :param app: flask app
+        :returns None:
+        purpose: creates the store selected by the app configuration
+        """
+        self.configure(
+            backend=app.config.get("RESPONSE_CACHE_BACKEND", "lru"),
+            maxsize=app.config.get("RESPONSE_CACHE_SIZE", 256),
+            ttl=app.config.get("RESPONSE_CACHE_TTL", 30),
+            path=app.config.get("RESPONSE_CACHE_PATH"),
+        )
+
+    def configure(self, backend="lru", maxsize=256, ttl=30, path=None):
+        if backend not in BACKENDS:
+            raise ValueError(
+                "RESPONSE_CACHE_BACKEND must be one of " + ", ".join(BACKENDS)
+            )
+
+        if backend == "lru":
+            self.store = LRUResponseStore(maxsize, ttl)
+        elif backend == "sqlite":
+            self.store = SQLiteResponseStore(path, maxsize, ttl)
+        else:
+            self.store = None
+
+    def invalidate(self, *tags):
+        """
+        :param tags: tags of the data that changed, e.g "users" or "resources"
+        :returns None:
+        """
+        if self.store is not None:
+            for tag in tags:
+                self.store.invalidate(tag)
+
+    def clear(self):
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self):
+        return self.store.stats() if self.store is not None else {}
+
+    def cached(self, tag: str):
+        """
+        :param tag: tag of the data the response is built from
+        :return decorator:
+        :purpose:
+        serves successful responses of the decorated endpoint from the cache, the key is the
+        route, the query arguments and the fields mask of the request, apply it below the
+        auth decorators so every request is still authorized and above db.read_only,
+        responses read from a lagging replica are served but not stored
+        """
+
+        def wrapper(func):
+            @wraps(func)
+            def wrapped(*args, **kwargs):
+                store = self.store
+                if store is None:
+                    return func(*args, **kwargs)
+
+                key = "{} {}".format(
+                    request.full_path,
+                    request.headers.get(current_app.config["RESTPLUS_MASK_HEADER"], ""),
+                )
+                entry = store.get_entry(tag, key)
+                if entry is not None:
+                    data, headers = entry
+                    return data, 200, headers
+
+                generation = store.generation(tag)
+                g.pop("read_from_replica", None)
+                resp = func(*args, **kwargs)
+
+                if g.pop("read_from_replica", False):
+                    return resp
+
+                if isinstance(resp, tuple) and len(resp) == 3 and resp[1] == 200:
+                    data, _, headers = resp
+                    store.set_entry(tag, key, [data, dict(headers)], generation)
+
+                return resp
+
+            return wrapped
+
+        return wrapper
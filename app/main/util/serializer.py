@@ -0,0 +1,189 @@
+"""
+Problem Domain:
+
+Precompiled serialization of large list responses, the fields of a DTO model are turned into
+plain converter functions once and rows read as tuples are serialized with them instead of
+walking the flask_restplus fields per attribute per row
+"""
+
+from datetime import datetime
+from functools import wraps
+from http import HTTPStatus
+
+from flask import current_app, has_request_context, request
+from flask_restplus import fields
+from flask_restplus.mask import Mask
+from flask_restplus.utils import merge, unpack
+from werkzeug.wrappers import BaseResponse
+
+# field classes whose format can be replaced by a plain converter, None stays None
+_CONVERTERS = {
+    fields.String: str,
+    fields.Integer: int,
+    fields.Boolean: bool,
+    fields.Float: float,
+}
+
+
+_DATETIME = fields.DateTime()
+
+
+def _iso8601(value):
+    # dates and strings are converted to datetimes by fields.DateTime first
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    return _DATETIME.format(value)
+
+
+def _field_converter(field):
+    """
+    :param field: flask_restplus field of a model
+    :return function: converter of a not None value, None if the field cannot be precompiled
+    """
+    if isinstance(field, type):
+        field = field()
+
+    # attribute renames, defaults and callables are left to flask_restplus
+    if field.attribute is not None or field.default is not None:
+        return None
+
+    if isinstance(field, fields.List) and isinstance(field.container, fields.Nested):
+        serializer = compile_model(field.container.nested)
+        return serializer.serialize_rows
+
+    if isinstance(field, fields.DateTime) and type(field) is fields.DateTime:
+        return _iso8601 if field.dt_format == "iso8601" else field.format
+
+    return _CONVERTERS.get(type(field))
+
+
+class ModelSerializer:
+    """
+    Serializes objects the way flask_restplus marshal does for one model
+
+    Rows are read by position when they are plain tuples or column query rows whose columns
+    are in the order of the model fields, by key when they are dicts and by attribute
+    otherwise. Every field of the model is emitted, missing values as None, in the order of
+    the model so the response body is identical to the marshalled one.
+
+    :param model: flask_restplus model, every field must be precompilable
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.keys = tuple(model.keys())
+        self.converters = tuple(_field_converter(field) for field in model.values())
+
+        if None in self.converters:
+            key = self.keys[self.converters.index(None)]
+            raise ValueError("Sorry! field {} cannot be precompiled".format(key))
+
+    def _positional(self, rows) -> bool:
+        first = rows[0]
+        if not isinstance(first, tuple):
+            return False
+
+        # column query rows carry the names of their columns
+        keys = getattr(first, "keys", None)
+        return keys is None or tuple(keys()) == self.keys
+
+    def serialize_rows(self, rows) -> list:
+        """
+        :param rows: tuples in the order of the model fields, dicts or objects
+        :return list: serialized rows
+        """
+        if not rows:
+            return []
+
+        keys = self.keys
+        converters = self.converters
+        if not self._positional(rows):
+            return [self.serialize(row) for row in rows]
+
+        return [
+            {
+                key: None if value is None else convert(value)
+                for key, convert, value in zip(keys, converters, row)
+            }
+            for row in rows
+        ]
+
+    def serialize(self, obj) -> dict:
+        """
+        :param obj: dict or object holding the model fields
+        :return dict: serialized object
+        """
+        if isinstance(obj, dict):
+            values = (obj.get(key) for key in self.keys)
+        else:
+            values = (getattr(obj, key, None) for key in self.keys)
+
+        return {
+            key: None if value is None else convert(value)
+            for key, convert, value in zip(self.keys, self.converters, values)
+        }
+
+
+_serializers = {}
+
+
+def compile_model(model) -> ModelSerializer:
+    """
+    :param model: flask_restplus model
+    :return ModelSerializer: serializer of the model, compiled once per model
+    """
+    serializer = _serializers.get(id(model))
+    if serializer is None or serializer.model is not model:
+        serializer = _serializers[id(model)] = ModelSerializer(model)
+
+    return serializer
+
+
+def marshal_list_with(model, envelope=None, code=HTTPStatus.OK, description=None):
+    """
+    :param model: flask_restplus model of the response
+    :param envelope: key the serialized response is wrapped in
+    :param code: status code documented for the response
+    :param description: description of the documented response
+    :return decorator:
+    :purpose:
+    drop in replacement of Namespace.marshal_list_with for list endpoints returning column
+    query rows, documents the same response model and serializes the response with the
+    precompiled serializer, a fields mask sent by the client is applied to the serialized response
+    and responses returned as they are, e.g 304 ones, are passed through
+    """
+    serializer = compile_model(model)
+
+    def wrapper(func):
+        doc = {"responses": {code: (description, [model])}, "__mask__": True}
+        func.__apidoc__ = merge(getattr(func, "__apidoc__", {}), doc)
+
+        def serialize(data):
+            data = serializer.serialize(data)
+
+            if has_request_context():
+                mask = request.headers.get(current_app.config["RESTPLUS_MASK_HEADER"])
+                if mask:
+                    # the mask selects the fields the same way marshal does
+                    data = Mask(mask).apply(data)
+
+            return {envelope: data} if envelope else data
+
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            resp = func(*args, **kwargs)
+
+            # e.g 304 responses of conditional requests are sent as they are
+            if isinstance(resp, BaseResponse):
+                return resp
+
+            if isinstance(resp, tuple):
+                data, code, headers = unpack(resp)
+                return serialize(data), code, headers
+
+            return serialize(resp)
+
+        return wrapped
+
+    return wrapper
@@ -0,0 +1,52 @@
+"""
+Problem Domain:
+
+Read the users of a bulk import from csv or newline delimited json streams
+"""
+import csv
+import json
+
+FORMATS = ("csv", "ndjson")
+
+
+def read_csv(lines):
+    """
+    :param lines: iterable of text lines, the first one holds the column names
+    :return generator: user dicts, e.g {"email": .., "password": .., "user_quota": ..}
+    """
+    for row in csv.DictReader(lines):
+        yield {key.strip(): value for key, value in row.items() if key}
+
+
+def read_ndjson(lines):
+    """
+    :param lines: iterable of text lines, one json object per line
+    :return generator: user dicts, lines that are not json objects yield an error entry
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+
+        if isinstance(row, dict):
+            yield row
+        else:
+            yield {"_error": "Sorry! invalid json object"}
+
+
+def read_users(lines, fmt):
+    """
+    :param lines: iterable of text lines
+    :param fmt: csv or ndjson
+    :return generator: user dicts in the order of the input
+    """
+    if fmt == "csv":
+        return read_csv(lines)
+    if fmt == "ndjson":
+        return read_ndjson(lines)
+
+    raise ValueError("Sorry! import format must be one of " + ", ".join(FORMATS))
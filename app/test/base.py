@@ -4,11 +4,52 @@ Problem Domain
 Write a base test case
 """
 
+from contextlib import contextmanager
+
 from flask_testing import TestCase
-from app.main import db
+from app.main import (
+    db,
+    principal_cache,
+    query_stats,
+    response_cache,
+    revoked_token_filter,
+    token_version_cache,
+    verified_token_cache,
+)
+from app.main.service.auth_service import login_user
+from app.main.service.user_service import create_new_user, get_user_by_email
 from manage import app
 
 
+def create_user(email="test@gmail.com", password="test123", admin=False):
+    """
+    :param email: email of the new user
+    :param password: password of the new user
+    :param admin: True to make the user a platform admin
+    :return User: the created user
+    """
+    create_new_user({"email": email, "password": password})
+    user = get_user_by_email(email)
+    if admin:
+        user.platform_admin = True
+        db.session.commit()
+
+    return user
+
+
+def register_and_login(email="test@gmail.com", password="test123", admin=False):
+    """
+    :param email: email of the new user
+    :param password: password of the new user
+    :param admin: True to make the user a platform admin
+    :return tuple: id of the created user and its auth token
+    """
+    user = create_user(email, password, admin)
+    res, _ = login_user({"email": email, "password": password})
+
+    return user.user_id, res["Authorization"]
+
+
 class BaseTestCase(TestCase):
     """ Base Tests """
 
@@ -20,6 +61,30 @@ class BaseTestCase(TestCase):
         db.create_all()
         db.session.commit()
 
+        # ids are reused once the tables are recreated, drop per worker caches
+        principal_cache.clear()
+        token_version_cache.clear()
+        verified_token_cache.clear()
+        response_cache.clear()
+        # the next auth check pulls the dumped tokens, before any statement is counted
+        revoked_token_filter.reset()
+
     def tearDown(self):
         db.session.remove()
         db.drop_all()
+
+    @contextmanager
+    def assertMaxQueries(self, max_queries):
+        """
+        :param max_queries: largest number of sql statements the block may execute
+        :purpose: fails the test if the block executes more statements than allowed
+        """
+        with query_stats.track() as recorder:
+            yield recorder
+
+        self.assertTrue(
+            recorder.count <= max_queries,
+            "{} statements executed, at most {} expected:\n{}".format(
+                recorder.count, max_queries, "\n".join(recorder.statements)
+            ),
+        )
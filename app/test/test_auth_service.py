@@ -0,0 +1,303 @@
+"""
+Problem Domain
+
+Write test cases for the auth token life cycle
+"""
+
+import datetime
+import unittest
+
+import jwt
+
+from app.main import (
+    db,
+    flask_bcrypt,
+    password_hasher,
+    revoked_token_filter,
+    verified_token_cache,
+    principal_cache,
+    token_version_cache,
+)
+from app.main.model.user import User
+from app.main.model.token_garbage import TokenGarbage
+from app.main.util.bloom_filter import BloomFilter
+from app.main.util.password import PasswordHasher
+from app.test.base import BaseTestCase, register_and_login
+from app.main.service.user_service import (
+    create_new_user,
+    get_user_by_email,
+    get_user_principal,
+    set_new_user_quota,
+    revoke_user_tokens,
+)
+from app.main.service.auth_service import (
+    login_user,
+    logout_user,
+    logout_user_everywhere,
+    get_logged_in_user,
+)
+from app.main.service.token_garbage_service import purge_expired_tokens
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        items = ["token-{}".format(i) for i in range(1000)]
+
+        for item in items:
+            bloom.add(item)
+
+        self.assertTrue(all(item in bloom for item in items))
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+
+        for i in range(1000):
+            bloom.add("token-{}".format(i))
+
+        false_positives = sum("other-{}".format(i) in bloom for i in range(10000))
+        self.assertTrue(false_positives < 300)
+
+
+class TestTokenRevocation(BaseTestCase):
+    def test_logged_out_token_is_rejected(self):
+        _, auth_token = register_and_login()
+        user = get_user_by_email("test@gmail.com")
+
+        self.assertTrue(User.decode_auth_token(auth_token) == str(user.user_id))
+
+        logout_user(auth_token)
+
+        self.assertTrue(TokenGarbage.is_dumped(auth_token))
+        with self.assertRaises(jwt.InvalidTokenError):
+            User.decode_auth_token(auth_token)
+
+    def test_filter_picks_up_tokens_dumped_elsewhere(self):
+        _, auth_token = register_and_login()
+
+        # simulate another worker dumping the token
+        revoked_token_filter.reset()
+        db.session.add(TokenGarbage(auth_token))
+        db.session.commit()
+
+        self.assertTrue(TokenGarbage.is_dumped(auth_token))
+
+    def test_filter_picks_up_tokens_committed_late(self):
+        _, auth_token = register_and_login()
+        late_id = (
+            db.session.query(db.func.max(TokenGarbage.token_id)).scalar() or 0
+        ) + 1
+
+        # another worker commits the next id first
+        revoked_token_filter.reset()
+        other = TokenGarbage("other")
+        other.token_id = late_id + 1
+        db.session.add(other)
+        db.session.commit()
+        TokenGarbage.sync_filter()
+
+        late = TokenGarbage(auth_token)
+        late.token_id = late_id
+        db.session.add(late)
+        db.session.commit()
+
+        revoked_token_filter.refresh_interval = 0
+        self.addCleanup(
+            setattr,
+            revoked_token_filter,
+            "refresh_interval",
+            self.app.config["REVOKED_TOKEN_FILTER_REFRESH"],
+        )
+        self.assertTrue(TokenGarbage.is_dumped(auth_token))
+
+    def test_purge_expired_tokens(self):
+        _, auth_token = register_and_login()
+        logout_user(auth_token)
+
+        dumped = TokenGarbage.query.filter_by(token=auth_token).one()
+        self.assertTrue(dumped.dumped_on is not None)
+        self.assertTrue(dumped.expires_on > datetime.datetime.utcnow())
+
+        for i in range(5):
+            db.session.add(
+                TokenGarbage(
+                    "expired-{}".format(i),
+                    expires_on=datetime.datetime.utcnow()
+                    - datetime.timedelta(minutes=1),
+                )
+            )
+        db.session.commit()
+
+        # tokens of unknown expiry are kept until they outlived any auth token
+        db.session.add(
+            TokenGarbage(
+                "undecodable-old",
+                dumped_on=datetime.datetime.utcnow() - datetime.timedelta(days=2),
+            )
+        )
+        db.session.add(
+            TokenGarbage("undecodable-recent", dumped_on=datetime.datetime.utcnow())
+        )
+        db.session.commit()
+
+        self.assertTrue(purge_expired_tokens(batch_size=2) == 6)
+        self.assertTrue(TokenGarbage.query.count() == 2)
+        self.assertTrue(
+            TokenGarbage.query.filter_by(token="undecodable-recent").count() == 1
+        )
+        self.assertTrue(TokenGarbage.is_dumped(auth_token))
+
+    def test_verified_token_cache(self):
+        _, auth_token = register_and_login()
+        cache_key = User.token_cache_key(auth_token)
+        verified_token_cache.clear()
+
+        User.decode_auth_token(auth_token)
+        hits = verified_token_cache.stats()["hits"]
+        User.decode_auth_token(auth_token)
+
+        self.assertTrue(verified_token_cache.stats()["hits"] == hits + 1)
+
+        # logout evicts the cached payload
+        logout_user(auth_token)
+
+        self.assertTrue(verified_token_cache.get(cache_key) is None)
+
+
+class TestTokenVersion(BaseTestCase):
+    class Request:
+        def __init__(self, auth_token):
+            self.headers = {"Authorization": auth_token}
+
+    def test_revoke_user_tokens(self):
+        _, auth_token_1 = register_and_login()
+        _, status = get_logged_in_user(self.Request(auth_token_1))
+        self.assertTrue(status == 200)
+
+        user = get_user_by_email("test@gmail.com")
+        revoke_user_tokens(user.user_id)
+
+        resp, status = get_logged_in_user(self.Request(auth_token_1))
+        self.assertTrue(status == 401)
+
+        # a fresh login carries the new token version
+        res, _ = login_user({"email": "test@gmail.com", "password": "test123"})
+        _, status = get_logged_in_user(self.Request(res["Authorization"]))
+        self.assertTrue(status == 200)
+
+    def test_logout_everywhere(self):
+        _, auth_token_1 = register_and_login()
+        res, _ = login_user({"email": "test@gmail.com", "password": "test123"})
+        auth_token_2 = res["Authorization"]
+
+        _, status = logout_user_everywhere(auth_token_1)
+        self.assertTrue(status == 200)
+
+        for auth_token in (auth_token_1, auth_token_2):
+            _, status = get_logged_in_user(self.Request(auth_token))
+            self.assertTrue(status == 401)
+
+        # revocation is a version compare, nothing is added to the token store
+        self.assertTrue(TokenGarbage.query.count() == 0)
+
+    def test_revoked_token_cannot_logout(self):
+        _, auth_token_1 = register_and_login()
+        logout_user_everywhere(auth_token_1)
+
+        res, _ = login_user({"email": "test@gmail.com", "password": "test123"})
+        auth_token_2 = res["Authorization"]
+
+        # the stale token does not revoke the sessions opened since
+        _, status = logout_user_everywhere(auth_token_1)
+        self.assertTrue(status == 401)
+        _, status = logout_user(auth_token_1)
+        self.assertTrue(status == 401)
+
+        resp = self.client.post(
+            "/auth/logout_all", headers={"Authorization": auth_token_1}
+        )
+        self.assert401(resp)
+
+        _, status = get_logged_in_user(self.Request(auth_token_2))
+        self.assertTrue(status == 200)
+
+    def test_revoked_by_another_worker(self):
+        _, auth_token = register_and_login()
+        user = get_user_by_email("test@gmail.com")
+        _, status = get_logged_in_user(self.Request(auth_token))
+        self.assertTrue(status == 200)
+
+        # another worker bumps the version, only its own caches are invalidated
+        user.token_version += 1
+        db.session.commit()
+
+        _, status = get_logged_in_user(self.Request(auth_token))
+        self.assertTrue(status == 200)
+
+        # once the cached version expires the token is rejected, even though the
+        # longer lived user details are still cached
+        token_version_cache.clear()
+        self.assertTrue(principal_cache.get(str(user.user_id)) is not None)
+        _, status = get_logged_in_user(self.Request(auth_token))
+        self.assertTrue(status == 401)
+
+
+class TestPrincipalCache(BaseTestCase):
+    def test_principal_is_cached(self):
+        create_new_user({"email": "test@gmail.com", "password": "test123"})
+        user = get_user_by_email("test@gmail.com")
+
+        principal = get_user_principal(user.user_id)
+        self.assertTrue(principal["email"] == "test@gmail.com")
+        self.assertFalse(principal["platform_admin"])
+
+        # changes made behind the service layer are not visible until invalidation
+        user.platform_admin = True
+        db.session.commit()
+        self.assertFalse(get_user_principal(user.user_id)["platform_admin"])
+
+        set_new_user_quota(user, 5)
+        self.assertTrue(get_user_principal(user.user_id)["platform_admin"])
+
+    def test_principal_cache_hit(self):
+        create_new_user({"email": "test@gmail.com", "password": "test123"})
+        user = get_user_by_email("test@gmail.com")
+
+        get_user_principal(user.user_id)
+        hits = principal_cache.stats()["hits"]
+        get_user_principal(str(user.user_id))
+
+        self.assertTrue(principal_cache.stats()["hits"] == hits + 1)
+
+
+class TestPasswordHasher(unittest.TestCase):
+    def test_executors(self):
+        for executor in ("inline", "thread", "process"):
+            hasher = PasswordHasher()
+            hasher.configure(executor=executor, workers=2, rounds=4)
+            try:
+                password_hash = hasher.hash("test123")
+                self.assertTrue(password_hash.startswith("$2b$04$"))
+                self.assertTrue(hasher.check(password_hash, "test123"))
+                self.assertFalse(hasher.check(password_hash, "wrong"))
+                self.assertFalse(hasher.check("not-a-hash", "test123"))
+
+                hashes = hasher.hash_many(["a", "b", "c"])
+                self.assertTrue(
+                    [hasher.check(h, p) for h, p in zip(hashes, "abc")] == [True] * 3
+                )
+            finally:
+                hasher.shutdown()
+
+    def test_existing_hashes_still_verify(self):
+        password_hash = flask_bcrypt.generate_password_hash("test123").decode("utf-8")
+
+        self.assertTrue(password_hasher.check(password_hash, "test123"))
+
+    def test_unknown_executor(self):
+        with self.assertRaises(ValueError):
+            PasswordHasher().configure(executor="gpu")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,11 +7,15 @@ Test Config will test all the Environment Configurations
 import os
 import unittest
 
-from flask import current_app
+from flask import Flask, current_app
 from flask_testing import TestCase
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
 
 from manage import app
-from app.main.config import basedir
+from app.main import db
+from app.main.config import ProductionConfig, basedir
+from app.main.util.database import Database
 
 
 class TestDevelopmentConfig(TestCase):
@@ -51,6 +55,42 @@ class TestProductionConfig(TestCase):
     def test_app_is_production(self):
         self.assertTrue(app.config["DEBUG"] == False)
 
+    def test_database_url_required(self):
+        production = Flask(__name__)
+        production.config.from_object(ProductionConfig)
+        production.config["SQLALCHEMY_DATABASE_URI"] = None
+
+        with self.assertRaises(ValueError):
+            Database().init_app(production)
+
+
+class TestDatabaseEngine(TestCase):
+    def create_app(self):
+        app.config.from_object("app.main.config.TestingConfig")
+        return app
+
+    def test_sqlite_pragmas(self):
+        self.assertTrue(isinstance(db.engine.pool, QueuePool))
+
+        with db.engine.connect() as conn:
+            pragma = lambda name: conn.execute("PRAGMA " + name).scalar()
+
+            self.assertTrue(pragma("journal_mode") == "wal")
+            # NORMAL
+            self.assertTrue(pragma("synchronous") == 1)
+            self.assertTrue(pragma("busy_timeout") == 5000)
+            self.assertTrue(pragma("cache_size") == -64 * 1024)
+
+    def test_server_pool_options(self):
+        options = {}
+        db.apply_driver_hacks(app, make_url("postgresql://user@host/db"), options)
+
+        self.assertTrue(options["pool_size"] == app.config["DB_POOL_SIZE"])
+        self.assertTrue(options["max_overflow"] == app.config["DB_MAX_OVERFLOW"])
+        self.assertTrue(options["pool_recycle"] == app.config["DB_POOL_RECYCLE"])
+        self.assertTrue(options["pool_pre_ping"] is True)
+        self.assertTrue("poolclass" not in options)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,115 @@
+"""
+Problem Domain
+
+Write test cases for the queue based logging pipeline
+"""
+
+import json
+import logging
+import queue
+import threading
+import unittest
+
+from flask.logging import default_handler
+
+from app.main import configure_logging
+from app.main.util.log import (
+    DroppingQueueHandler,
+    JsonFormatter,
+    SamplingFilter,
+    start_log_pipeline,
+)
+from manage import app
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super(ListHandler, self).__init__()
+        self.lines = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+        self.threads.add(threading.current_thread())
+
+
+def make_record(level, message="message"):
+    return logging.LogRecord("test", level, __file__, 1, message, None, None)
+
+
+class TestLogPipeline(unittest.TestCase):
+    def test_records_are_written_as_json_by_the_listener(self):
+        handler = ListHandler()
+        handler.setFormatter(JsonFormatter())
+        queue_handler, listener = start_log_pipeline(handler, logging.DEBUG)
+
+        logger = logging.getLogger("test_log_pipeline")
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        logger.addHandler(queue_handler)
+        try:
+            logger.info("user %s logged in", 42)
+        finally:
+            logger.removeHandler(queue_handler)
+            listener.stop()
+
+        entry = json.loads(handler.lines[0])
+        self.assertTrue(entry["message"] == "user 42 logged in")
+        self.assertTrue(entry["level"] == "INFO")
+        # the file write happened off the logging thread
+        self.assertTrue(threading.current_thread() not in handler.threads)
+
+    def test_exceptions_survive_the_queue(self):
+        handler = ListHandler()
+        handler.setFormatter(JsonFormatter())
+        queue_handler, listener = start_log_pipeline(handler, logging.DEBUG)
+
+        logger = logging.getLogger("test_log_pipeline")
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        logger.addHandler(queue_handler)
+        try:
+            try:
+                1 / 0
+            except ZeroDivisionError:
+                logger.exception("request %s failed", 7)
+        finally:
+            logger.removeHandler(queue_handler)
+            listener.stop()
+
+        entry = json.loads(handler.lines[0])
+        self.assertTrue(entry["message"] == "request 7 failed")
+        self.assertTrue("ZeroDivisionError" in entry["exception"])
+
+    def test_sampling_per_level(self):
+        sampling = SamplingFilter({"INFO": 0.0, "DEBUG": 0.5})
+
+        self.assertFalse(sampling.filter(make_record(logging.INFO)))
+        self.assertTrue(sampling.filter(make_record(logging.WARNING)))
+
+        kept = sum(sampling.filter(make_record(logging.DEBUG)) for _ in range(2000))
+        self.assertTrue(800 < kept < 1200)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        queue_handler = DroppingQueueHandler(queue.Queue(1))
+
+        for _ in range(3):
+            queue_handler.handle(make_record(logging.INFO))
+
+        self.assertTrue(queue_handler.queue.qsize() == 1)
+        self.assertTrue(queue_handler.dropped == 2)
+
+    def test_app_logs_only_through_the_queue(self):
+        # configured again, as create_app does, the previous queue handler is detached
+        configure_logging()
+
+        handlers = app.logger.handlers
+
+        self.assertTrue(default_handler not in handlers)
+        self.assertTrue(
+            [type(handler) for handler in handlers] == [DroppingQueueHandler]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
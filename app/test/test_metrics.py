@@ -0,0 +1,149 @@
+"""
+Problem Domain
+
+Write test cases for the prometheus metrics
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask
+
+from app.main import metrics
+from app.main.config import ProductionConfig
+from app.main.util.metrics import Metrics
+from app.test.base import BaseTestCase, register_and_login
+from app.main.service.user_service import get_user_by_email, set_new_user_quota
+
+USER_REQUESTS = (
+    'http_requests_total{method="GET",namespace="users",'
+    'route="/users/<user_id>",status="200"}'
+)
+USER_LATENCY = (
+    'http_request_duration_seconds_count{method="GET",namespace="users",'
+    'route="/users/<user_id>"}'
+)
+
+
+def sample(text, series):
+    """
+    :param text: scraped metrics
+    :param series: name and labels of the sample
+    :return float: value of the sample, 0 if it is not exported yet
+    """
+    for line in text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+
+    return 0.0
+
+
+class TestMetrics(BaseTestCase):
+    def setUp(self):
+        super(TestMetrics, self).setUp()
+
+        _, self.auth_token = register_and_login()
+        self.user = get_user_by_email("test@gmail.com")
+
+    def scrape(self):
+        resp = self.client.get("/metrics")
+        self.assert200(resp)
+
+        return resp.data.decode()
+
+    def test_request_and_quota_metrics(self):
+        before = self.scrape()
+        set_new_user_quota(self.user, 0)
+
+        headers = {"Authorization": self.auth_token}
+        for _ in range(2):
+            self.client.get("/users/{}".format(self.user.user_id), headers=headers)
+        self.client.post(
+            "/resources/{}".format(self.user.user_id),
+            headers=headers,
+            json={"resource_name": "r"},
+        )
+
+        after = self.scrape()
+        self.assertTrue(
+            sample(after, USER_REQUESTS) - sample(before, USER_REQUESTS) == 2
+        )
+        self.assertTrue(sample(after, USER_LATENCY) - sample(before, USER_LATENCY) == 2)
+        self.assertTrue(
+            sample(after, "quota_rejections_total")
+            - sample(before, "quota_rejections_total")
+            == 1
+        )
+        self.assertTrue("# TYPE http_request_duration_seconds histogram" in after)
+        self.assertTrue('http_request_db_queries_total{namespace="users"' in after)
+        self.assertTrue('auth_cache_hit_ratio{cache="verified_token"}' in after)
+
+    def test_workers_are_aggregated(self):
+        directory = tempfile.mkdtemp()
+        metrics.directory = directory
+        try:
+            mine = sample(self.scrape(), "quota_rejections_total")
+
+            # values flushed by another worker of this host
+            with open(os.path.join(directory, "metrics-1.json"), "w") as f:
+                json.dump(
+                    {
+                        "buckets": list(metrics.buckets),
+                        "counters": [["quota_rejections_total", [], 5]],
+                        "histograms": [
+                            [
+                                "http_request_duration_seconds",
+                                [
+                                    ["method", "GET"],
+                                    ["namespace", "x"],
+                                    ["route", "/x"],
+                                ],
+                                [1] + [0] * len(metrics.buckets) + [0.001],
+                            ]
+                        ],
+                    },
+                    f,
+                )
+
+            text = self.scrape()
+            self.assertTrue(sample(text, "quota_rejections_total") == mine + 5)
+            self.assertTrue(
+                sample(
+                    text,
+                    'http_request_duration_seconds_count{method="GET",'
+                    'namespace="x",route="/x"}',
+                )
+                == 1
+            )
+        finally:
+            metrics.directory = None
+            shutil.rmtree(directory)
+
+    def test_scrape_token(self):
+        metrics.auth_token = "secret"
+        try:
+            self.assert401(self.client.get("/metrics"))
+            resp = self.client.get(
+                "/metrics", headers={"Authorization": "Bearer secret"}
+            )
+            self.assert200(resp)
+        finally:
+            metrics.auth_token = None
+
+    def test_token_required_in_production(self):
+        app = Flask(__name__)
+        app.config.from_object(ProductionConfig)
+        app.config["METRICS_AUTH_TOKEN"] = None
+
+        with self.assertRaises(ValueError):
+            Metrics().init_app(app)
+
+        app.config["METRICS_AUTH_TOKEN"] = "secret"
+        Metrics().init_app(app)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Problem Domain
+
+Write test cases for the per request profiling
+"""
+
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from app.main import request_profiler
+from app.test.base import BaseTestCase, register_and_login
+
+
+class TestRequestProfiler(BaseTestCase):
+    def setUp(self):
+        super(TestRequestProfiler, self).setUp()
+
+        self.profile_dir = tempfile.mkdtemp()
+        self.app.config["PROFILE_DIR"] = self.profile_dir + "/"
+        _, self.admin_token = register_and_login("admin@gmail.com", admin=True)
+        _, self.user_token = register_and_login()
+
+    def tearDown(self):
+        self.app.config["PROFILE_DIR"] = (
+            self.app.config["LOG_FILE_LOCATION"] + "profiles/"
+        )
+        self.app.config["PROFILE_SAMPLE_RATE"] = 0.0
+        shutil.rmtree(self.profile_dir)
+        super(TestRequestProfiler, self).tearDown()
+
+    def get(self, url, auth_token, **headers):
+        headers["Authorization"] = auth_token
+        return self.client.get(url, headers=headers)
+
+    def test_admin_header_profiles_request(self):
+        resp = self.get("/users/", self.admin_token, **{"X-Profile": "1"})
+        self.assert200(resp)
+        name = resp.headers["X-Profile-Id"]
+
+        resp = self.get("/admin/profiles", self.admin_token)
+        self.assert200(resp)
+        profiles = resp.json["data"]["data"]
+        self.assertTrue([profile["name"] for profile in profiles] == [name])
+        self.assertTrue(profiles[0]["method"] == "GET")
+
+        resp = self.get("/admin/profiles/" + name, self.admin_token)
+        self.assert200(resp)
+        with open(self.profile_dir + "/downloaded.prof", "wb") as f:
+            f.write(resp.data)
+        resp.close()
+        self.assertTrue(pstats.Stats(f.name).total_calls > 0)
+
+        resp = self.get("/admin/profiles/" + name + "?format=txt", self.admin_token)
+        self.assertTrue(b"cumulative" in resp.data)
+        resp.close()
+
+    def test_header_is_ignored_for_non_admins(self):
+        resp = self.get("/users/1", self.user_token, **{"X-Profile": "1"})
+        self.assertTrue("X-Profile-Id" not in resp.headers)
+        self.assertTrue(request_profiler.list_profiles() == [])
+
+        resp = self.get("/admin/profiles", self.user_token)
+        self.assert401(resp)
+
+    def test_sampling_and_retention(self):
+        self.app.config["PROFILE_SAMPLE_RATE"] = 1.0
+        self.app.config["PROFILE_KEEP"] = 2
+        try:
+            for _ in range(3):
+                self.assertTrue(
+                    "X-Profile-Id" in self.get("/users/2", self.user_token).headers
+                )
+        finally:
+            self.app.config["PROFILE_KEEP"] = 100
+
+        self.assertTrue(len(request_profiler.list_profiles()) == 2)
+
+    def test_unknown_profile(self):
+        for name in ("missing", "../../app.log"):
+            resp = self.get("/admin/profiles/" + name, self.admin_token)
+            self.assert404(resp)
+
+
+if __name__ == "__main__":
+    unittest.main()
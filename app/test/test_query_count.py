@@ -0,0 +1,155 @@
+"""
+Problem Domain
+
+Guard the number of sql statements executed by every controller endpoint
+"""
+
+import unittest
+
+from app.main import query_stats
+from app.test.base import BaseTestCase, register_and_login
+from app.main.service.user_service import (
+    create_new_user_resources,
+    get_user_by_email,
+    set_new_user_quota,
+)
+
+
+class TestEndpointQueryCounts(BaseTestCase):
+    def setUp(self):
+        super(TestEndpointQueryCounts, self).setUp()
+
+        self.admin_id, self.admin_token = register_and_login(
+            "root@gmail.com", admin=True
+        )
+        self.user_id, self.user_token = register_and_login()
+        set_new_user_quota(get_user_by_email("test@gmail.com"), 100)
+        self.resource_ids = create_new_user_resources(
+            self.user_id, ["r" + str(i) for i in range(20)]
+        )
+
+        # warm up the per worker token and principal caches
+        for auth_token in (self.admin_token, self.user_token):
+            self.client.get("/users/1", headers={"Authorization": auth_token})
+
+    def request(self, method, url, auth_token=None, max_queries=0, **kwargs):
+        headers = {"Authorization": auth_token} if auth_token else {}
+
+        with self.assertMaxQueries(max_queries) as recorder:
+            resp = self.client.open(url, method=method, headers=headers, **kwargs)
+
+        self.assertTrue(resp.status_code < 400, resp.data)
+        # the debug headers agree with what the test recorded, streamed responses send
+        # their headers before the body is generated
+        if resp.mimetype == "application/json":
+            self.assertTrue(int(resp.headers["X-DB-Query-Count"]) == recorder.count)
+
+        return resp
+
+    def test_auth_endpoints(self):
+        login = {"email": "test@gmail.com", "password": "test123"}
+        self.request("POST", "/auth/login", max_queries=1, json=login)
+        # plus the periodic pull of tokens dumped by other workers
+        self.request("POST", "/auth/logout", self.user_token, max_queries=2)
+        self.request("POST", "/auth/logout_all", self.admin_token, max_queries=1)
+
+    def test_user_endpoints(self):
+        user_url = "/users/{}".format(self.user_id)
+
+        self.request("GET", "/users/", self.admin_token, max_queries=1)
+        self.request("GET", user_url, self.user_token, max_queries=1)
+        self.request(
+            "POST",
+            "/users/",
+            self.admin_token,
+            max_queries=2,
+            json={"email": "new@gmail.com", "password": "test123"},
+        )
+        self.request("PUT", user_url + "?new_user_quota=50", self.admin_token, 3)
+        self.request("POST", user_url + "/logout", self.admin_token, max_queries=1)
+        # the resources of the user are removed along with it whatever their number
+        self.request("DELETE", user_url, self.admin_token, max_queries=6)
+
+    def test_resource_endpoints(self):
+        user_url = "/resources/{}".format(self.user_id)
+        names = ["a", "b", "c", "d", "e"]
+
+        self.request("GET", "/resources/", self.admin_token, max_queries=1)
+        self.request("GET", "/resources/export", self.admin_token, max_queries=1)
+        # the resource version behind the etag is read before the page
+        self.request("GET", user_url, self.user_token, max_queries=2)
+        self.request(
+            "POST", user_url, self.user_token, 3, json={"resource_name": "new"}
+        )
+        self.request(
+            "DELETE",
+            user_url + "?resource_id={}".format(self.resource_ids[0]),
+            self.user_token,
+            max_queries=4,
+        )
+        # the quota is reserved once, the generated ids are fetched one insert at a time
+        self.request(
+            "POST",
+            user_url + "/bulk",
+            self.user_token,
+            max_queries=1 + len(names),
+            json={"resource_names": names},
+        )
+        # statements must not grow with the number of resources deleted
+        self.request(
+            "DELETE",
+            user_url + "/bulk",
+            self.user_token,
+            max_queries=4,
+            json={"resource_ids": self.resource_ids[1:]},
+        )
+
+    def test_admin_endpoints(self):
+        self.request("GET", "/admin/profiles", self.admin_token, max_queries=0)
+        self.request("GET", "/admin/quota-usage", self.admin_token, max_queries=1)
+
+
+class TestQueryLogs(BaseTestCase):
+    def setUp(self):
+        super(TestQueryLogs, self).setUp()
+
+        self.user_id, self.auth_token = register_and_login()
+        self.resource_ids = create_new_user_resources(self.user_id, ["a", "b", "c"])
+
+    def tearDown(self):
+        query_stats.slow_query_threshold = self.app.config["SLOW_QUERY_THRESHOLD"]
+        query_stats.repeat_threshold = self.app.config["QUERY_REPEAT_THRESHOLD"]
+        super(TestQueryLogs, self).tearDown()
+
+    def test_slow_query_is_logged_with_parameters(self):
+        query_stats.slow_query_threshold = 1e-9
+
+        with self.assertLogs(self.app.logger, "WARNING") as logs:
+            get_user_by_email("test@gmail.com")
+
+        self.assertTrue(any("slow query" in line for line in logs.output))
+        self.assertTrue(any("test@gmail.com" in line for line in logs.output))
+
+    def test_repeated_statement_is_logged(self):
+        query_stats.repeat_threshold = 3
+
+        with self.assertLogs(self.app.logger, "WARNING") as logs:
+            for resource_id in self.resource_ids:
+                self.client.delete(
+                    "/resources/{}?resource_id={}".format(self.user_id, resource_id),
+                    headers={"Authorization": self.auth_token},
+                )
+                # a request only reports the statements it repeated itself
+                self.assertTrue(logs.output == [])
+
+            with self.app.test_request_context():
+                self.app.preprocess_request()
+                for _ in range(3):
+                    get_user_by_email("test@gmail.com")
+                self.app.do_teardown_request()
+
+        self.assertTrue(any("possible N+1 query" in line for line in logs.output))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+Problem Domain
+
+Guard the query plans of the hot service queries against regressing to full table scans
+"""
+
+import re
+import unittest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app.main import db, revoked_token_filter
+from app.main.model.token_garbage import TokenGarbage
+from app.test.base import BaseTestCase
+from app.main.service.user_service import (
+    create_new_user,
+    create_new_user_resource,
+    delete_platform_user,
+    get_quota_usage_page,
+    get_user_by_email,
+    get_user_by_id,
+    reserve_user_quota,
+)
+from app.main.service.resource_service import (
+    delete_user_resource,
+    delete_user_resources,
+    get_platform_resources_page,
+    get_user_resources,
+    get_user_resources_page,
+)
+from app.main.service.token_garbage_service import purge_expired_tokens
+
+TABLE_SCAN = re.compile(r"^SCAN (TABLE )?\w+$")
+
+
+@contextmanager
+def captured_statements():
+    """
+    :purpose: records the select, update and delete statements executed within the block
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            # the plan of an executemany is the same for every parameter set
+            statements.append((statement, parameters[0] if many else parameters))
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def table_scans(statements):
+    """
+    :param statements: captured (statement, parameters) tuples
+    :return list: (statement, plan detail) of every step that scans a whole table
+    """
+    scans = []
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for statement, parameters in statements:
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            for row in cursor.fetchall():
+                if TABLE_SCAN.match(row[-1]):
+                    scans.append((statement, row[-1]))
+    finally:
+        connection.close()
+
+    return scans
+
+
+class TestQueryPlans(BaseTestCase):
+    def setUp(self):
+        super(TestQueryPlans, self).setUp()
+
+        for i in range(3):
+            create_new_user(
+                {"email": "test{}@gmail.com".format(i), "password": "test123"}
+            )
+            user = get_user_by_email("test{}@gmail.com".format(i))
+            for j in range(3):
+                create_new_user_resource(user.user_id, {"resource_name": str(j)})
+
+        self.user = get_user_by_email("test0@gmail.com")
+
+    def assertNoTableScan(self, statements):
+        self.assertTrue(statements, "no statement was captured")
+        scans = table_scans(statements)
+        self.assertTrue(scans == [], scans)
+
+    def test_user_lookups(self):
+        with captured_statements() as statements:
+            get_user_by_id(self.user.user_id)
+            get_user_by_email(self.user.email)
+            reserve_user_quota(self.user.user_id)
+
+        self.assertNoTableScan(statements)
+
+    def test_user_resource_queries(self):
+        with captured_statements() as statements:
+            get_user_resources(self.user.user_id)
+            page = get_user_resources_page(self.user.user_id, limit=1)
+            get_user_resources_page(self.user.user_id, limit=1, cursor=page.next_cursor)
+            get_platform_resources_page(limit=1, cursor=page.next_cursor)
+            self.user.resources.all()
+
+        self.assertNoTableScan(statements)
+
+    def test_quota_usage_query(self):
+        page = get_quota_usage_page(limit=1)
+
+        with captured_statements() as statements:
+            get_quota_usage_page(limit=1, cursor=page.next_cursor, drifted=True)
+
+        self.assertNoTableScan(statements)
+
+    def test_resource_deletes(self):
+        resource_ids = [r.resource_id for r in get_user_resources(self.user.user_id)]
+
+        with captured_statements() as statements:
+            delete_user_resource(self.user, resource_ids[0])
+            delete_user_resources(self.user, resource_ids[1:])
+            delete_user_resource(self.user)
+
+        self.assertNoTableScan(statements)
+
+    def test_user_delete(self):
+        user = get_user_by_email("test1@gmail.com")
+
+        with captured_statements() as statements:
+            delete_platform_user(user.user_id)
+
+        self.assertNoTableScan(statements)
+
+    def test_token_store_queries(self):
+        now = datetime.utcnow()
+        db.session.add(TokenGarbage("dumped", expires_on=now + timedelta(days=1)))
+        db.session.add(TokenGarbage("expired", expires_on=now - timedelta(days=1)))
+        db.session.commit()
+        revoked_token_filter.reset()
+
+        with captured_statements() as statements:
+            TokenGarbage.is_dumped("dumped")
+            purge_expired_tokens()
+
+        self.assertNoTableScan(statements)
+
+
+if __name__ == "__main__":
+    unittest.main()
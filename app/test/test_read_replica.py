@@ -0,0 +1,98 @@
+"""
+Problem Domain
+
+Check the GET listings are read from the replicas while the writes stay on the primary
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from app.main import db, response_cache
+from app.main.model.user import User
+from app.main.service.user_service import create_new_user_resources
+from app.test.base import BaseTestCase, register_and_login
+
+
+class TestReadReplica(BaseTestCase):
+    def setUp(self):
+        super(TestReadReplica, self).setUp()
+
+        self.admin_id, admin_token = register_and_login("root@gmail.com", admin=True)
+        self.user_id, _ = register_and_login()
+        self.headers = {"Authorization": admin_token}
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.replica_path = os.path.join(directory, "replica.db")
+        self.replicate()
+
+    def replicate(self):
+        """
+        :purpose: makes the replica a read only copy of the primary as it is now
+        """
+        db.configure_replicas([])
+        db.session.remove()
+        with db.engine.connect() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        shutil.copy(db.engine.url.database, self.replica_path)
+        db.configure_replicas(["sqlite:///" + self.replica_path])
+
+    def tearDown(self):
+        db.configure_replicas([])
+
+        super(TestReadReplica, self).tearDown()
+
+    def get_resources(self):
+        resp = self.client.get("/resources/", headers=self.headers)
+        self.assertTrue(resp.status_code == 200)
+
+        return json.loads(resp.data.decode())["data"]
+
+    def test_reads_served_by_replica(self):
+        resources = self.get_resources()["data"]
+
+        # written to the primary only, the replica lags behind
+        create_new_user_resources(self.user_id, ["a", "b"])
+        self.assertTrue(len(self.get_resources()["data"]) == len(resources))
+
+        resp = self.client.get(
+            "/resources/{}".format(self.user_id), headers=self.headers
+        )
+        self.assertTrue(json.loads(resp.data.decode())["data"]["data"] == [])
+
+        # the lagging pages were not cached, the listing is fresh once the replica caught up
+        self.replicate()
+        self.assertTrue(len(self.get_resources()["data"]) == len(resources) + 2)
+
+        db.configure_replicas([])
+        create_new_user_resources(self.user_id, ["c"])
+        self.assertTrue(len(self.get_resources()["data"]) == len(resources) + 3)
+        self.assertTrue(response_cache.stats()["size"] == 1)
+
+    def test_writes_bound_to_primary(self):
+        with db.reading_from_replica() as replica:
+            self.assertTrue(replica is not None)
+            self.assertTrue(
+                db.session.get_bind(clause=db.select([User.user_id])) is replica
+            )
+            self.assertTrue(
+                db.session.get_bind(clause=db.update(User.__table__)) is db.engine
+            )
+
+        self.assertTrue(
+            db.session.get_bind(clause=db.select([User.user_id])) is db.engine
+        )
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        db.configure_replicas(["sqlite:////nonexistent/directory/replica.db"])
+        resources = self.get_resources()["data"]
+
+        create_new_user_resources(self.user_id, ["a"])
+        self.assertTrue(len(self.get_resources()["data"]) == len(resources) + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,299 @@
+"""
+Problem Domain
+
+Write test cases for the resource listing and resource bulk operations
+"""
+
+import json
+import threading
+import time
+import unittest
+
+from sqlalchemy import event
+
+from app.main import db
+from app.main.model.resource import CResource
+from app.main.exceptions import InvalidCursor, ResourceLimitExceeded
+from app.main.util.pagination import decode_cursor, encode_cursor
+from app.test.base import BaseTestCase, create_user, register_and_login
+from app.main.service.user_service import (
+    create_new_user_resource,
+    create_new_user_resources,
+    get_user_by_id,
+    get_platform_users_page,
+    set_new_user_quota,
+)
+from app.main.service.resource_service import (
+    get_platform_resources_page,
+    get_user_resources_page,
+    iter_platform_resources,
+    get_user_resources,
+    get_user_resource_version,
+    delete_user_resource,
+    delete_user_resources,
+)
+
+
+class TestPagination(BaseTestCase):
+    def test_cursor_round_trip(self):
+        self.assertTrue(decode_cursor(encode_cursor(12345)) == 12345)
+
+        with self.assertRaises(InvalidCursor):
+            decode_cursor("not-a-cursor")
+
+    def test_user_resources_pages(self):
+        user = create_user()
+        other_user = create_user("other@gmail.com")
+
+        for i in range(5):
+            create_new_user_resource(user.user_id, {"resource_name": "r" + str(i)})
+            create_new_user_resource(other_user.user_id, {"resource_name": "o"})
+
+        seen = []
+        cursor = None
+        while True:
+            page = get_user_resources_page(user.user_id, limit=2, cursor=cursor)
+            self.assertTrue(len(page.items) <= 2)
+            seen.extend(resource.resource_name for resource in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        self.assertTrue(seen == ["r0", "r1", "r2", "r3", "r4"])
+
+    def test_platform_pages(self):
+        user = create_user()
+        create_user("other@gmail.com")
+
+        for i in range(3):
+            create_new_user_resource(user.user_id, {"resource_name": "r" + str(i)})
+
+        first = get_platform_resources_page(limit=3)
+        self.assertTrue(len(first.items) == 3)
+        self.assertTrue(first.next_cursor is None)
+
+        users = get_platform_users_page(limit=1)
+        self.assertTrue(len(users.items) == 1)
+        rest = get_platform_users_page(limit=1, cursor=users.next_cursor)
+        self.assertTrue(rest.items[0].email == "other@gmail.com")
+
+    def test_next_cursor_only_on_listing(self):
+        admin_id, admin_token = register_and_login("root@gmail.com", admin=True)
+        headers = {"Authorization": admin_token}
+
+        resp = self.client.get("/users/?limit=1", headers=headers)
+        self.assertTrue("next_cursor" in json.loads(resp.data.decode())["data"])
+
+        resp = self.client.get("/users/{}".format(admin_id), headers=headers)
+        self.assertTrue(resp.status_code == 200)
+        self.assertFalse("next_cursor" in json.loads(resp.data.decode()))
+
+
+class TestExport(BaseTestCase):
+    def test_iter_platform_resources(self):
+        user = create_user()
+
+        for i in range(5):
+            create_new_user_resource(user.user_id, {"resource_name": "r" + str(i)})
+
+        rows = list(iter_platform_resources(chunk_size=2))
+
+        self.assertTrue([row[2] for row in rows] == ["r0", "r1", "r2", "r3", "r4"])
+        self.assertTrue(all(row[0] == user.user_id for row in rows))
+
+
+class TestBulkCreate(BaseTestCase):
+    def test_bulk_create(self):
+        user = create_user()
+        set_new_user_quota(user, 5)
+
+        resource_ids = create_new_user_resources(user.user_id, ["a", "b", "c"])
+
+        self.assertTrue(len(resource_ids) == 3)
+        self.assertTrue(
+            [resource.resource_id for resource in get_user_resources(user.user_id)]
+            == resource_ids
+        )
+        self.assertTrue(get_user_by_id(user.user_id).quota_remaining == 2)
+
+    def test_bulk_create_over_quota(self):
+        user = create_user()
+        set_new_user_quota(user, 2)
+
+        with self.assertRaises(ResourceLimitExceeded):
+            create_new_user_resources(user.user_id, ["a", "b", "c"])
+
+        # nothing of the batch was created
+        self.assertTrue(len(get_user_resources(user.user_id)) == 0)
+        self.assertTrue(get_user_by_id(user.user_id).quota_remaining == 2)
+
+
+class TestQuotaReservation(BaseTestCase):
+    def test_concurrent_creation_never_over_allocates(self):
+        user = create_user()
+        set_new_user_quota(user, 20)
+        user_id = user.user_id
+
+        num_threads = 8
+        attempts_per_thread = 10
+        created = []
+        rejected = []
+        errors = []
+
+        def create_resources():
+            with self.app.app_context():
+                try:
+                    for i in range(attempts_per_thread):
+                        try:
+                            created.append(
+                                create_new_user_resource(
+                                    user_id, {"resource_name": "r" + str(i)}
+                                )
+                            )
+                        except ResourceLimitExceeded:
+                            rejected.append(i)
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    db.session.remove()
+
+        threads = [
+            threading.Thread(target=create_resources) for _ in range(num_threads)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        self.app.logger.info(
+            "quota reservation throughput: {:.1f} ops/sec".format(
+                num_threads * attempts_per_thread / elapsed
+            )
+        )
+
+        # the user loaded by this thread predates the concurrent updates
+        db.session.expire_all()
+
+        self.assertTrue(errors == [], errors)
+        self.assertTrue(len(created) == 20)
+        self.assertTrue(len(set(created)) == 20)
+        self.assertTrue(len(rejected) == num_threads * attempts_per_thread - 20)
+        self.assertTrue(len(get_user_resources(user_id)) == 20)
+        self.assertTrue(get_user_by_id(user_id).quota_remaining == 0)
+
+    def test_unlimited_quota_is_untouched(self):
+        user = create_user()
+
+        create_new_user_resource(user.user_id, {"resource_name": "r"})
+        create_new_user_resources(user.user_id, ["a", "b"])
+
+        self.assertTrue(get_user_by_id(user.user_id).quota_remaining == -1)
+        self.assertTrue(len(get_user_resources(user.user_id)) == 3)
+
+
+class TestBulkDelete(BaseTestCase):
+    def test_bulk_delete(self):
+        user = create_user()
+        other_user = create_user("other@gmail.com")
+        set_new_user_quota(user, 5)
+
+        resource_ids = create_new_user_resources(user.user_id, ["a", "b", "c"])
+        other_resource_id = create_new_user_resource(
+            other_user.user_id, {"resource_name": "o"}
+        )
+
+        res = delete_user_resources(user, resource_ids[:2] + [other_resource_id, 9999])
+
+        self.assertTrue(res["deleted"] == resource_ids[:2])
+        self.assertTrue(res["not_found"] == sorted([other_resource_id, 9999]))
+        self.assertTrue(len(get_user_resources(user.user_id)) == 1)
+        self.assertTrue(len(get_user_resources(other_user.user_id)) == 1)
+        self.assertTrue(get_user_by_id(user.user_id).quota_remaining == 4)
+
+    def test_bulk_delete_concurrent_delete(self):
+        user = create_user()
+        set_new_user_quota(user, 5)
+        resource_ids = create_new_user_resources(user.user_id, ["a", "b", "c"])
+        deleted_elsewhere = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            # another request deletes a resource between the select and the delete
+            if statement.startswith("DELETE FROM resource") and not deleted_elsewhere:
+                deleted_elsewhere.append(resource_ids[0])
+                with db.engine.connect() as other:
+                    other.execute(
+                        CResource.__table__.delete().where(
+                            CResource.resource_id == resource_ids[0]
+                        )
+                    )
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            res = delete_user_resources(user, resource_ids)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+        self.assertTrue(res["deleted"] == resource_ids[1:])
+        self.assertTrue(res["not_found"] == resource_ids[:1])
+        # only the rows deleted by this request are credited
+        self.assertTrue(get_user_by_id(user.user_id).quota_remaining == 4)
+
+
+class TestConditionalGet(BaseTestCase):
+    def test_writes_bump_resource_version(self):
+        user = create_user()
+        versions = [get_user_resource_version(user.user_id)]
+
+        resource_id = create_new_user_resource(user.user_id, {"resource_name": "a"})
+        versions.append(get_user_resource_version(user.user_id))
+        resource_ids = create_new_user_resources(user.user_id, ["b", "c", "d"])
+        versions.append(get_user_resource_version(user.user_id))
+        delete_user_resource(user, resource_id)
+        versions.append(get_user_resource_version(user.user_id))
+        delete_user_resources(user, resource_ids[:1])
+        versions.append(get_user_resource_version(user.user_id))
+        set_new_user_quota(user, 10)
+        versions.append(get_user_resource_version(user.user_id))
+        delete_user_resource(user)
+        versions.append(get_user_resource_version(user.user_id))
+
+        self.assertTrue(versions == list(range(7)))
+        # the unlimited quota is left untouched by the bulk delete
+        self.assertTrue(get_user_by_id(user.user_id).quota_remaining == 10)
+        self.assertTrue(get_user_resource_version(9999) is None)
+
+    def test_unchanged_listing_is_not_modified(self):
+        user_id, auth_token = register_and_login()
+        url = "/resources/{}".format(user_id)
+        headers = {"Authorization": auth_token}
+        create_new_user_resource(user_id, {"resource_name": "a"})
+
+        resp = self.client.get(url, headers=headers)
+        etag = resp.headers["ETag"]
+        self.assertTrue(resp.status_code == 200)
+
+        # only the version lookup runs for an unchanged listing
+        with self.assertMaxQueries(1):
+            resp = self.client.get(
+                url, headers=dict(headers, **{"If-None-Match": etag})
+            )
+        self.assertTrue(resp.status_code == 304)
+        self.assertTrue(resp.data == b"" and resp.headers["ETag"] == etag)
+
+        # other pages have their own etag
+        resp = self.client.get(
+            url + "?limit=1", headers=dict(headers, **{"If-None-Match": etag})
+        )
+        self.assertTrue(resp.status_code == 200)
+
+        create_new_user_resource(user_id, {"resource_name": "b"})
+        resp = self.client.get(url, headers=dict(headers, **{"If-None-Match": etag}))
+        self.assertTrue(resp.status_code == 200)
+        self.assertTrue(resp.headers["ETag"] != etag)
+        self.assertTrue(len(resp.json["data"]["data"]) == 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+Problem Domain
+
+Check the admin list responses are cached and invalidated by the service writes
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from app.main import response_cache
+from app.main.service.resource_service import delete_user_resources
+from app.main.service.user_service import (
+    create_new_user,
+    create_new_user_resources,
+    get_user_by_id,
+    set_new_user_quota,
+)
+from app.main.util.response_cache import LRUResponseStore, SQLiteResponseStore
+from app.test.base import BaseTestCase, register_and_login
+
+
+class TestResponseCache(BaseTestCase):
+    def setUp(self):
+        super(TestResponseCache, self).setUp()
+
+        self.admin_id, admin_token = register_and_login("root@gmail.com", admin=True)
+        self.user_id, _ = register_and_login()
+        self.headers = {"Authorization": admin_token}
+
+        # warm up the per worker token and principal caches
+        self.client.get("/users/1", headers=self.headers)
+
+    def tearDown(self):
+        response_cache.init_app(self.app)
+
+        super(TestResponseCache, self).tearDown()
+
+    def get(self, url, max_queries):
+        with self.assertMaxQueries(max_queries):
+            resp = self.client.get(url, headers=self.headers)
+
+        self.assertTrue(resp.status_code == 200)
+
+        return json.loads(resp.data.decode())["data"]
+
+    def check_invalidation(self):
+        users = self.get("/users/", max_queries=1)
+        self.assertTrue(self.get("/users/", max_queries=0) == users)
+        # pages and masks are cached apart
+        self.assertTrue(len(self.get("/users/?limit=1", max_queries=1)["data"]) == 1)
+
+        resources = self.get("/resources/", max_queries=1)
+        resource_ids = create_new_user_resources(self.user_id, ["a", "b"])
+        self.assertTrue(
+            len(self.get("/resources/", max_queries=1)["data"])
+            == len(resources["data"]) + 2
+        )
+        # the quota remaining of the users listing changes with the resources too
+        self.get("/users/", max_queries=1)
+
+        delete_user_resources(get_user_by_id(self.user_id), resource_ids[:1])
+        self.assertTrue(
+            len(self.get("/resources/", max_queries=1)["data"])
+            == len(resources["data"]) + 1
+        )
+
+        set_new_user_quota(get_user_by_id(self.user_id), 10)
+        self.get("/resources/", max_queries=0)
+        data = self.get("/users/", max_queries=1)["data"]
+        self.assertTrue(data[-1]["user_quota"] == 10)
+
+        create_new_user({"email": "new@gmail.com", "password": "test123"})
+        self.assertTrue(
+            len(self.get("/users/", max_queries=1)["data"]) == len(data) + 1
+        )
+
+    def test_lru_backend(self):
+        self.check_invalidation()
+
+    def test_sqlite_backend(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        response_cache.configure(
+            backend="sqlite", path=os.path.join(directory, "cache.db")
+        )
+
+        self.check_invalidation()
+
+    def test_disabled_backend(self):
+        response_cache.configure(backend="none")
+
+        self.get("/users/", max_queries=1)
+        self.get("/users/", max_queries=1)
+
+
+class TestLRUResponseStore(unittest.TestCase):
+    def test_invalidation_while_storing(self):
+        store = LRUResponseStore()
+        store_entry = store._store
+        writers = []
+
+        def racing_store(*args):
+            # a write invalidates the tag right after the generation was checked
+            writer = threading.Thread(target=store.invalidate, args=("users",))
+            writer.start()
+            writer.join(0.05)
+            writers.append(writer)
+            store_entry(*args)
+
+        store._store = racing_store
+        store.set_entry("users", "a", [1], store.generation("users"))
+        writers[0].join()
+
+        self.assertTrue(store.get_entry("users", "a") is None)
+
+
+class TestSQLiteResponseStore(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "cache.db")
+
+    def test_shared_entries_and_invalidation(self):
+        store = SQLiteResponseStore(self.path, maxsize=2)
+        other_worker = SQLiteResponseStore(self.path, maxsize=2)
+
+        store.set_entry("users", "a", {"x": 1}, store.generation("users"))
+        self.assertTrue(other_worker.get_entry("users", "a") == {"x": 1})
+
+        # a response computed before a write is not stored
+        generation = store.generation("users")
+        other_worker.invalidate("users")
+        store.set_entry("users", "a", {"x": 1}, generation)
+        self.assertTrue(store.get_entry("users", "a") is None)
+
+        generation = store.generation("users")
+        for key in ("a", "b", "c"):
+            store.set_entry("users", key, key, generation)
+            time.sleep(0.01)
+        self.assertTrue(store.get_entry("users", "a") is None)
+        self.assertTrue(store.stats()["size"] == 2)
+
+    def test_entries_expire(self):
+        store = SQLiteResponseStore(self.path, ttl=0.05)
+
+        store.set_entry("users", "a", [1], store.generation("users"))
+        self.assertTrue(store.get_entry("users", "a") == [1])
+        time.sleep(0.1)
+        self.assertTrue(store.get_entry("users", "a") is None)
+
+
+if __name__ == "__main__":
+    unittest.main()
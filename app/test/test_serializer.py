@@ -0,0 +1,119 @@
+"""
+Problem Domain
+
+Check the precompiled serializer produces the same responses as flask_restplus marshal
+"""
+
+import json
+import unittest
+from datetime import date, datetime
+
+from flask_restplus import marshal
+
+from app.main.model.resource import CResource
+from app.main.model.user import User
+from app.main.service.resource_service import get_platform_resources_page
+from app.main.service.user_service import (
+    create_new_user_resources,
+    get_platform_users_page,
+)
+from app.main.util.dto import ResourceDto, UserDto
+from app.main.util.serializer import compile_model
+from app.test.base import BaseTestCase, register_and_login
+
+
+class TestSerializer(BaseTestCase):
+    def setUp(self):
+        super(TestSerializer, self).setUp()
+
+        self.admin_id, self.admin_token = register_and_login(
+            "root@gmail.com", admin=True
+        )
+        self.user_id, self.user_token = register_and_login()
+        create_new_user_resources(self.user_id, ["r1", "r2", "r3"])
+
+    def assertSameAsMarshal(self, model, resp_obj, *expected_data):
+        serialized = compile_model(model).serialize(resp_obj)
+        for data in expected_data or [resp_obj]:
+            marshalled = marshal(data, model)
+            self.assertTrue(json.dumps(serialized) == json.dumps(marshalled))
+
+    def test_rows_match_marshal(self):
+        resources = get_platform_resources_page()
+        users = get_platform_users_page()
+
+        self.assertSameAsMarshal(
+            ResourceDto.resource_res_data,
+            {"status": "success", "data": resources.items, "next_cursor": None},
+            {"status": "success", "data": CResource.query.all(), "next_cursor": None},
+        )
+        self.assertSameAsMarshal(
+            UserDto.user_res_model,
+            {"status": "success", "data": users.items, "message": "m"},
+            {"status": "success", "data": User.query.all(), "message": "m"},
+        )
+
+    def test_values_match_marshal(self):
+        model = UserDto.user_res_model
+        rows = [
+            {
+                "user_id": 1,
+                "email": "a@x.com",
+                "user_registered_on": datetime(2020, 1, 2, 3, 4, 5, 6),
+                "user_quota": -1,
+            },
+            {"user_id": "2", "email": 3, "user_registered_on": date(2020, 1, 2)},
+            {"user_registered_on": "2020-01-02T03:04:05"},
+        ]
+
+        self.assertSameAsMarshal(
+            model, {"status": "success", "data": rows[:1], "next_cursor": "abc"}
+        )
+        self.assertSameAsMarshal(model, {"status": "success", "data": rows[1:]})
+        self.assertSameAsMarshal(model, {"status": "fail", "message": "error"})
+        self.assertSameAsMarshal(model, {"status": "success", "data": []})
+
+    def test_endpoints_match_marshal(self):
+        headers = {"Authorization": self.admin_token}
+        data = CResource.query.order_by(CResource.resource_id).all()
+        resources = {
+            "status": "success",
+            "message": "Returned " + str(len(data)) + " Resources of the platform!",
+            "data": data,
+            "next_cursor": None,
+        }
+
+        resp = self.client.get("/resources/", headers=headers)
+        self.assertTrue(resp.status_code == 200)
+        self.assertTrue(
+            json.loads(resp.data.decode())
+            == marshal(resources, ResourceDto.resource_res_data, envelope="data")
+        )
+
+        resp = self.client.get("/resources/?cursor=!", headers=headers)
+        self.assertTrue(resp.status_code == 400)
+        data = json.loads(resp.data.decode())["data"]
+        self.assertTrue(data["status"] == "fail" and data["data"] is None)
+
+        # field masks are still honoured
+        resp = self.client.get(
+            "/users/", headers=dict(headers, **{"X-Fields": "data{email}"})
+        )
+        data = json.loads(resp.data.decode())["data"]
+        emails = [{"email": user.email} for user in User.query.order_by(User.user_id)]
+        self.assertTrue(data == {"data": emails})
+
+    def test_swagger_docs(self):
+        spec = json.loads(self.client.get("/swagger.json").data.decode())
+
+        for path, model in (
+            ("/resources/", "resource_res_data"),
+            ("/resources/{user_id}", "resource_res_data"),
+            ("/users/", "user_page_res_details"),
+        ):
+            schema = spec["paths"][path]["get"]["responses"]["200"]["schema"]
+            self.assertTrue(schema["items"]["$ref"] == "#/definitions/" + model)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,14 +8,20 @@ import unittest
 import datetime
 import uuid
 
-from app.main import db
+from sqlalchemy import event
+
+from app.main import db, import_password_hasher, password_hasher
 from app.main.model.user import User
 from app.main.model.resource import CResource
-from app.test.base import BaseTestCase
+from app.test.base import BaseTestCase, register_and_login
 from app.main.service.user_service import (
     create_new_user,
+    get_user_by_email,
     get_user_by_id,
+    import_users,
     create_new_user_resource,
+    create_new_user_resources,
+    get_quota_usage_page,
     set_new_user_quota,
 )
 from app.main.service.resource_service import (
@@ -25,6 +31,7 @@ from app.main.service.resource_service import (
 )
 
 from app.main.exceptions import UserAlreadyExists, ResourceLimitExceeded
+from app.main.util.user_import import read_users
 
 
 class TestUserModel(BaseTestCase):
@@ -136,3 +143,173 @@ class TestUserModel(BaseTestCase):
         delete_user_resource(user)
 
         self.assertTrue(user.quota_remaining == 3)
+
+
+class TestUserImport(BaseTestCase):
+    def test_import_users(self):
+        create_new_user({"email": "exists@gmail.com", "password": "test123"})
+        lines = [
+            "email,password,user_quota\n",
+            "a@gmail.com,test123,5\n",
+            "b@gmail.com,test123,\n",
+            "a@gmail.com,test123,1\n",
+            "exists@gmail.com,test123,\n",
+            ",test123,\n",
+            "c@gmail.com,test123,0\n",
+        ]
+
+        with self.assertMaxQueries(4):
+            results = import_users(read_users(lines, "csv"), chunk_size=10)
+
+        self.assertTrue(
+            [result["status"] for result in results]
+            == ["created", "created", "duplicate", "exists", "invalid", "created"]
+        )
+        user = get_user_by_email("a@gmail.com")
+        self.assertTrue(results[0]["user_id"] == user.user_id)
+        self.assertTrue(user.user_quota == 5 and user.quota_remaining == 5)
+        self.assertTrue(user.check_password("test123"))
+        self.assertTrue(get_user_by_email("b@gmail.com").user_quota == -1)
+        self.assertTrue(get_user_by_email("c@gmail.com").user_quota == 0)
+
+    def test_import_continues_after_conflicting_chunk(self):
+        conflicts = ["c@gmail.com", "d@gmail.com"]
+
+        def before_cursor_execute(conn, cursor, statement, parameters, *args):
+            # another request registers an email of the batch before every insert of it
+            if not statement.startswith("INSERT INTO user"):
+                return
+            for email in conflicts:
+                if email in str(parameters):
+                    conflicts.remove(email)
+                    with db.engine.connect() as other:
+                        other.execute(
+                            User.__table__.insert().values(
+                                email=email,
+                                platform_admin=False,
+                                user_registered_on=datetime.datetime.utcnow(),
+                                user_quota=-1,
+                                quota_remaining=-1,
+                                token_version=0,
+                            )
+                        )
+                    break
+
+        rows = [
+            {"email": email, "password": "test123", "user_quota": -1}
+            for email in ("a@gmail.com", "b@gmail.com", "c@gmail.com", "d@gmail.com")
+            + ("e@gmail.com", "f@gmail.com")
+        ]
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            results = import_users(rows, chunk_size=2)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+        # the chunk conflicting twice is reported, the chunks around it are imported
+        self.assertTrue(
+            [result["status"] for result in results]
+            == ["created", "created", "exists", "failed", "created", "created"]
+        )
+        self.assertTrue(get_user_by_email("f@gmail.com").user_quota == -1)
+
+    def test_import_endpoint(self):
+        _, auth_token = register_and_login("admin@x.com", admin=True)
+
+        body = "\n".join(
+            [
+                '{"email": "a@gmail.com", "password": "test123"}',
+                "not json",
+                '{"email": "b@gmail.com", "password": "test123", "user_quota": 2}',
+            ]
+        )
+        resp = self.client.post(
+            "/users/import",
+            data=body,
+            content_type="application/x-ndjson",
+            headers={"Authorization": auth_token},
+        )
+
+        self.assert200(resp)
+        self.assertTrue(resp.json["created"] == 2)
+        self.assertTrue(resp.json["skipped"] == 1)
+        self.assertTrue(
+            [row["status"] for row in resp.json["data"]]
+            == ["created", "invalid", "created"]
+        )
+        self.assertTrue(get_user_by_email("b@gmail.com").quota_remaining == 2)
+
+    def test_import_endpoint_limits(self):
+        # the passwords are hashed on the import pool, not on the request thread
+        self.assertTrue(import_password_hasher.executor == "thread")
+        self.assertTrue(password_hasher.executor == "inline")
+
+        _, auth_token = register_and_login("admin@x.com", admin=True)
+
+        self.app.config["IMPORT_MAX_ROWS"] = 1
+        self.addCleanup(self.app.config.__setitem__, "IMPORT_MAX_ROWS", 10000)
+        resp = self.client.post(
+            "/users/import",
+            data="email,password\na@gmail.com,test123\nb@gmail.com,test123\n",
+            content_type="text/csv",
+            headers={"Authorization": auth_token},
+        )
+
+        self.assert400(resp)
+        self.assertTrue(User.query.filter_by(email="a@gmail.com").first() is None)
+
+
+class TestQuotaUsage(BaseTestCase):
+    def setUp(self):
+        super(TestQuotaUsage, self).setUp()
+
+        self.admin_id, self.admin_token = register_and_login(
+            "root@gmail.com", admin=True
+        )
+        self.full_id, _ = register_and_login("test@gmail.com")
+        set_new_user_quota(get_user_by_id(self.full_id), 10)
+        create_new_user_resources(self.full_id, ["r" + str(i) for i in range(9)])
+
+        # the quota is set after the resource was created, quota_remaining drifts by one
+        self.drifted_id, _ = register_and_login("other@gmail.com")
+        create_new_user_resource(self.drifted_id, {"resource_name": "r"})
+        set_new_user_quota(get_user_by_id(self.drifted_id), 5)
+
+        self.user_ids = {self.admin_id, self.full_id, self.drifted_id}
+
+    def usage(self, **filters):
+        with self.assertMaxQueries(1):
+            page = get_quota_usage_page(limit=100, **filters)
+
+        return {row.user_id: row for row in page.items if row.user_id in self.user_ids}
+
+    def test_resource_counts(self):
+        usage = self.usage()
+
+        self.assertTrue(usage[self.admin_id].resource_count == 0)
+        self.assertTrue(usage[self.admin_id].quota_used_percent is None)
+        self.assertTrue(usage[self.full_id].resource_count == 9)
+        self.assertTrue(usage[self.full_id].quota_used_percent == 90)
+        self.assertTrue(usage[self.full_id].quota_drift == 0)
+        self.assertTrue(usage[self.drifted_id].quota_drift == 1)
+
+    def test_filters(self):
+        self.assertTrue(list(self.usage(min_usage=90)) == [self.full_id])
+        self.assertTrue(list(self.usage(drifted=True)) == [self.drifted_id])
+        self.assertTrue(self.usage(min_usage=90, drifted=True) == {})
+
+    def test_quota_usage_endpoint(self):
+        resp = self.client.get(
+            "/admin/quota-usage?min_usage=10&limit=1",
+            headers={"Authorization": self.admin_token},
+        )
+
+        self.assert200(resp)
+        self.assertTrue(len(resp.json["data"]["data"]) == 1)
+        self.assertTrue(resp.json["data"]["data"][0]["quota_used_percent"] >= 10)
+
+        resp = self.client.get(
+            "/admin/quota-usage?min_usage=-1",
+            headers={"Authorization": self.admin_token},
+        )
+        self.assert400(resp)
@@ -1,10 +1,26 @@
+import json
 import os
+import sys
 import unittest
 
 from flask_migrate import Migrate, MigrateCommand
 from flask_script import Manager
 
-from app.main import create_app, db
+from app.main import create_app, db, import_password_hasher
+from app.main.service.token_garbage_service import purge_expired_tokens
+from app.main.service.user_service import import_users as import_user_rows
+from app.main.util.password import EXECUTORS, calibrate_rounds
+from app.main.util.user_import import FORMATS, read_users
+from app.bench.loadtest import format_load_report, run_loadtest
+from app.bench.login import run_login_benchmark
+from app.bench.microbench import run_microbenchmarks
+from app.bench.writes import run_write_benchmark
+from app.bench.runner import (
+    find_regressions,
+    format_report,
+    load_baseline,
+    save_baseline,
+)
 from app import blueprint
 
 app = create_app(os.getenv("BOILERPLATE_ENV") or "dev")
@@ -24,6 +40,225 @@ def run():
     app.run(host="0.0.0.0")
 
 
+@manager.option(
+    "-b",
+    "--batch-size",
+    dest="batch_size",
+    type=int,
+    default=app.config["TOKEN_PURGE_BATCH_SIZE"],
+    help="rows deleted per transaction",
+)
+def purge_tokens(batch_size):
+    """Deletes the dumped auth tokens that have expired."""
+    purged = purge_expired_tokens(batch_size)
+    print("Purged {} expired auth tokens".format(purged))
+
+
+@manager.option("--users", dest="users", type=int, default=1000)
+@manager.option(
+    "--resources", dest="resources", type=int, default=10, help="resources per user"
+)
+@manager.option("--revoked", dest="revoked", type=int, default=10000)
+@manager.option("--iterations", dest="iterations", type=int, default=1000)
+@manager.option("--save", dest="save", default=None, help="save results as baseline")
+@manager.option("--compare", dest="compare", default=None, help="baseline to compare")
+@manager.option(
+    "--threshold",
+    dest="threshold",
+    type=float,
+    default=0.2,
+    help="tolerated relative regression",
+)
+def bench(users, resources, revoked, iterations, save, compare, threshold):
+    """Runs the auth and service micro benchmarks against a seeded scratch database."""
+    results = run_microbenchmarks(app, users, resources, revoked, iterations)
+    baseline = load_baseline(compare) if compare else None
+
+    print(format_report(results, baseline))
+
+    if save:
+        save_baseline(
+            results,
+            save,
+            {
+                "users": users,
+                "resources": resources,
+                "revoked": revoked,
+                "iterations": iterations,
+            },
+        )
+
+    if baseline:
+        regressions = find_regressions(results, baseline, threshold)
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        if regressions:
+            return 1
+    return 0
+
+
+@manager.option("--users", dest="users", type=int, default=20)
+@manager.option("--resources", dest="resources", type=int, default=50)
+@manager.option("--quota", dest="quota", type=int, default=-1, help="-1 means no quota")
+@manager.option("--threads", dest="threads", type=int, default=8)
+@manager.option("--duration", dest="duration", type=float, default=30)
+@manager.option(
+    "--requests", dest="requests", type=int, default=0, help="requests per thread"
+)
+@manager.option("--url", dest="url", default=None, help="drive a running server")
+@manager.option("--admin-email", dest="admin_email", default=None)
+@manager.option("--admin-password", dest="admin_password", default=None)
+@manager.option("--save", dest="save", default=None, help="save the report as json")
+def loadtest(
+    users,
+    resources,
+    quota,
+    threads,
+    duration,
+    requests,
+    url,
+    admin_email,
+    admin_password,
+    save,
+):
+    """Drives a mix of auth, user and resource calls against seeded tenants."""
+    if url and not (admin_email and admin_password):
+        print("--admin-email and --admin-password are required along with --url")
+        return 1
+
+    report, elapsed = run_loadtest(
+        app,
+        users=users,
+        resources=resources,
+        quota=quota,
+        workers=threads,
+        duration=duration,
+        max_requests=requests,
+        url=url,
+        admin_email=admin_email,
+        admin_password=admin_password,
+    )
+    print(format_load_report(report, elapsed))
+
+    if save:
+        save_baseline(report, save, {"users": users, "threads": threads, "url": url})
+    return 0
+
+
+@manager.option(
+    "--target-ms",
+    dest="target_ms",
+    type=float,
+    default=250,
+    help="hashing latency aimed for",
+)
+@manager.option("--samples", dest="samples", type=int, default=3)
+def calibrate_bcrypt(target_ms, samples):
+    """Picks the bcrypt cost hashing closest to the target latency on this host."""
+    timings = calibrate_rounds(target_ms, samples=samples)
+
+    for rounds, latency in timings:
+        print("rounds {:>2}: {:>9.1f} ms".format(rounds, latency))
+
+    within_target = [rounds for rounds, latency in timings if latency <= target_ms]
+    rounds = within_target[-1] if within_target else timings[0][0]
+    print("BCRYPT_LOG_ROUNDS = {}".format(rounds))
+
+
+@manager.option(
+    "--executors",
+    dest="executors",
+    default=",".join(EXECUTORS),
+    help="comma separated password hashing executors to compare",
+)
+@manager.option("--threads", dest="threads", type=int, default=8)
+@manager.option("--logins", dest="logins", type=int, default=8, help="per thread")
+@manager.option("--workers", dest="workers", type=int, default=None, help="pool size")
+def bench_login(executors, threads, logins, workers):
+    """Compares the login throughput of one worker with every hashing executor."""
+    results = run_login_benchmark(app, executors.split(","), threads, logins, workers)
+    print(format_report(results))
+
+
+@manager.option("--workers", dest="workers", type=int, default=4, help="processes")
+@manager.option("--writes", dest="writes", type=int, default=200, help="per worker")
+@manager.option(
+    "--modes",
+    dest="modes",
+    default=None,
+    help="comma separated engine modes to compare, all by default",
+)
+def bench_writes(workers, writes, modes):
+    """Compares resource creation throughput of concurrent workers per engine mode."""
+    results = run_write_benchmark(
+        app, workers, writes, modes.split(",") if modes else None
+    )
+    print(format_report(results))
+
+    for name, summary in results.items():
+        if summary["errors"]:
+            print(
+                "{}: {} writes failed on a locked database".format(
+                    name, summary["errors"]
+                )
+            )
+
+
+@manager.option(
+    "-f", "--file", dest="path", required=True, help="file to import, - for stdin"
+)
+@manager.option("--format", dest="fmt", choices=FORMATS, default=None)
+@manager.option("--report", dest="report", default=None, help="per row report file")
+@manager.option(
+    "--executor",
+    dest="executor",
+    choices=EXECUTORS,
+    default="process",
+    help="where passwords are hashed",
+)
+@manager.option(
+    "--chunk-size",
+    dest="chunk_size",
+    type=int,
+    default=app.config["IMPORT_CHUNK_SIZE"],
+    help="users inserted per transaction",
+)
+def import_users(path, fmt, report, executor, chunk_size):
+    """Creates platform users in bulk from a csv or ndjson file."""
+    fmt = fmt or ("csv" if path.endswith(".csv") else "ndjson")
+
+    import_password_hasher.configure(
+        executor=executor,
+        workers=app.config["IMPORT_HASH_WORKERS"],
+        rounds=app.config["BCRYPT_LOG_ROUNDS"],
+        timeout=app.config["IMPORT_HASH_TIMEOUT"],
+    )
+    try:
+        with sys.stdin if path == "-" else open(path, newline="") as lines:
+            results = import_user_rows(read_users(lines, fmt), chunk_size)
+    finally:
+        import_password_hasher.shutdown()
+
+    if report:
+        with open(report, "w") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    print(
+        "Imported {} of {} users ({})".format(
+            counts.get("created", 0),
+            len(results),
+            ", ".join(
+                "{} {}".format(n, status) for status, n in sorted(counts.items())
+            ),
+        )
+    )
+    return 0 if len(results) == counts.get("created", 0) else 1
+
+
 @manager.command
 def test():
     """Runs the unit tests."""
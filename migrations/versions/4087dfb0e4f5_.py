@@ -0,0 +1,30 @@
+"""index resource lookups by user
+
+Revision ID: 4087dfb0e4f5
+Revises: b61a73f215c0
+Create Date: 2026-10-18 17:52:07.551930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4087dfb0e4f5"
+down_revision = "b61a73f215c0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # tokengarbage expiry lookups are indexed by ix_tokengarbage_expires_on (f23efc6f3a80)
+    op.create_index(
+        "ix_resource_user_id_resource_id",
+        "resource",
+        ["user_id", "resource_id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_resource_user_id_resource_id", table_name="resource")
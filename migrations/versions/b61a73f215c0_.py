@@ -0,0 +1,30 @@
+"""add user token version
+
+Revision ID: b61a73f215c0
+Revises: f23efc6f3a80
+Create Date: 2026-10-18 17:41:52.906114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b61a73f215c0"
+down_revision = "f23efc6f3a80"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("user") as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "token_version", sa.Integer(), nullable=False, server_default="0"
+            )
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("user") as batch_op:
+        batch_op.drop_column("token_version")
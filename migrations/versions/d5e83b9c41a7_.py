@@ -0,0 +1,30 @@
+"""add user resource version
+
+Revision ID: d5e83b9c41a7
+Revises: 4087dfb0e4f5
+Create Date: 2026-10-18 18:02:31.417262
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d5e83b9c41a7"
+down_revision = "4087dfb0e4f5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("user") as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "resource_version", sa.Integer(), nullable=False, server_default="0"
+            )
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("user") as batch_op:
+        batch_op.drop_column("resource_version")
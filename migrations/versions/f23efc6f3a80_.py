@@ -0,0 +1,58 @@
+"""store the expiry of dumped auth tokens
+
+Revision ID: f23efc6f3a80
+Revises: b9d2e335f186
+Create Date: 2026-10-18 17:30:12.418203
+
+"""
+import datetime
+
+from alembic import op
+import jwt
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f23efc6f3a80"
+down_revision = "b9d2e335f186"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("tokengarbage") as batch_op:
+        batch_op.add_column(sa.Column("expires_on", sa.DateTime(), nullable=True))
+        batch_op.create_index(
+            "ix_tokengarbage_expires_on", ["expires_on"], unique=False
+        )
+
+    # backfill the expiry of the tokens dumped so far from their exp claim
+    tokengarbage = sa.table(
+        "tokengarbage",
+        sa.column("token_id", sa.Integer),
+        sa.column("token", sa.String),
+        sa.column("expires_on", sa.DateTime),
+    )
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select([tokengarbage.c.token_id, tokengarbage.c.token])
+    ).fetchall()
+
+    for token_id, token in rows:
+        try:
+            exp = jwt.decode(token, verify=False).get("exp")
+        except jwt.InvalidTokenError:
+            continue
+
+        if exp:
+            conn.execute(
+                tokengarbage.update()
+                .where(tokengarbage.c.token_id == token_id)
+                .values(expires_on=datetime.datetime.utcfromtimestamp(exp))
+            )
+
+
+def downgrade():
+    with op.batch_alter_table("tokengarbage") as batch_op:
+        batch_op.drop_index("ix_tokengarbage_expires_on")
+        batch_op.drop_column("expires_on")